@@ -0,0 +1,142 @@
+# backend/assets.py
+"""
+Entrega dos arquivos do frontend.
+
+Com o build (`python -m backend.build_assets`) em frontend/dist:
+  - /static/... serve os arquivos com hash no nome (style.3f9c2a1b7e.css)
+    com `Cache-Control: immutable` por 1 ano; o nome muda quando o conteúdo
+    muda, então o navegador nunca precisa revalidar
+  - se existir a variante .br/.gz e o cliente aceitar (Accept-Encoding),
+    ela é enviada no lugar do original, sem compressão em tempo de request
+  - as páginas HTML saem de dist/ (já com as referências reescritas), com
+    ETag do conteúdo e 304 no If-None-Match
+
+Sem build, tudo continua saindo de frontend/ como antes (dev), com
+`Cache-Control: no-cache`.
+"""
+from __future__ import annotations
+
+import mimetypes
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+from starlette.staticfiles import NotModifiedResponse
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.types import Scope
+
+from .catalog import etag_matches, make_etag
+from .fastjson import accepted_encodings
+
+FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend"
+DIST_DIR = FRONTEND_DIR / "dist"
+DIST_STATIC_DIR = DIST_DIR / "static"
+MANIFEST_NAME = "manifest.json"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# ordem de preferência quando o cliente aceita mais de uma
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _pick_variant(path: str, headers: Headers) -> Tuple[str, Optional[str]]:
+    """(arquivo a enviar, Content-Encoding) para `path` conforme o Accept-Encoding."""
+    accepted = accepted_encodings(headers)
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def _under(path: str, directory: Path) -> bool:
+    try:
+        return os.path.commonpath([os.path.realpath(path), str(directory.resolve())]) == str(directory.resolve())
+    except ValueError:
+        return False
+
+
+# -----------------------------------------------------------------------------
+# /static
+# -----------------------------------------------------------------------------
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles que procura primeiro em dist/static (arquivos com hash) e
+    depois em frontend/ (nomes originais, para quem ainda os referencia).
+    """
+
+    def __init__(self, *, directory: Path = FRONTEND_DIR, dist: Path = DIST_STATIC_DIR, **kw):
+        super().__init__(directory=str(directory), **kw)
+        self.dist = dist
+        self._fallback = list(self.all_directories)
+
+    def lookup_path(self, path: str):
+        # o dist pode surgir (novo build) com o servidor já rodando
+        self.all_directories = ([str(self.dist)] if self.dist.is_dir() else []) + self._fallback
+        return super().lookup_path(path)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        hashed = _under(full_path, self.dist)
+
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        send_path, encoding = _pick_variant(full_path, request_headers) if hashed else (full_path, None)
+        if encoding:
+            stat_result = os.stat(send_path)
+
+        response = FileResponse(send_path, status_code=status_code, stat_result=stat_result, media_type=media_type)
+        response.headers["Cache-Control"] = IMMUTABLE if hashed else REVALIDATE
+        if hashed:
+            response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+# -----------------------------------------------------------------------------
+# Páginas HTML
+# -----------------------------------------------------------------------------
+# cache: arquivo -> (mtime_ns, etag); o ETag só é recalculado quando o arquivo muda
+_etags: Dict[str, Tuple[int, str]] = {}
+_etags_lock = threading.Lock()
+
+
+def _file_etag(path: str, st: os.stat_result) -> str:
+    with _etags_lock:
+        hit = _etags.get(path)
+        if hit and hit[0] == st.st_mtime_ns:
+            return hit[1]
+    etag = make_etag(Path(path).read_bytes())
+    with _etags_lock:
+        _etags[path] = (st.st_mtime_ns, etag)
+    return etag
+
+
+def html_path(name: str) -> Path:
+    """A página do build, se existir; senão a original em frontend/."""
+    built = DIST_DIR / name
+    return built if built.is_file() else FRONTEND_DIR / name
+
+
+def html_response(request: Request, name: str) -> Response:
+    path = html_path(name)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Página não encontrada")
+
+    send_path, encoding = _pick_variant(str(path), request.headers)
+    st = os.stat(send_path)
+    etag = _file_etag(send_path, st)
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(send_path, stat_result=st, media_type="text/html; charset=utf-8", headers=headers)
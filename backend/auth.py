@@ -1,26 +1,77 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
-import os, jwt
-from passlib.context import CryptContext
+from typing import Any, Callable, Dict, List, Optional
+from dataclasses import dataclass, fields
+import os, jwt, logging, threading
+from sqlalchemy import update
+from starlette.concurrency import run_in_threadpool
 
-from .database import get_db
+from .cache import LRUCache
+from .database import ReadSessionLocal, SessionLocal
 from .models import User
+from . import hashing
+from .hashing import HashPoolBusy
+
+log = logging.getLogger(__name__)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")
 ALGO = "HS256"
 ACCESS_EXPIRE_MIN = int(os.getenv("ACCESS_EXPIRE_MIN", "60"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer = HTTPBearer()
 
 def get_password_hash(password: str) -> str:
-    return pwd_ctx.hash(password)
+    return hashing.hash_password(password)
 
 def verify_password(password: str, hash_: str) -> bool:
-    return pwd_ctx.verify(password, hash_)
+    return hashing.verify_password(password, hash_)
+
+# ---- versões async: bcrypt no pool de processos (backend/hashing.py) --------
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, tente novamente em instantes.",
+        headers={"Retry-After": "1"},
+    )
+
+async def hash_password_async(password: str) -> str:
+    try:
+        return await hashing.ahash_password(password)
+    except HashPoolBusy:
+        raise _busy()
+
+async def verify_password_async(password: str, hash_: str) -> tuple[bool, bool]:
+    """(senha confere?, precisa de rehash?)"""
+    try:
+        return await hashing.averify_password(password, hash_)
+    except HashPoolBusy:
+        raise _busy()
+
+def _store_rehash(user_id: int, old_hash: str, new_hash: str) -> None:
+    db = SessionLocal()
+    try:
+        # só troca se ninguém alterou a senha nesse meio-tempo
+        db.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+async def rehash_password(user_id: int, password: str, old_hash: str) -> None:
+    """Tarefa de fundo pós-login: refaz o hash com o custo atual (BCRYPT_ROUNDS)."""
+    try:
+        new_hash = await hashing.ahash_password(password)
+        await run_in_threadpool(_store_rehash, user_id, old_hash, new_hash)
+    except HashPoolBusy:
+        pass   # tenta de novo no próximo login
+    except Exception:
+        log.exception("rehash da senha do usuário %s falhou", user_id)
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -28,22 +79,126 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGO)
 
-def decode_token(token: str) -> Dict[str, Any]:
+def decode_token(token: str, scope: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Valida o JWT. Sem `scope`, só aceita token de acesso (sem claim
+    "scope"); tokens restritos (ex.: o ticket do SSE, que viaja na URL)
+    só valem onde o escopo deles é pedido.
+    """
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGO])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGO])
     except jwt.PyJWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido ou expirado")
+    if payload.get("scope") != scope:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido ou expirado")
+    return payload
 
-def get_current_user(cred: HTTPAuthorizationCredentials = Depends(bearer),
-                     db: Session = Depends(get_db)) -> User:
-    payload = decode_token(cred.credentials)
-    uid = int(payload.get("sub", "0"))
-    user = db.query(User).get(uid)
-    if not user:
+# -----------------------------------------------------------------------------
+# Usuário autenticado
+#   - get_current_user: registro imutável do usuário num LRU com TTL; no
+#     acerto, nenhuma ida ao banco. Escritas em `users` chamam invalidate_user.
+#   - get_token_user: confia nas claims assinadas do JWT (sem banco). Só para
+#     endpoints de leitura que precisam apenas de id/e-mail/nome; o claim
+#     is_admin NÃO autoriza nada (admin rebaixado segue com ele até o token
+#     expirar): confirme com cached_user.
+# -----------------------------------------------------------------------------
+@dataclass(frozen=True)
+class AuthUser:
+    id: int
+    name: str
+    email: str
+    is_admin: bool
+    created_at: datetime
+    doc_type: Optional[str] = None
+    doc_number: Optional[str] = None
+    phone: Optional[str] = None
+    cep: Optional[str] = None
+    address: Optional[str] = None
+    number: Optional[str] = None
+    complement: Optional[str] = None
+    district: Optional[str] = None
+    city: Optional[str] = None
+    state: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, u: User) -> "AuthUser":
+        return cls(**{f.name: getattr(u, f.name) for f in fields(cls)})
+
+@dataclass(frozen=True)
+class TokenUser:
+    id: int
+    email: str
+    name: str
+    is_admin: bool
+
+user_cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+# geração das invalidações: uma leitura iniciada antes de uma invalidação não
+# repovoa o cache com dados velhos
+_user_gen = 0
+_user_gen_lock = threading.Lock()
+user_invalidation_listeners: List[Callable[[Optional[int]], None]] = []
+
+def invalidate_user(uid: Optional[int] = None, broadcast: bool = True) -> None:
+    """Descarta o usuário `uid` do cache (ou todos, sem argumento)."""
+    global _user_gen
+    with _user_gen_lock:
+        _user_gen += 1
+        if uid is None:
+            user_cache.clear()
+        else:
+            user_cache.pop(uid)
+    if broadcast:
+        # outros processos (backend/coherence.py)
+        for notify in user_invalidation_listeners:
+            notify(uid)
+
+def _load_user(uid: int) -> Optional[AuthUser]:
+    gen = _user_gen
+    db = ReadSessionLocal()
+    try:
+        u = db.get(User, uid)
+        user = AuthUser.from_model(u) if u else None
+    finally:
+        db.close()
+    if user is not None:
+        with _user_gen_lock:
+            if gen == _user_gen:
+                user_cache.set(uid, user)
+    return user
+
+def _token_subject(payload: Dict[str, Any]) -> int:
+    try:
+        return int(payload.get("sub", "0"))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido ou expirado")
+
+async def cached_user(uid: int) -> Optional[AuthUser]:
+    """Usuário atual (cache com invalidação; banco no miss); None se não existe mais."""
+    user = user_cache.get(uid)
+    if user is None:
+        user = await run_in_threadpool(_load_user, uid)
+    return user
+
+async def get_current_user(cred: HTTPAuthorizationCredentials = Depends(bearer)) -> AuthUser:
+    return await get_scoped_user(cred.credentials, None)
+
+async def get_scoped_user(token: str, scope: Optional[str]) -> AuthUser:
+    """Usuário atual de um token com o escopo `scope` (None = token de acesso)."""
+    user = await cached_user(_token_subject(decode_token(token, scope)))
+    if user is None:
         raise HTTPException(status_code=401, detail="Usuário não encontrado")
     return user
 
-def get_current_admin(user: User = Depends(get_current_user)) -> User:
+def get_token_user(cred: HTTPAuthorizationCredentials = Depends(bearer)) -> TokenUser:
+    payload = decode_token(cred.credentials)
+    return TokenUser(
+        id=_token_subject(payload),
+        email=payload.get("email", ""),
+        name=payload.get("name", ""),
+        is_admin=bool(payload.get("is_admin", False)),
+    )
+
+def get_current_admin(user: AuthUser = Depends(get_current_user)) -> AuthUser:
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Acesso restrito ao administrador")
     return user
\ No newline at end of file
@@ -0,0 +1,161 @@
+# backend/build_assets.py
+"""
+Build dos arquivos estáticos do frontend para produção.
+
+    python -m backend.build_assets
+
+Gera frontend/dist/:
+  - static/<css|js|img>/<nome>.<hash>.<ext>  — nome com hash do conteúdo
+  - .gz (e .br, se o pacote `brotli` estiver instalado) ao lado de cada
+    arquivo de texto, quando a versão comprimida for menor
+  - as páginas *.html com as referências /static/... reescritas para os
+    nomes com hash (também com .gz/.br)
+  - manifest.json: caminho original -> caminho com hash
+
+O app (backend/assets.py) passa a servir dist/ automaticamente quando ele
+existe. Rode de novo a cada deploy; o diretório é trocado de uma vez, sem
+deixar um build pela metade visível.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+from .assets import DIST_DIR, FRONTEND_DIR, MANIFEST_NAME
+
+try:
+    import brotli   # opcional: pip install brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+HASH_LEN = 10
+ASSET_DIRS = ("img", "css", "js")
+TEXT_SUFFIXES = {".css", ".js", ".html", ".svg", ".json", ".txt", ".map"}
+MIN_COMPRESS_BYTES = 256
+
+_STATIC_REF = re.compile(r"/static/([A-Za-z0-9_./-]+)")
+
+
+def hashed_name(rel: str, data: bytes) -> str:
+    path = Path(rel)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LEN]
+    return path.with_name(f"{path.stem}.{digest}{path.suffix}").as_posix()
+
+
+def rewrite_refs(text: str, manifest: Dict[str, str]) -> str:
+    """Troca /static/<original> por /static/<com hash> para tudo que está no manifest."""
+    return _STATIC_REF.sub(
+        lambda m: f"/static/{manifest[m.group(1)]}" if m.group(1) in manifest else m.group(0),
+        text,
+    )
+
+
+def _write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if path.suffix not in TEXT_SUFFIXES or len(data) < MIN_COMPRESS_BYTES:
+        return
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        path.with_name(path.name + ".gz").write_bytes(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data):
+            path.with_name(path.name + ".br").write_bytes(br)
+
+
+class AssetCycleError(ValueError):
+    """Arquivos de texto que se referenciam em ciclo: não há ordem de hash possível."""
+
+
+def _text_order(texts: Dict[str, str]) -> List[str]:
+    """
+    Ordena os arquivos de texto para que cada um venha depois dos que ele
+    referencia (/static/...): o hash de a.css só fica estável depois que as
+    referências dele já apontam para os nomes finais dos outros arquivos.
+    """
+    deps = {rel: {m for m in _STATIC_REF.findall(text) if m in texts} for rel, text in texts.items()}
+    order: List[str] = []
+    state: Dict[str, int] = {}   # 1 = visitando, 2 = pronto
+
+    def visit(rel: str, path: List[str]) -> None:
+        if state.get(rel) == 2:
+            return
+        if state.get(rel) == 1:
+            cycle = path[path.index(rel):] + [rel]
+            raise AssetCycleError("referência circular entre assets: " + " -> ".join(cycle))
+        state[rel] = 1
+        for dep in sorted(deps[rel]):
+            visit(dep, path + [rel])
+        state[rel] = 2
+        order.append(rel)
+
+    for rel in sorted(texts):
+        visit(rel, [])
+    return order
+
+
+def build(src: Path = FRONTEND_DIR, out: Path = DIST_DIR) -> Dict[str, str]:
+    files = {
+        p.relative_to(src).as_posix(): p
+        for d in ASSET_DIRS if (src / d).is_dir() for p in sorted((src / d).rglob("*")) if p.is_file()
+    }
+    texts = {rel: p.read_text(encoding="utf-8") for rel, p in files.items() if p.suffix in TEXT_SUFFIXES}
+    order = _text_order(texts)   # falha antes de mexer em qualquer diretório
+
+    tmp = out.with_name(out.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    manifest: Dict[str, str] = {}
+    # binários primeiro: CSS/JS podem referenciá-los (url(/static/img/...))
+    for rel, p in files.items():
+        if rel in texts:
+            continue
+        data = p.read_bytes()
+        manifest[rel] = hashed_name(rel, data)
+        _write(tmp / "static" / manifest[rel], data)
+    # texto em ordem de dependência: quem é referenciado já está no manifest
+    for rel in order:
+        data = rewrite_refs(texts[rel], manifest).encode("utf-8")
+        manifest[rel] = hashed_name(rel, data)
+        _write(tmp / "static" / manifest[rel], data)
+
+    for page in sorted(src.glob("*.html")):
+        html = rewrite_refs(page.read_text(encoding="utf-8"), manifest)
+        _write(tmp / page.name, html.encode("utf-8"))
+
+    (tmp / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+
+    shutil.rmtree(out, ignore_errors=True)
+    tmp.rename(out)
+    return manifest
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Gera frontend/dist com arquivos versionados e pré-comprimidos.")
+    ap.add_argument("--src", type=Path, default=FRONTEND_DIR, help="pasta do frontend")
+    ap.add_argument("--out", type=Path, default=DIST_DIR, help="pasta de saída")
+    args = ap.parse_args(argv)
+
+    try:
+        manifest = build(args.src, args.out)
+    except AssetCycleError as exc:
+        print(f"❌ {exc}", file=sys.stderr)
+        return 1
+    for original, hashed in sorted(manifest.items()):
+        print(f"{original} -> {hashed}")
+    if brotli is None:
+        print("(pacote brotli não instalado: só variantes .gz)")
+    print(f"✅ {len(manifest)} arquivo(s) em {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
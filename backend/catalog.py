@@ -0,0 +1,100 @@
+# backend/catalog.py
+"""
+Snapshot versionado do catálogo público.
+
+Cada "forma" de consulta do GET /api/products (q, categoria, ...) é
+serializada uma única vez para bytes JSON e servida da memória com
+ETag forte. Os endpoints de escrita do admin chamam `invalidate()`,
+que incrementa a versão — as entradas antigas deixam de ser alcançáveis
+e são descartadas.
+
+A versão gzip do corpo (quando grande o bastante) também é gerada uma
+única vez, junto com o snapshot.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Hashable, List, Optional
+
+from fastapi import Request, Response
+
+from . import fastjson
+from .cache import LRUCache
+
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    body: bytes
+    etag: str
+    gzipped: Optional[bytes] = None
+
+    @property
+    def gzip_etag(self) -> str:
+        return self.etag[:-1] + '-gz"'
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+class CatalogSnapshots:
+    def __init__(self, maxsize: int = CATALOG_CACHE_SIZE):
+        self._version = 0
+        self._lock = threading.Lock()
+        self._cache = LRUCache(maxsize=maxsize)
+        self.listeners: List[Callable[[], None]] = []
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self, broadcast: bool = True) -> None:
+        with self._lock:
+            self._version += 1
+        self._cache.clear()
+        if broadcast:
+            # outros processos (backend/coherence.py)
+            for notify in self.listeners:
+                notify()
+
+    def get(self, key: Hashable, build: Callable[[], bytes]) -> Snapshot:
+        # a versão entra na chave: um build concorrente com invalidate()
+        # grava numa versão que ninguém mais consulta
+        def _build() -> Snapshot:
+            body = build()
+            return Snapshot(body=body, etag=make_etag(body), gzipped=fastjson.compress(body))
+
+        return self._cache.get_or_build((self._version, key), _build)
+
+
+def respond(request: Request, snap: Snapshot) -> Response:
+    body, etag = snap.body, snap.etag
+    headers = {"Cache-Control": "no-cache"}
+    if snap.gzipped is not None:
+        headers["Vary"] = "Accept-Encoding"
+        if fastjson.accepts_gzip(request):
+            body, etag = snap.gzipped, snap.gzip_etag
+            headers["Content-Encoding"] = "gzip"
+    headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+snapshots = CatalogSnapshots()
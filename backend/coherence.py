@@ -0,0 +1,158 @@
+# backend/coherence.py
+"""
+Coerência dos caches em memória entre processos (vários workers do uvicorn).
+
+Cada worker tem os próprios caches (snapshots do catálogo, usuários da
+autenticação). Quando um worker invalida um cache, ele também incrementa
+a versão do canal na tabela `cache_versions` (um UPDATE curto, só nas
+escritas do admin). O incremento é feito pela thread de coerência, não
+pela requisição: quem invalida pode estar segurando a única conexão de
+escrita (pool de tamanho 1) e esperaria por ela mesma.
+Uma thread por worker lê essa tabela a cada
+COHERENCE_POLL_SECONDS (um SELECT de poucas linhas, na conexão de leitura)
+e, quando uma versão mudou, limpa o cache local correspondente.
+
+Depois de uma escrita, os outros workers podem servir o dado antigo por
+até um intervalo de polling. Canais:
+
+- "catalog": catalog.snapshots (produtos, facetas)
+- "users":   auth.user_cache (o cache inteiro; a TTL já é curta)
+- "orders":  não é cache: acorda os long-polls de status de pedido
+             (backend/orderstatus.py) quando outro worker mudou um pedido
+- "events":  idem, para o feed SSE do admin (backend/events.py)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import select
+
+from . import auth, catalog, events, orderstatus
+from .database import dialect_insert, engine, read_engine
+from .models import CacheVersion
+
+log = logging.getLogger(__name__)
+
+COHERENCE_POLL_SECONDS = float(os.getenv("COHERENCE_POLL_SECONDS", "0.5"))
+
+
+def _clear_catalog() -> None:
+    catalog.snapshots.invalidate(broadcast=False)
+
+
+def _clear_users() -> None:
+    auth.invalidate_user(None, broadcast=False)
+
+
+CHANNELS: Dict[str, Callable[[], None]] = {
+    "catalog": _clear_catalog,
+    "users": _clear_users,
+    "orders": orderstatus.hub.notify_all,
+    "events": events.bus.wake,
+}
+
+
+class Coherence:
+    def __init__(self, poll_seconds: float = COHERENCE_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._known: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._pending: set = set()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- publicação (worker que escreveu) ----------------------------------
+    def publish(self, name: str) -> None:
+        """Agenda o incremento de `name` (não bloqueia; chamado de dentro das requisições)."""
+        if self._thread is None:
+            return   # processo único / sem polling: não há ninguém para avisar
+        with self._lock:
+            self._pending.add(name)
+        self._wake.set()
+
+    def bump(self, name: str) -> None:
+        try:
+            with engine.begin() as conn:
+                insert = dialect_insert(conn)
+                stmt = insert(CacheVersion.__table__).values(name=name, version=1)
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=["name"], set_={"version": CacheVersion.version + 1},
+                ))
+                version = conn.execute(select(CacheVersion.version).where(CacheVersion.name == name)).scalar()
+        except Exception:
+            # o cache local já foi limpo; os outros workers se acertam no próximo bump/TTL
+            log.exception("coerência: falha ao publicar invalidação de %s", name)
+            return
+        with self._lock:
+            # a própria invalidação não precisa voltar pelo polling
+            if version == self._known.get(name, 0) + 1:
+                self._known[name] = version
+
+    # ---- polling (todos os workers) ----------------------------------------
+    def poll_once(self, baseline: bool = False) -> None:
+        with read_engine.connect() as conn:
+            rows = conn.execute(select(CacheVersion.name, CacheVersion.version)).all()
+        stale = []
+        with self._lock:
+            for name, version in rows:
+                if version != self._known.get(name, 0):
+                    self._known[name] = version
+                    if not baseline:
+                        stale.append(name)
+        for name in stale:
+            clear = CHANNELS.get(name)
+            if clear is not None:
+                clear()
+
+    def start(self) -> None:
+        if self._thread is not None or self.poll_seconds <= 0:
+            return
+        try:
+            self.poll_once(baseline=True)   # versões atuais, sem limpar nada
+        except Exception:
+            log.exception("coerência: leitura inicial falhou")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-coherence", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 2) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _flush(self) -> None:
+        with self._lock:
+            names, self._pending = self._pending, set()
+        for name in sorted(names):
+            self.bump(name)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            self._flush()
+            try:
+                self.poll_once()
+            except Exception:
+                log.exception("coerência: polling falhou")
+
+
+coherence = Coherence()
+
+
+def install() -> None:
+    """Liga as invalidações locais à publicação entre processos."""
+    if not catalog.snapshots.listeners:
+        catalog.snapshots.listeners.append(lambda: coherence.publish("catalog"))
+    if not auth.user_invalidation_listeners:
+        auth.user_invalidation_listeners.append(lambda uid: coherence.publish("users"))
+    if not orderstatus.hub.listeners:
+        orderstatus.hub.listeners.append(lambda: coherence.publish("orders"))
+    if not events.bus.listeners:
+        events.bus.listeners.append(lambda: coherence.publish("events"))
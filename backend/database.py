@@ -1,22 +1,129 @@
 # backend/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 from pathlib import Path
+import os
 
 DB_PATH = Path(__file__).resolve().parent.parent / "soutech.db"
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    future=True,
-)
+# DATABASE_URL escolhe o backend (ex.: postgresql+psycopg2://user:pw@host/soutech);
+# sem ela, continua o SQLite local em soutech.db
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or f"sqlite:///{DB_PATH}"
+DIALECT = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name()
+IS_SQLITE = DIALECT == "sqlite"
+
+# -----------------------------------------------------------------------------
+# Perfil de armazenamento (SQLite em produção)
+#   - WAL: leitores não bloqueiam o escritor e vice-versa
+#   - synchronous=NORMAL: seguro em WAL, sem fsync a cada commit
+#   - busy_timeout: espera o lock em vez de estourar "database is locked"
+#   - cache_size (KiB por conexão), mmap_size, temp_store em memória
+# -----------------------------------------------------------------------------
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", str(min(16, (os.cpu_count() or 2) * 2))))
+
+# -----------------------------------------------------------------------------
+# Pool para servidores (PostgreSQL): por processo/worker do uvicorn.
+# Total de conexões no banco ~= workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+# -----------------------------------------------------------------------------
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")   # opcional: réplica de leitura
+
+
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        if not read_only:
+            cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cur.execute("PRAGMA query_only=1")
+        cur.close()
+    return on_connect
+
+
+def _sqlite_engine(url: str, read_only: bool):
+    eng = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        # escritor único e serializado; leitores num pool dimensionado pelos cores
+        pool_size=SQLITE_READ_POOL_SIZE if read_only else 1,
+        max_overflow=0,
+        pool_timeout=30,
+        future=True,
+    )
+    event.listen(eng, "connect", _sqlite_pragmas(read_only))
+    return eng
+
+
+def _server_engine(url: str):
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        future=True,
+    )
+
+
+def make_engine(url: str, read_only: bool = False):
+    """Engine configurado para o dialeto de `url` (usado também pelo migrate_db)."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return _sqlite_engine(url, read_only)
+    return _server_engine(url)
+
+
+if IS_SQLITE:
+    engine = make_engine(SQLALCHEMY_DATABASE_URL)                        # escrita
+    read_engine = make_engine(SQLALCHEMY_DATABASE_URL, read_only=True)   # somente leitura
+else:
+    engine = make_engine(SQLALCHEMY_DATABASE_URL)
+    read_engine = make_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+    if DIALECT == "postgresql":
+        read_engine = read_engine.execution_options(postgresql_readonly=True)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, future=True)
 Base = declarative_base()
 
+
+def dialect_insert(bind):
+    """`insert()` do dialeto, com suporte a ON CONFLICT (upsert) no SQLite e no PostgreSQL."""
+    name = bind.dialect.name
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"upsert não suportado no dialeto {name}")
+    return insert
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+get_write_db = get_db
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
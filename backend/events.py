@@ -0,0 +1,301 @@
+# backend/events.py
+"""
+Feed de eventos do painel do admin (Server-Sent Events).
+
+    GET /api/admin/events?ticket=...      (text/event-stream)
+
+Quem muda pedido, produto ou usuário chama `publish(db, tipo, dados)`
+ANTES do commit: o evento vira uma linha de `admin_events` na mesma
+transação (não existe evento de mudança desfeita, nem mudança sem
+evento). Depois do commit:
+
+- o `bus` do próprio processo acorda e lê as linhas novas (id > último
+  visto), guarda no ring buffer (os EVENTS_BUFFER mais recentes) e
+  entrega a cada conexão SSE aberta neste worker;
+- os outros workers são avisados pelo canal "events" de
+  backend/coherence.py e fazem a mesma leitura.
+
+O id do evento é o id da linha, igual em todos os workers: o navegador
+reconecta com `Last-Event-ID` (ou `?last_id=`) em qualquer worker e
+recebe o que perdeu a partir do ring buffer. O cursor só anda por ids
+contíguos: no PostgreSQL, com escritores concorrentes, o id 11 pode
+aparecer (commit) antes do 10. Um buraco segura as linhas seguintes até
+ser preenchido ou ter mais de EVENTS_GAP_SECONDS (transação desfeita
+também deixa buraco na sequence); um commit que chegue depois disso é
+perdido pelo feed. No SQLite (um escritor por vez) não há buraco. Se o buraco for maior que o
+buffer (ou a fila da conexão encher), recebe um evento `reset` e recarrega
+as listas. A tabela é aparada para o tamanho do buffer.
+
+Tipos: order.created, order.updated, product.created, product.updated,
+product.deleted, products.reload (importação em massa), user.created,
+user.updated.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+import anyio
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+
+from . import fastjson
+from .database import SessionLocal, engine, read_engine
+from .models import AdminEvent, Order
+
+log = logging.getLogger(__name__)
+
+EVENTS_BUFFER = int(os.getenv("EVENTS_BUFFER", "1000"))
+EVENTS_QUEUE = int(os.getenv("EVENTS_QUEUE", "500"))                 # por conexão
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+# rede de segurança com conexões abertas (o normal é ser acordado pelo commit/coerência)
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "5"))
+EVENTS_TICKET_SECONDS = int(os.getenv("EVENTS_TICKET_SECONDS", "60"))
+# a conexão fecha sozinha depois disso e o navegador volta com Last-Event-ID
+# (não prende shutdown/reload do uvicorn nem conexões esquecidas)
+EVENTS_MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
+# espera por um id que ainda não apareceu antes de pular o buraco (PostgreSQL)
+EVENTS_GAP_SECONDS = float(os.getenv("EVENTS_GAP_SECONDS", "5"))
+
+_PENDING = "events_pending"   # chave em Session.info
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    data: str   # JSON
+
+    def frame(self) -> bytes:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n".encode("utf-8")
+
+
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+
+
+# -----------------------------------------------------------------------------
+# Publicação (na transação de quem mudou o dado)
+# -----------------------------------------------------------------------------
+def publish(db: Session, type_: str, data: Dict[str, Any]) -> None:
+    db.add(AdminEvent(type=type_, data=fastjson.dumps(data).decode("utf-8")))
+    db.info[_PENDING] = True
+
+
+def emit(type_: str, data: Dict[str, Any]) -> None:
+    """Publica numa transação própria (para quem escreve fora de uma Session)."""
+    db = SessionLocal()
+    try:
+        publish(db, type_, data)
+        db.commit()
+    finally:
+        db.close()
+
+
+def order_data(order: Order) -> Dict[str, Any]:
+    return {
+        "id": order.id,
+        "status": order.status,
+        "total_amount": float(order.total_amount or 0),
+        "customer_name": order.customer_name,
+        "customer_email": order.customer_email,
+        "created_at": order.created_at,
+    }
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_PENDING, None):
+        bus.wake()
+        for notify in bus.listeners:
+            notify()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+# -----------------------------------------------------------------------------
+# Bus do processo
+# -----------------------------------------------------------------------------
+@dataclass(eq=False)
+class Subscription:
+    loop: asyncio.AbstractEventLoop
+    queue: "asyncio.Queue[bytes]"
+    backlog: List[bytes] = field(default_factory=list)
+
+    def put(self, frame: bytes) -> None:
+        # roda no event loop da conexão
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # cliente lento: descarta o que está na fila e manda recarregar
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET_FRAME)
+
+
+class EventBus:
+    def __init__(self, size: int = EVENTS_BUFFER):
+        self.size = max(1, size)
+        self._buffer: Deque[Event] = deque(maxlen=self.size)
+        self._last_id: Optional[int] = None
+        self._lock = threading.Lock()        # buffer + inscrições
+        self._pull_lock = threading.Lock()   # uma leitura da tabela por vez
+        self._subs: Set[Subscription] = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._since_trim = 0
+        self._gap_since: Optional[float] = None   # desde quando o próximo id está faltando
+        self.listeners: List[Callable[[], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    # ---- leitura da tabela --------------------------------------------------
+    def pull(self) -> int:
+        """Traz as linhas novas para o buffer e entrega às conexões; devolve quantas."""
+        with self._pull_lock:
+            with read_engine.connect() as conn:
+                q = select(AdminEvent.id, AdminEvent.type, AdminEvent.data)
+                if self._last_id is None:
+                    # primeira leitura: só o que cabe no buffer
+                    rows = conn.execute(q.order_by(AdminEvent.id.desc()).limit(self.size)).all()[::-1]
+                else:
+                    rows = conn.execute(
+                        q.where(AdminEvent.id > self._last_id).order_by(AdminEvent.id).limit(self.size)
+                    ).all()
+            with self._lock:
+                if self._last_id is None:
+                    self._last_id = rows[-1].id if rows else 0
+                    self._buffer.extend(Event(*r) for r in rows)
+                    return 0
+                delivered = 0
+                for r in rows:
+                    if r.id != self._last_id + 1:
+                        now = time.monotonic()
+                        if self._gap_since is None:
+                            self._gap_since = now
+                        if now - self._gap_since < EVENTS_GAP_SECONDS:
+                            break   # o id que falta ainda pode estar para commitar
+                    self._gap_since = None
+                    ev = Event(*r)
+                    self._buffer.append(ev)
+                    frame = ev.frame()
+                    for sub in self._subs:
+                        sub.loop.call_soon_threadsafe(sub.put, frame)
+                    self._last_id = r.id
+                    delivered += 1
+            self._since_trim += delivered
+            if delivered == self.size:
+                self._wake.set()   # há mais: próxima volta do laço continua
+            return delivered
+
+    def _trim(self) -> None:
+        if self._since_trim < self.size or not self._last_id:
+            return
+        self._since_trim = 0
+        with engine.begin() as conn:
+            conn.execute(delete(AdminEvent).where(AdminEvent.id <= self._last_id - self.size))
+
+    # ---- conexões SSE -------------------------------------------------------
+    def subscribe(self, last_id: Optional[int]) -> Subscription:
+        """
+        Inscreve a conexão (no event loop, depois de um `pull()`).
+        `backlog` traz os eventos depois de `last_id`, ou um reset se eles
+        já saíram do buffer.
+        """
+        sub = Subscription(asyncio.get_running_loop(), asyncio.Queue(maxsize=EVENTS_QUEUE))
+        with self._lock:
+            if last_id is not None:
+                oldest = self._buffer[0].id if self._buffer else (self._last_id or 0) + 1
+                if last_id + 1 < oldest or last_id > (self._last_id or 0):
+                    sub.backlog.append(RESET_FRAME)
+                else:
+                    sub.backlog.extend(ev.frame() for ev in self._buffer if ev.id > last_id)
+            self._subs.add(sub)
+        self._wake.set()   # o laço passa a fazer a rede de segurança
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subs.discard(sub)
+
+    # ---- thread -------------------------------------------------------------
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="admin-events", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 2) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.pull()
+                self._trim()
+            except Exception:
+                log.exception("eventos do admin: leitura falhou")
+            # sem conexões abertas, só acorda quando há commit (local ou de outro worker);
+            # com um buraco pendente, volta logo para ver se ele foi preenchido
+            if self._gap_since is not None:
+                timeout = min(EVENTS_POLL_SECONDS, 0.2)
+            else:
+                timeout = EVENTS_POLL_SECONDS if self._subs else None
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+
+bus = EventBus()
+
+
+def install() -> None:
+    """Liga a publicação ao commit de qualquer Session; idempotente."""
+    if event.contains(Session, "after_commit", _after_commit):
+        return
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+
+
+def parse_last_id(value: Optional[str]) -> Optional[int]:
+    value = (value or "").strip()
+    return int(value) if value.isdigit() else None
+
+
+async def stream(last_id: Optional[int]):
+    """Corpo do text/event-stream; a inscrição é desfeita quando o cliente desconecta."""
+    await anyio.to_thread.run_sync(bus.pull)   # buffer em dia antes de calcular o que falta
+    sub = bus.subscribe(last_id)
+    deadline = sub.loop.time() + EVENTS_MAX_STREAM_SECONDS
+    try:
+        yield b"retry: 3000\n\n"
+        for frame in sub.backlog:
+            yield frame
+        sub.backlog = []
+        while True:
+            remaining = deadline - sub.loop.time()
+            if remaining <= 0:
+                return
+            try:
+                frame = await asyncio.wait_for(sub.queue.get(), min(EVENTS_KEEPALIVE_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"   # mantém proxies e o navegador sabendo que a conexão vive
+                continue
+            yield frame
+    finally:
+        bus.unsubscribe(sub)
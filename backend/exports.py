@@ -0,0 +1,161 @@
+# backend/exports.py
+"""
+Exportações do admin (pedidos, itens de pedido e clientes) em streaming.
+
+    GET /api/admin/export/orders?format=csv&date_from=2024-01-01&date_to=2024-01-31&status=approved
+    GET /api/admin/export/order_items?format=ndjson&gzip=true
+    GET /api/admin/export/customers
+
+O gerador abre a PRÓPRIA sessão de leitura (a do Depends fecharia antes do
+fim do corpo) e lê com `yield_per`: no PostgreSQL vira cursor no servidor,
+no SQLite o cursor já é preguiçoso. Cada partição de EXPORT_CHUNK_ROWS
+linhas é codificada e enviada antes de ler a próxima, então a memória não
+depende do tamanho da exportação. Com gzip=true o arquivo sai como .gz,
+comprimido pedaço a pedaço.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import os
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from . import fastjson
+from .database import ReadSessionLocal
+from .models import Order, OrderItem, User
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+# -----------------------------------------------------------------------------
+# O que cada exportação lê (colunas na ordem do arquivo)
+# -----------------------------------------------------------------------------
+ORDER_COLUMNS = (
+    Order.id, Order.created_at, Order.status, Order.total_amount, Order.customer_name,
+    Order.customer_email, Order.user_id, Order.mp_preference_id, Order.mp_payment_id,
+)
+ORDER_ITEM_COLUMNS = (
+    OrderItem.order_id, Order.created_at.label("order_created_at"), Order.status.label("order_status"),
+    OrderItem.id.label("item_id"), OrderItem.product_id, OrderItem.sku, OrderItem.name,
+    OrderItem.unit_price, OrderItem.quantity,
+)
+# sem password_hash, claro
+CUSTOMER_COLUMNS = (
+    User.id, User.name, User.email, User.is_admin, User.created_at, User.doc_type, User.doc_number,
+    User.phone, User.cep, User.address, User.number, User.complement, User.district, User.city, User.state,
+)
+
+
+def _order_filters(date_from: Optional[date], date_to: Optional[date], statuses: List[str]):
+    conds = []
+    if date_from:
+        conds.append(Order.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:   # dia inteiro incluído
+        conds.append(Order.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if statuses:
+        conds.append(Order.status.in_(statuses))
+    return conds
+
+
+def _orders_query(date_from, date_to, statuses):
+    return (
+        select(*ORDER_COLUMNS)
+        .where(*_order_filters(date_from, date_to, statuses))
+        .order_by(Order.created_at, Order.id)
+    )
+
+
+def _order_items_query(date_from, date_to, statuses):
+    return (
+        select(*ORDER_ITEM_COLUMNS)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(*_order_filters(date_from, date_to, statuses))
+        .order_by(Order.created_at, Order.id, OrderItem.id)
+    )
+
+
+def _customers_query(date_from, date_to, statuses):
+    conds = []
+    if date_from:
+        conds.append(User.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        conds.append(User.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return select(*CUSTOMER_COLUMNS).where(*conds).order_by(User.id)
+
+
+# kind -> (montagem da query, se aceita filtro de status)
+KINDS: Dict[str, Tuple[Callable, bool]] = {
+    "orders": (_orders_query, True),
+    "order_items": (_order_items_query, True),
+    "customers": (_customers_query, False),
+}
+
+
+# -----------------------------------------------------------------------------
+# Codificação
+# -----------------------------------------------------------------------------
+def _cell(v):
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.isoformat(timespec="seconds")
+    return v
+
+
+def _csv_chunks(header: List[str], partitions: Iterable[list]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for rows in partitions:
+        writer.writerows([_cell(v) for v in r] for r in rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(header: List[str], partitions: Iterable[list]) -> Iterator[bytes]:
+    for rows in partitions:
+        yield b"".join(fastjson.dumps(dict(zip(header, r))) + b"\n" for r in rows)
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    z = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)   # 31 = cabeçalho gzip
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def stream(kind: str, fmt: str, gzip: bool = False, date_from: Optional[date] = None,
+           date_to: Optional[date] = None, statuses: Optional[List[str]] = None) -> Iterator[bytes]:
+    """Gerador síncrono com o corpo da exportação (o StreamingResponse roda no threadpool)."""
+    build, _ = KINDS[kind]
+    query = build(date_from, date_to, statuses or [])
+
+    def body() -> Iterator[bytes]:
+        db = ReadSessionLocal()
+        try:
+            result = db.execute(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+            header = list(result.keys())
+            encode = _csv_chunks if fmt == "csv" else _ndjson_chunks
+            yield from encode(header, result.partitions())
+        finally:
+            db.close()
+
+    return _gzip(body()) if gzip else body()
+
+
+def filename(kind: str, fmt: str, gzip: bool) -> str:
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    return f"{kind}-{stamp}.{fmt}" + (".gz" if gzip else "")
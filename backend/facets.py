@@ -0,0 +1,282 @@
+# backend/facets.py
+"""
+Categorias e tags normalizadas, com contadores mantidos incrementalmente.
+
+- `categories` / `tags` guardam o nome e `product_count` (produtos ATIVOS)
+- `products.category_id` e `product_tags(product_id, tag_id)` ligam o produto
+- os textos `products.category` e `products.tags` continuam existindo (saída
+  da API e índice de busca), já normalizados
+
+As escritas do admin chamam `state()` antes de alterar o produto e
+`sync_product()` / `remove_product()` depois do flush, na mesma transação:
+só os contadores que mudaram recebem um `UPDATE ... + delta`. `rebuild()`
+recalcula tudo a partir de `products` (migração/backfill). A importação em
+massa usa as versões em lote `states()` / `sync_many()`.
+
+As funções aceitam Session ou Connection (só usam `execute`).
+"""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, delete, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from .database import dialect_insert
+from .models import Category, Product, ProductTag, Tag
+
+TAG_MAX_LEN = 60
+TAG_MODES = ("all", "any")
+
+
+def _bind(db):
+    return db.get_bind() if isinstance(db, Session) else db
+
+
+# ---- normalização -----------------------------------------------------------
+def normalize_category(name: Optional[str]) -> str:
+    return " ".join((name or "").split())[:120]
+
+
+def clean_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """Tags como o admin digitou (o que vai em `products.tags`): sem espaços
+    nas pontas, sem vazios/duplicados ignorando maiúsculas (ordem preservada)"""
+    out: List[str] = []
+    seen = set()
+    for t in tags or []:
+        t = " ".join(str(t).split())[:TAG_MAX_LEN]
+        if t and t.lower() not in seen:
+            seen.add(t.lower())
+            out.append(t)
+    return out
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """Chaves de faceta/busca: as tags de clean_tags em minúsculas"""
+    return [t.lower() for t in clean_tags(tags)]
+
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    return normalize_tags((tags or "").split(","))
+
+
+# ---- estado e contadores ----------------------------------------------------
+@dataclass(frozen=True)
+class FacetState:
+    active: bool
+    category_id: Optional[int]
+    tag_ids: FrozenSet[int]
+
+
+def state(db, pr) -> Optional[FacetState]:
+    """Estado atual (no banco) das facetas de `pr`; chamar ANTES de alterá-lo."""
+    if pr.id is None:
+        return None
+    tag_ids = db.execute(select(ProductTag.tag_id).where(ProductTag.product_id == pr.id)).scalars()
+    return FacetState(bool(pr.active), pr.category_id, frozenset(tag_ids))
+
+
+def states(db, rows) -> Dict[int, FacetState]:
+    """`state()` em lote para linhas (id, active, category_id) já lidas do banco."""
+    rows = list(rows)
+    tags: Dict[int, set] = {r.id: set() for r in rows}
+    if rows:
+        for pid, tid in db.execute(
+            select(ProductTag.product_id, ProductTag.tag_id).where(ProductTag.product_id.in_(list(tags)))
+        ):
+            tags[pid].add(tid)
+    return {r.id: FacetState(bool(r.active), r.category_id, frozenset(tags[r.id])) for r in rows}
+
+
+def _ensure(db, model, names: List[str]) -> Dict[str, int]:
+    if not names:
+        return {}
+    insert = dialect_insert(_bind(db))
+    db.execute(
+        insert(model.__table__)
+        .values([{"name": n, "product_count": 0} for n in names])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    rows = db.execute(select(model.id, model.name).where(model.name.in_(names)))
+    return {name: id_ for id_, name in rows}
+
+
+def ensure_categories(db, names: List[str]) -> Dict[str, int]:
+    return _ensure(db, Category, [n for n in names if n])
+
+
+def ensure_tags(db, names: List[str]) -> Dict[str, int]:
+    return _ensure(db, Tag, names)
+
+
+def _bump(db, model, deltas: Counter) -> None:
+    by_delta: Dict[int, List[int]] = {}
+    for id_, d in deltas.items():
+        if d:
+            by_delta.setdefault(d, []).append(id_)
+    for d, ids in by_delta.items():
+        db.execute(
+            update(model.__table__)
+            .where(model.id.in_(ids))
+            .values(product_count=model.product_count + d)
+        )
+
+
+def _delta(cats: Counter, tags: Counter, before: Optional[FacetState], after: Optional[FacetState]) -> None:
+    for st, sign in ((before, -1), (after, 1)):
+        if st is None or not st.active:
+            continue
+        if st.category_id is not None:
+            cats[st.category_id] += sign
+        for tid in st.tag_ids:
+            tags[tid] += sign
+
+
+def adjust(db, before: Optional[FacetState], after: Optional[FacetState]) -> None:
+    """Aplica aos contadores a diferença entre dois estados de um produto."""
+    cats: Counter = Counter()
+    tags: Counter = Counter()
+    _delta(cats, tags, before, after)
+    _bump(db, Category, cats)
+    _bump(db, Tag, tags)
+
+
+def sync_many(db, items: Iterable[Tuple[object, Optional[FacetState]]]) -> Dict[int, FacetState]:
+    """
+    Versão em lote de `sync_product` (importação): `items` são pares
+    (produto, estado anterior). Nomes resolvidos de uma vez, vínculos e
+    contadores em executemany. Devolve o novo estado por id de produto.
+    """
+    items = list(items)
+    if not items:
+        return {}
+    cats = {pr.id: normalize_category(pr.category) for pr, _ in items}
+    tags = {pr.id: parse_tags(pr.tags) for pr, _ in items}
+    cat_ids = ensure_categories(db, sorted(set(cats.values())))
+    tag_ids = ensure_tags(db, sorted({t for ts in tags.values() for t in ts}))
+
+    moved, removed, added = [], [], []
+    cat_delta: Counter = Counter()
+    tag_delta: Counter = Counter()
+    out: Dict[int, FacetState] = {}
+    for pr, before in items:
+        cid = cat_ids.get(cats[pr.id])
+        tids = frozenset(tag_ids[t] for t in tags[pr.id])
+        after = FacetState(bool(pr.active), cid, tids)
+        if pr.category_id != cid:
+            moved.append({"pid": pr.id, "cid": cid})
+        old_tags = before.tag_ids if before else frozenset()
+        removed += [{"pid": pr.id, "tid": t} for t in old_tags - tids]
+        added += [{"product_id": pr.id, "tag_id": t} for t in tids - old_tags]
+        _delta(cat_delta, tag_delta, before, after)
+        out[pr.id] = after
+
+    if moved:
+        db.execute(
+            update(Product.__table__).where(Product.id == bindparam("pid")).values(category_id=bindparam("cid")),
+            moved,
+        )
+    if removed:
+        db.execute(
+            delete(ProductTag.__table__).where(
+                ProductTag.product_id == bindparam("pid"), ProductTag.tag_id == bindparam("tid")
+            ),
+            removed,
+        )
+    if added:
+        db.execute(ProductTag.__table__.insert(), added)
+    _bump(db, Category, cat_delta)
+    _bump(db, Tag, tag_delta)
+    return out
+
+
+def sync_product(db, pr, before: Optional[FacetState]) -> FacetState:
+    """
+    Grava category_id/product_tags a partir de `pr.category`/`pr.tags` e
+    ajusta os contadores. Chamar após o flush (o produto precisa de id).
+    """
+    after = sync_many(db, [(pr, before)])[pr.id]
+    pr.category_id = after.category_id
+    return after
+
+
+def remove_product(db, pid: int, before: Optional[FacetState]) -> None:
+    db.execute(delete(ProductTag.__table__).where(ProductTag.product_id == pid))
+    adjust(db, before, None)
+
+
+def rebuild(db) -> None:
+    """Recria product_tags, category_id e contadores a partir dos textos de `products`."""
+    rows = db.execute(select(Product.id, Product.category, Product.tags)).all()
+    cats = {pid: normalize_category(c) for pid, c, _ in rows}
+    tags = {pid: parse_tags(t) for pid, _, t in rows}
+
+    cat_ids = ensure_categories(db, sorted(set(cats.values())))
+    tag_ids = ensure_tags(db, sorted({t for ts in tags.values() for t in ts}))
+
+    if rows:
+        db.execute(
+            update(Product.__table__)
+            .where(Product.id == bindparam("pid"))
+            .values(category_id=bindparam("cid")),
+            [{"pid": pid, "cid": cat_ids.get(c)} for pid, c in cats.items()],
+        )
+    db.execute(delete(ProductTag.__table__))
+    links = [{"product_id": pid, "tag_id": tag_ids[t]} for pid, ts in tags.items() for t in ts]
+    if links:
+        db.execute(ProductTag.__table__.insert(), links)
+
+    active = Product.active.is_(True)
+    db.execute(update(Category.__table__).values(product_count=(
+        select(func.count()).select_from(Product)
+        .where(Product.category_id == Category.id, active)
+        .scalar_subquery()
+    )))
+    db.execute(update(Tag.__table__).values(product_count=(
+        select(func.count()).select_from(ProductTag).join(Product, Product.id == ProductTag.product_id)
+        .where(ProductTag.tag_id == Tag.id, active)
+        .scalar_subquery()
+    )))
+
+
+# ---- consultas --------------------------------------------------------------
+def category_id(db, name: str) -> Optional[int]:
+    return db.execute(select(Category.id).where(Category.name == normalize_category(name))).scalar()
+
+
+def tag_ids(db, names: Iterable[str]) -> Dict[str, int]:
+    names = normalize_tags(names)
+    if not names:
+        return {}
+    return {n: i for i, n in db.execute(select(Tag.id, Tag.name).where(Tag.name.in_(names)))}
+
+
+def tag_filter(ids: List[int], mode: str):
+    """
+    all: um EXISTS por tag (cada um resolvido pela PK product_id+tag_id);
+    any: um EXISTS com IN.
+    """
+    if mode == "any":
+        return exists().where(ProductTag.product_id == Product.id, ProductTag.tag_id.in_(ids))
+    return and_(*[
+        exists().where(ProductTag.product_id == Product.id, ProductTag.tag_id == tid) for tid in ids
+    ])
+
+
+def counts(db) -> dict:
+    cats = db.execute(
+        select(Category.name, Category.product_count)
+        .where(Category.product_count > 0)
+        .order_by(Category.product_count.desc(), Category.name)
+    ).all()
+    tags = db.execute(
+        select(Tag.name, Tag.product_count)
+        .where(Tag.product_count > 0)
+        .order_by(Tag.product_count.desc(), Tag.name)
+    ).all()
+    return {
+        "categories": [{"name": n, "count": c} for n, c in cats],
+        "tags": [{"name": n, "count": c} for n, c in tags],
+    }
@@ -0,0 +1,87 @@
+# backend/fastjson.py
+"""
+Caminho rápido de serialização para as listagens.
+
+As listas grandes (catálogo, produtos e usuários do admin) selecionam só
+as colunas necessárias como tuplas e montam dicts simples, que vão direto
+para bytes JSON, sem instanciar um modelo Pydantic por linha e sem a
+segunda validação/serialização do `response_model`. Os endpoints mantêm o
+`response_model` só para o schema do OpenAPI.
+
+- usa `orjson` se instalado (opcional); senão o json da stdlib
+- respostas acima de JSON_GZIP_MIN_BYTES saem com gzip quando o cliente
+  aceita (Accept-Encoding)
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers
+
+try:
+    import orjson   # opcional: pip install orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+JSON_GZIP_MIN_BYTES = int(os.getenv("JSON_GZIP_MIN_BYTES", "2048"))
+JSON_GZIP_LEVEL = int(os.getenv("JSON_GZIP_LEVEL", "6"))
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"{type(obj).__name__} não é serializável em JSON")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress(body: bytes) -> Optional[bytes]:
+    """Versão gzip de `body`, ou None se for pequeno demais para valer a pena."""
+    if len(body) < JSON_GZIP_MIN_BYTES:
+        return None
+    return gzip.compress(body, compresslevel=JSON_GZIP_LEVEL, mtime=0)
+
+
+def accepted_encodings(headers: Headers) -> set:
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if token and q > 0:
+            accepted.add(token.lower())
+    return accepted
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in accepted_encodings(request.headers)
+
+
+def json_response(request: Request, obj: Any, status_code: int = 200,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    body = dumps(obj)
+    headers = dict(headers or {})
+    gz = compress(body) if accepts_gzip(request) else None
+    if len(body) >= JSON_GZIP_MIN_BYTES:
+        headers["Vary"] = "Accept-Encoding"
+    if gz is not None:
+        headers["Content-Encoding"] = "gzip"
+        body = gz
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,105 @@
+# backend/hashing.py
+"""
+Hash de senhas (bcrypt) num pool de PROCESSOS dedicado.
+
+bcrypt é CPU puro: rodando nos endpoints síncronos ele ocupava o threadpool
+compartilhado do Starlette (40 threads) e disputava o GIL com o resto do
+app. Aqui o trabalho vai para HASH_WORKERS processos; os endpoints fazem
+`await` e o event loop segue livre.
+
+HASH_MAX_PENDING limita a fila (em execução + aguardando). Quando cheia,
+`HashPoolBusy` é levantada e a API responde 503 em vez de empilhar.
+
+Este módulo é importado pelos processos filhos (spawn), então só depende
+de passlib — nada de FastAPI/SQLAlchemy aqui.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(max(1, HASH_WORKERS) * 8)))
+
+# min_rounds faz o needs_update() apontar hashes com custo abaixo do configurado
+pwd_ctx = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+
+class HashPoolBusy(Exception):
+    """Fila do pool de hash cheia."""
+
+
+# ---- funções executadas nos processos do pool -------------------------------
+def hash_password(password: str) -> str:
+    return pwd_ctx.hash(password)
+
+
+def verify_password(password: str, hash_: str) -> bool:
+    return pwd_ctx.verify(password, hash_)
+
+
+def verify_and_check(password: str, hash_: str) -> Tuple[bool, bool]:
+    """(senha confere?, hash precisa ser refeito com o custo atual?)"""
+    ok = pwd_ctx.verify(password, hash_)
+    return ok, bool(ok and pwd_ctx.needs_update(hash_))
+
+
+# ---- pool -------------------------------------------------------------------
+class HashPool:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None      # HASH_WORKERS=0: roda no executor padrão do loop (dev/testes)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy()
+        try:
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(self._get_executor(), fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return await fut
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+pool = HashPool()
+
+
+async def ahash_password(password: str) -> str:
+    return await pool.run(hash_password, password)
+
+
+async def averify_password(password: str, hash_: str) -> Tuple[bool, bool]:
+    return await pool.run(verify_and_check, password, hash_)
@@ -0,0 +1,104 @@
+# backend/idempotency.py
+"""
+Idempotency-Key para POST /api/checkout.
+
+O cliente manda um `Idempotency-Key` (ex.: um UUID gerado ao abrir o
+carrinho). A primeira requisição "reserva" a chave (linha `pending`); ao
+terminar grava a resposta (`done`). Repetições com a mesma chave:
+
+- `done`, mesmo carrinho:   devolvem a resposta original (só uma leitura;
+                            nenhuma escrita, nenhuma chamada ao MP)
+- `done`, outro carrinho:   422 (chave reaproveitada por engano)
+- `pending`:                409 + Retry-After (a original ainda está rodando)
+
+Se a requisição original falha, a reserva é apagada e a mesma chave pode
+ser tentada de novo. Chaves valem por IDEMPOTENCY_TTL_HOURS; uma reserva
+`pending` mais velha que IDEMPOTENCY_PENDING_SECONDS (processo caiu no
+meio) pode ser retomada.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import delete, or_, update
+from sqlalchemy.orm import Session
+
+from .database import dialect_insert
+from .models import IdempotencyKey
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_PENDING_SECONDS = int(os.getenv("IDEMPOTENCY_PENDING_SECONDS", "120"))
+KEY_MAX_LEN = 120
+PURGE_PROBABILITY = 0.01   # a cada ~100 reservas, apaga as chaves vencidas
+
+
+def request_hash(parts: Iterable[Tuple]) -> str:
+    return hashlib.sha256(json.dumps(sorted(parts), separators=(",", ":")).encode()).hexdigest()
+
+
+def _expired(now: datetime):
+    return or_(
+        IdempotencyKey.created_at < now - timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+        (IdempotencyKey.state == "pending")
+        & (IdempotencyKey.created_at < now - timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS)),
+    )
+
+
+def begin(db: Session, user_id: int, key: str, req_hash: str) -> Optional[IdempotencyKey]:
+    """
+    Reserva a chave (com commit). Devolve None se a reserva é nossa (seguir
+    com a requisição) ou a linha existente (replay/conflito).
+    """
+    now = datetime.utcnow()
+    found = db.get(IdempotencyKey, (user_id, key))
+    if found is not None and found.created_at >= now - timedelta(hours=IDEMPOTENCY_TTL_HOURS):
+        if found.state == "done" or found.created_at >= now - timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS):
+            db.expunge(found)
+            return found
+
+    # chave nova ou vencida: reserva (concorrentes disputam pela PK)
+    db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, _expired(now))
+    )
+    insert = dialect_insert(db.get_bind())
+    res = db.execute(
+        insert(IdempotencyKey.__table__)
+        .values(user_id=user_id, key=key, request_hash=req_hash, state="pending", response="", created_at=now)
+        .on_conflict_do_nothing(index_elements=["user_id", "key"])
+    )
+    if random.random() < PURGE_PROBABILITY:
+        db.execute(delete(IdempotencyKey).where(_expired(now)))
+    db.commit()
+    if res.rowcount == 1:
+        return None
+    found = db.get(IdempotencyKey, (user_id, key), populate_existing=True)
+    if found is None:   # a outra requisição falhou e liberou a chave nesse meio-tempo
+        return begin(db, user_id, key, req_hash)
+    db.expunge(found)
+    return found
+
+
+def complete(db: Session, user_id: int, key: str, status_code: int, body: dict) -> None:
+    db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(state="done", status_code=status_code, response=json.dumps(body))
+    )
+    db.commit()
+
+
+def release(db: Session, user_id: int, key: str) -> None:
+    """A requisição falhou: libera a chave para uma nova tentativa."""
+    db.rollback()
+    db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.state == "pending")
+    )
+    db.commit()
+
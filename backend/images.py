@@ -0,0 +1,422 @@
+# backend/images.py
+"""
+Imagens de produto em tamanhos de vitrine (WebP/JPEG) com cache em disco.
+
+    POST /api/admin/images                 (admin; corpo = a imagem crua)
+    GET  /img/o/<sha256>.<ext>             original enviado pelo admin
+    GET  /img/<largura>.<webp|jpg>?src=...&s=...
+
+`Product.image_url` pode ser qualquer URL; a vitrine não deve baixar o
+original inteiro para um card de 300px. `srcset(image_url)` monta as URLs
+por faixa de largura (IMAGE_WIDTHS) e o navegador escolhe a menor que
+serve. Na primeira vez que uma variante é pedida:
+
+- o original é baixado UMA vez (httpx, até IMAGE_MAX_SOURCE_BYTES) ou já
+  está em disco (upload do admin, endereçado pelo sha256 do conteúdo)
+- o redimensionamento roda num pool de PROCESSOS (a mesma classe do
+  bcrypt, backend/hashing.py); o event loop só espera
+- pedidos simultâneos da mesma variante esperam o MESMO trabalho (um
+  download e um resize por processo, nunca um por requisição)
+
+As variantes ficam em IMAGES_DIR/cache/v/, com o nome derivado do sha256
+do original + largura + formato + qualidade: a resposta é imutável e sai
+com `Cache-Control: public, max-age=31536000, immutable`. Uma URL remota é
+tratada como imutável também (trocou a imagem, troque a URL no produto).
+O cache (variantes + originais remotos) tem teto de IMAGE_CACHE_MAX_BYTES;
+passou, os arquivos usados há mais tempo (mtime, renovado no acesso) saem
+primeiro. Uploads não entram nessa conta e nunca são apagados.
+
+Só URLs assinadas (HMAC de `src`, feitas por `srcset`) são aceitas: o
+endpoint não vira um proxy aberto para qualquer endereço.
+
+Pillow é opcional (pip install Pillow): sem ele `srcset` devolve vazio, a
+vitrine usa `image_url` direto e /img/<largura>... redireciona para o
+original. O mesmo vale quando o original não pode ser baixado ou lido.
+
+Este módulo é importado pelos processos filhos (spawn): nada de
+FastAPI/SQLAlchemy aqui.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+import httpx
+
+from .cache import LRUCache
+from .hashing import HashPool, HashPoolBusy
+
+try:
+    from PIL import Image, ImageOps   # opcional: pip install Pillow
+except ImportError:  # pragma: no cover - depende do ambiente
+    Image = ImageOps = None
+
+log = logging.getLogger(__name__)
+
+IMAGES_DIR = Path(os.getenv("IMAGES_DIR", str(Path(__file__).resolve().parent.parent / "media")))
+IMAGE_PROXY = os.getenv("IMAGE_PROXY", "1") not in ("0", "false", "no")
+IMAGE_WIDTHS: Tuple[int, ...] = tuple(sorted({
+    int(w) for w in os.getenv("IMAGE_WIDTHS", "160,320,480,640,960").split(",") if w.strip()
+}))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_MAX_SOURCE_BYTES = int(os.getenv("IMAGE_MAX_SOURCE_BYTES", str(15 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(40_000_000)))   # bomba de descompressão
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+IMAGE_RETRY_SECONDS = float(os.getenv("IMAGE_RETRY_SECONDS", "60"))   # original que falhou
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+IMAGE_MAX_PENDING = int(os.getenv("IMAGE_MAX_PENDING", str(max(1, IMAGE_WORKERS) * 4)))
+IMAGE_SIGNING_KEY = (os.getenv("IMAGE_SIGNING_KEY") or os.getenv("SECRET_KEY", "dev-secret-change-me")).encode()
+
+enabled = IMAGE_PROXY and Image is not None
+
+UPLOADS_DIR = IMAGES_DIR / "uploads"
+CACHE_DIR = IMAGES_DIR / "cache"
+SOURCES_DIR = CACHE_DIR / "src"    # originais remotos, por sha256 do conteúdo
+URLS_DIR = CACHE_DIR / "url"       # sha256(url) -> sha256 do conteúdo
+VARIANTS_DIR = CACHE_DIR / "v"
+
+ORIGINAL_PREFIX = "/img/o/"
+FORMATS = {"webp": "image/webp", "jpg": "image/jpeg"}
+IMMUTABLE = {"Cache-Control": "public, max-age=31536000, immutable"}
+NO_STORE = {"Cache-Control": "no-store"}
+
+# extensão pelos primeiros bytes (não confia no Content-Type do cliente)
+_MAGIC = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+MEDIA_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+_UPLOAD_NAME = re.compile(r"^([0-9a-f]{64})\.(jpg|png|gif|webp)$")
+
+
+class ImageUnavailable(Exception):
+    """Não deu para gerar a variante (original inacessível, inválido, pool cheio...)."""
+
+
+class BadImage(ImageUnavailable):
+    """O arquivo não é uma imagem aceita."""
+
+
+# -----------------------------------------------------------------------------
+# URLs (usadas por _to_out/_product_row)
+# -----------------------------------------------------------------------------
+def sign(src: str) -> str:
+    return hmac.new(IMAGE_SIGNING_KEY, src.encode("utf-8"), hashlib.sha256).hexdigest()[:24]
+
+
+def verify(src: str, sig: str) -> bool:
+    return hmac.compare_digest(sign(src), sig or "")
+
+
+def _proxyable(src: str) -> bool:
+    if src.startswith(ORIGINAL_PREFIX):
+        return _UPLOAD_NAME.match(src[len(ORIGINAL_PREFIX):]) is not None
+    return src.startswith(("http://", "https://"))
+
+
+def variant_url(src: str, width: int, fmt: str) -> str:
+    return f"/img/{width}.{fmt}?src={quote(src, safe='')}&s={sign(src)}"
+
+
+def srcset(image_url: Optional[str]) -> Dict[str, str]:
+    """Campos `image_srcset` (WebP) e `image_srcset_jpeg`; vazios quando não há variante."""
+    src = (image_url or "").strip()
+    if not enabled or not src or not _proxyable(src):
+        return {"image_srcset": "", "image_srcset_jpeg": ""}
+    return {
+        "image_srcset": ", ".join(f"{variant_url(src, w, 'webp')} {w}w" for w in IMAGE_WIDTHS),
+        "image_srcset_jpeg": ", ".join(f"{variant_url(src, w, 'jpg')} {w}w" for w in IMAGE_WIDTHS),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Arquivos
+# -----------------------------------------------------------------------------
+def _sniff(data: bytes) -> Optional[str]:
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    for magic, ext in _MAGIC:
+        if data.startswith(magic):
+            return ext
+    return None
+
+
+def _write(path: Path, data: bytes) -> None:
+    """Grava por arquivo temporário + rename: quem lê nunca vê arquivo pela metade."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def save_upload(data: bytes) -> str:
+    """Guarda o original enviado pelo admin (sha256 do conteúdo) e devolve a URL dele."""
+    ext = _sniff(data)
+    if ext is None:
+        raise BadImage("envie JPEG, PNG, WebP ou GIF")
+    digest = hashlib.sha256(data).hexdigest()
+    path = UPLOADS_DIR / f"{digest}.{ext}"
+    if not path.exists():
+        _write(path, data)
+    return ORIGINAL_PREFIX + path.name
+
+
+def upload_path(name: str) -> Optional[Path]:
+    if _UPLOAD_NAME.match(name) is None:
+        return None
+    path = UPLOADS_DIR / name
+    return path if path.is_file() else None
+
+
+def _variant_path(digest: str, width: int, fmt: str) -> Path:
+    key = hashlib.sha256(f"{digest}:{width}:{fmt}:{IMAGE_QUALITY}".encode()).hexdigest()
+    return VARIANTS_DIR / key[:2] / f"{key}.{fmt}"
+
+
+class DiskLRU:
+    """
+    Teto de bytes para CACHE_DIR. O tamanho é uma estimativa por processo
+    (varredura inicial + o que este processo gravou); quando passa do teto,
+    uma varredura real apaga os arquivos de mtime mais antigo até 90%.
+    """
+
+    TOUCH_SECONDS = 3600   # renovar o mtime no máximo 1x/hora por arquivo
+    KEEP_SECONDS = 60      # arquivos mais novos que isso nunca saem
+
+    def __init__(self, root: Path, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        out = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue   # apagado por outro worker no meio da varredura
+                out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def touch(self, path: Path) -> None:
+        try:
+            if path.stat().st_mtime < time.time() - self.TOUCH_SECONDS:
+                os.utime(path)
+        except OSError:
+            pass
+
+    def added(self, nbytes: int) -> None:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            else:
+                self._size += nbytes
+            over = self.max_bytes > 0 and self._size > self.max_bytes
+        if over:
+            self.trim()
+
+    def trim(self) -> int:
+        """Apaga os menos usados até 90% do teto; devolve quantos bytes saíram."""
+        with self._lock:
+            files = sorted(self._files())
+            total = sum(size for _, size, _ in files)
+            target = int(self.max_bytes * 0.9)
+            fresh = time.time() - self.KEEP_SECONDS
+            freed = 0
+            for mtime, size, path in files:
+                if total - freed <= target or mtime > fresh:
+                    break   # o resto acabou de ser gravado (ou está sendo): vai ser servido agora
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                freed += size
+            self._size = total - freed
+        if freed:
+            log.info("imagens: cache aparado, %d bytes liberados", freed)
+        return freed
+
+
+disk = DiskLRU(CACHE_DIR)
+
+
+# ---- função executada nos processos do pool ---------------------------------
+def resize(src: str, dst: str, width: int, fmt: str, quality: int = IMAGE_QUALITY) -> int:
+    """Gera a variante `dst` com no máximo `width` px de largura; devolve o tamanho em bytes."""
+    try:
+        with Image.open(src) as im:
+            if im.width * im.height > IMAGE_MAX_PIXELS:
+                raise BadImage(f"imagem grande demais ({im.width}x{im.height})")
+            im.draft("RGB", (width, width))   # JPEG: já decodifica reduzida (1/2, 1/4, 1/8)
+            im = ImageOps.exif_transpose(im)
+            if im.width > width:           # nunca amplia
+                im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+            alpha = im.mode in ("RGBA", "LA", "PA") or (im.mode == "P" and "transparency" in im.info)
+            if fmt == "jpg":
+                if alpha:
+                    rgba = im.convert("RGBA")
+                    im = Image.new("RGB", rgba.size, (255, 255, 255))
+                    im.paste(rgba, mask=rgba.getchannel("A"))
+                im = im.convert("RGB")
+                options = {"format": "JPEG", "quality": quality, "optimize": True, "progressive": True}
+            else:
+                im = im.convert("RGBA" if alpha else "RGB")
+                options = {"format": "WEBP", "quality": quality, "method": 4}
+            Path(dst).parent.mkdir(parents=True, exist_ok=True)
+            tmp = f"{dst}.{os.getpid()}.tmp"
+            im.save(tmp, **options)
+    except BadImage:
+        raise
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        raise BadImage(str(exc)) from None
+    os.replace(tmp, dst)
+    return os.path.getsize(dst)
+
+
+# ---- pool -------------------------------------------------------------------
+pool = HashPool(workers=IMAGE_WORKERS, max_pending=IMAGE_MAX_PENDING)
+
+
+# -----------------------------------------------------------------------------
+# Single-flight (por processo, no event loop)
+# -----------------------------------------------------------------------------
+_inflight: Dict[Hashable, "asyncio.Future"] = {}
+
+
+def _forget(key: Hashable, task: "asyncio.Future") -> None:
+    _inflight.pop(key, None)
+    if not task.cancelled():
+        task.exception()   # evita "exception was never retrieved" se todos desistiram
+
+
+async def _once(key: Hashable, build: Callable[[], Awaitable]):
+    """Quem chega com a mesma chave enquanto o trabalho roda espera o mesmo resultado."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(build())
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _forget(key, t))
+    # shield: cliente que desconecta não cancela o trabalho dos outros
+    return await asyncio.shield(task)
+
+
+# -----------------------------------------------------------------------------
+# Originais
+# -----------------------------------------------------------------------------
+_digests = LRUCache(maxsize=4096)                          # url -> sha256 do conteúdo
+_failures = LRUCache(maxsize=1024, ttl=IMAGE_RETRY_SECONDS)
+
+
+def _url_pointer(src: str) -> Path:
+    return URLS_DIR / hashlib.sha256(src.encode("utf-8")).hexdigest()
+
+
+def _known_source(src: str) -> Optional[Tuple[str, Path]]:
+    """(sha256, caminho) do original que já está em disco, sem rede."""
+    if src.startswith(ORIGINAL_PREFIX):
+        path = upload_path(src[len(ORIGINAL_PREFIX):])
+        return (path.name.split(".")[0], path) if path is not None else None
+    digest = _digests.get(src)
+    if digest is None:
+        try:
+            digest = _url_pointer(src).read_text().strip()
+        except OSError:
+            return None
+    path = SOURCES_DIR / digest
+    if not path.is_file():
+        return None
+    _digests.set(src, digest)
+    return digest, path
+
+
+async def _download(src: str) -> bytes:
+    data = bytearray()
+    try:
+        async with httpx.AsyncClient(timeout=IMAGE_FETCH_TIMEOUT, follow_redirects=True, max_redirects=3) as client:
+            async with client.stream("GET", src, headers={"Accept": "image/*"}) as r:
+                if r.status_code != 200:
+                    raise ImageUnavailable(f"HTTP {r.status_code}")
+                async for chunk in r.aiter_bytes():
+                    data += chunk
+                    if len(data) > IMAGE_MAX_SOURCE_BYTES:
+                        raise ImageUnavailable("original grande demais")
+    except httpx.HTTPError as exc:
+        raise ImageUnavailable(f"download falhou: {exc!r}") from None
+    if _sniff(bytes(data[:16])) is None:
+        raise BadImage("o endereço não devolveu JPEG, PNG, WebP ou GIF")
+    return bytes(data)
+
+
+async def _fetch(src: str) -> Tuple[str, Path]:
+    data = await _download(src)
+    digest = hashlib.sha256(data).hexdigest()
+    path = SOURCES_DIR / digest
+
+    def store() -> None:
+        if not path.exists():
+            _write(path, data)
+        _write(_url_pointer(src), digest.encode())
+        disk.added(len(data) + len(digest))
+
+    await anyio.to_thread.run_sync(store)
+    _digests.set(src, digest)
+    return digest, path
+
+
+async def _source(src: str) -> Tuple[str, Path]:
+    known = _known_source(src)
+    if known is not None:
+        return known
+    if src.startswith(ORIGINAL_PREFIX):
+        raise ImageUnavailable("upload não encontrado")
+    return await _once(("src", src), lambda: _fetch(src))
+
+
+# -----------------------------------------------------------------------------
+# Variantes
+# -----------------------------------------------------------------------------
+async def _build(src: str, width: int, fmt: str) -> Path:
+    digest, original = await _source(src)
+    path = _variant_path(digest, width, fmt)
+    if path.exists():
+        return path   # outro worker acabou de gerar
+    size = await pool.run(resize, str(original), str(path), width, fmt, IMAGE_QUALITY)
+    await anyio.to_thread.run_sync(disk.added, size)
+    return path
+
+
+async def variant(src: str, width: int, fmt: str) -> Path:
+    """Caminho da variante em disco (gerando se preciso). Levanta ImageUnavailable."""
+    if not enabled:
+        raise ImageUnavailable("Pillow não instalado")
+    known = _known_source(src)
+    if known is not None:
+        path = _variant_path(known[0], width, fmt)
+        if path.exists():
+            disk.touch(path)
+            return path
+    if _failures.get(src):
+        raise ImageUnavailable("original falhou há pouco")
+    try:
+        return await _once(("v", src, width, fmt), lambda: _build(src, width, fmt))
+    except HashPoolBusy:
+        raise ImageUnavailable("pool de imagens ocupado") from None
+    except ImageUnavailable:
+        _failures.set(src, True)   # não baixa/decodifica de novo a cada requisição
+        raise
@@ -0,0 +1,408 @@
+# backend/importer.py
+"""
+Importação em massa de produtos (CSV ou NDJSON) com upsert por SKU.
+
+O corpo do upload é lido em streaming: o parser (csv/json da stdlib) roda
+numa thread e puxa os pedaços de `request.stream()` sob demanda, então a
+memória fica em ~1 lote, não no arquivo inteiro. Cada linha é validada ao
+chegar; as válidas se acumulam em lotes de `batch_size` e cada lote é UMA
+transação:
+
+    1. lê id/active/category_id/tags dos SKUs que já existem (facetas "antes")
+    2. INSERT ... ON CONFLICT(sku) DO UPDATE em executemany
+    3. relê os produtos do lote e sincroniza facetas e FTS em lote
+
+Entre lotes a conexão de escrita é devolvida ao pool, então o admin e o
+checkout não ficam parados atrás de um arquivo grande. Um lote que falha
+no banco é desfeito inteiro e as linhas dele entram no relatório; os
+anteriores continuam gravados.
+
+CSV: cabeçalho obrigatório com sku, name e price (aceita nome/preco/
+categoria/imagem/ativo); separador `,` ou `;`; preço "1234.5" ou "1.234,50";
+tags separadas por `|`, `;` ou `,`. NDJSON: um objeto por linha, tags como
+lista ou texto. Colunas ausentes não sobrescrevem o produto existente.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+import math
+import os
+import re
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import anyio
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import facets, search
+from .database import dialect_insert, engine
+from .models import Product
+
+log = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_BATCH = 5000
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))   # linhas detalhadas no relatório
+NDJSON_MAX_LINE = 1024 * 1024
+
+FORMATS = ("csv", "ndjson")
+REQUIRED = ("sku", "name", "price")
+COLUMNS = ("sku", "name", "price", "category", "tags", "image_url", "active")
+ALIASES = {
+    "nome": "name", "preco": "price", "preço": "price", "categoria": "category",
+    "imagem": "image_url", "image": "image_url", "ativo": "active",
+}
+_TRUE = {"1", "true", "t", "sim", "s", "yes", "y"}
+_FALSE = {"0", "false", "f", "nao", "não", "n", "no"}
+_TAG_SPLIT = re.compile(r"[|;,]")
+
+
+class ImportFormatError(ValueError):
+    """Arquivo inválido como um todo (formato/cabeçalho); nada foi gravado."""
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class RowError(ValueError):
+    """Linha inválida; entra no relatório e a importação segue."""
+
+
+def detect_format(content_type: str, filename: str = "") -> Optional[str]:
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if ct in ("text/csv", "application/csv", "application/vnd.ms-excel") or filename.endswith(".csv"):
+        return "csv"
+    if ct in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines") \
+            or filename.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Validação de uma linha
+# -----------------------------------------------------------------------------
+def _price(value) -> float:
+    if isinstance(value, bool) or value is None:
+        raise RowError("preço obrigatório")
+    if isinstance(value, (int, float)):
+        price = float(value)
+    else:
+        s = str(value).replace("R$", "").replace(" ", "").strip()
+        if not s:
+            raise RowError("preço obrigatório")
+        if "," in s:   # formato brasileiro: 1.234,56
+            s = s.replace(".", "").replace(",", ".")
+        try:
+            price = float(s)
+        except ValueError:
+            raise RowError(f"preço inválido: {value!r}") from None
+    if math.isnan(price) or math.isinf(price) or price < 0:
+        raise RowError(f"preço inválido: {value!r}")
+    return round(price, 2)
+
+
+def _bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return None
+    s = str(value).strip().lower()
+    if not s:
+        return None
+    if s in _TRUE:
+        return True
+    if s in _FALSE:
+        return False
+    raise RowError(f"valor de 'active' inválido: {value!r}")
+
+
+def _tags(value) -> str:
+    if value is None:
+        items: List[str] = []
+    elif isinstance(value, (list, tuple)):
+        items = [str(v) for v in value]
+    else:
+        items = _TAG_SPLIT.split(str(value))
+    tags = ",".join(facets.clean_tags(items))
+    if len(tags) > 255:
+        raise RowError("tags excedem 255 caracteres")
+    return tags
+
+
+def _raw_sku(raw) -> Optional[str]:
+    if not isinstance(raw, dict):
+        return None
+    for key, value in raw.items():
+        if isinstance(key, str) and key.strip().lower() == "sku" and value:
+            return str(value).strip()[:120] or None
+    return None
+
+
+def clean_row(raw: dict) -> dict:
+    """Linha do arquivo -> colunas de `products` (só as presentes), ou RowError."""
+    row = {}
+    for key, value in raw.items():
+        if not isinstance(key, str):
+            continue
+        key = key.strip().lower()
+        key = ALIASES.get(key, key)
+        if key in COLUMNS:
+            row[key] = value
+
+    sku = str(row.get("sku") or "").strip()
+    if not sku:
+        raise RowError("SKU obrigatório")
+    if len(sku) > 120:
+        raise RowError("SKU com mais de 120 caracteres")
+    name = " ".join(str(row.get("name") or "").split())
+    if not name:
+        raise RowError("nome obrigatório")
+    if len(name) > 255:
+        raise RowError("nome com mais de 255 caracteres")
+
+    out = {"sku": sku, "name": name, "price": _price(row.get("price"))}
+    if "category" in row:
+        out["category"] = facets.normalize_category(row["category"])
+    if "tags" in row:
+        out["tags"] = _tags(row["tags"])
+    if "image_url" in row:
+        url = str(row["image_url"] or "").strip()
+        if len(url) > 500:
+            raise RowError("image_url com mais de 500 caracteres")
+        out["image_url"] = url
+    if "active" in row:
+        active = _bool(row["active"])
+        if active is not None:
+            out["active"] = active
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Leitura em streaming
+# -----------------------------------------------------------------------------
+class _ChunkReader(io.RawIOBase):
+    """Arquivo binário sobre uma função que devolve o próximo pedaço (None = fim)."""
+
+    def __init__(self, next_chunk: Callable[[], Optional[bytes]], max_bytes: int):
+        self._next = next_chunk
+        self._buf = memoryview(b"")
+        self._max = max_bytes
+        self.total = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            chunk = self._next()
+            if chunk is None:
+                return 0
+            self.total += len(chunk)
+            if self.total > self._max:
+                raise UploadTooLarge(f"arquivo maior que {self._max // (1024 * 1024)} MB")
+            self._buf = memoryview(chunk)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def iter_csv(fh: io.BufferedReader) -> Iterator[Tuple[int, object]]:
+    head = fh.peek(4096)[:4096].split(b"\n", 1)[0]
+    delimiter = ";" if head.count(b";") > head.count(b",") else ","
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text, delimiter=delimiter)
+    try:
+        fields = reader.fieldnames
+    except UnicodeDecodeError:
+        raise ImportFormatError("o arquivo precisa estar em UTF-8") from None
+    if not fields:
+        raise ImportFormatError("CSV vazio")
+    present = {ALIASES.get(f.strip().lower(), f.strip().lower()) for f in fields if f}
+    missing = [c for c in REQUIRED if c not in present]
+    if missing:
+        raise ImportFormatError(f"coluna(s) obrigatória(s) ausente(s) no cabeçalho: {', '.join(missing)}")
+    for rec in reader:
+        if None in rec:
+            yield reader.line_num, RowError("mais colunas que o cabeçalho")
+        elif any(v for v in rec.values()):
+            yield reader.line_num, rec
+
+
+def iter_ndjson(fh: io.BufferedReader) -> Iterator[Tuple[int, object]]:
+    line_no = 0
+    while True:
+        line = fh.readline(NDJSON_MAX_LINE + 1)
+        if not line:
+            return
+        line_no += 1
+        if len(line) > NDJSON_MAX_LINE and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):   # descarta o resto da linha
+                line = fh.readline(NDJSON_MAX_LINE)
+            yield line_no, RowError("linha maior que 1 MB")
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            yield line_no, RowError("JSON inválido")
+            continue
+        yield line_no, obj if isinstance(obj, dict) else RowError("a linha não é um objeto JSON")
+
+
+# -----------------------------------------------------------------------------
+# Gravação em lotes
+# -----------------------------------------------------------------------------
+class _Report:
+    def __init__(self, fmt: str, batch_size: int, dry_run: bool):
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.rows = 0
+        self.valid = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors: List[dict] = []
+        self.aborted: Optional[str] = None
+
+    def error(self, line: int, sku: Optional[str], message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "sku": sku, "error": message})
+
+    def as_dict(self, seconds: float) -> dict:
+        return {
+            "format": self.fmt,
+            "dry_run": self.dry_run,
+            "batch_size": self.batch_size,
+            "rows": self.rows,
+            "valid": self.valid,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "batches": self.batches,
+            "seconds": round(seconds, 3),
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "aborted": self.aborted,
+        }
+
+
+def _write_batch(batch: Dict[str, Tuple[int, dict]]) -> Tuple[int, int]:
+    """Upsert de um lote numa transação; devolve (inseridos, atualizados)."""
+    skus = list(batch)
+    with engine.begin() as conn:
+        existing = conn.execute(
+            select(Product.id, Product.sku, Product.active, Product.category_id).where(Product.sku.in_(skus))
+        ).all()
+        before = facets.states(conn, existing)
+
+        # executemany exige as mesmas colunas: agrupa pelas colunas presentes
+        groups: Dict[Tuple[str, ...], List[dict]] = {}
+        for _, row in batch.values():
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        insert = dialect_insert(conn)
+        for keys, params in groups.items():
+            stmt = insert(Product.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["sku"],
+                set_={k: stmt.excluded[k] for k in keys if k != "sku"},
+            )
+            conn.execute(stmt, params)
+
+        after = conn.execute(
+            select(
+                Product.id, Product.sku, Product.name, Product.category, Product.tags,
+                Product.active, Product.category_id,
+            ).where(Product.sku.in_(skus))
+        ).all()
+        facets.sync_many(conn, [(r, before.get(r.id)) for r in after])
+        search.index_many(conn, after)
+    return len(skus) - len(existing), len(existing)
+
+
+def _import(next_chunk: Callable[[], Optional[bytes]], fmt: str, batch_size: int, dry_run: bool) -> dict:
+    t0 = time.perf_counter()
+    rep = _Report(fmt, batch_size, dry_run)
+    fh = io.BufferedReader(_ChunkReader(next_chunk, IMPORT_MAX_BYTES), buffer_size=64 * 1024)
+    rows = iter_csv(fh) if fmt == "csv" else iter_ndjson(fh)
+    batch: Dict[str, Tuple[int, dict]] = {}
+
+    def flush() -> None:
+        rep.batches += 1
+        if dry_run:
+            return
+        try:
+            inserted, updated = _write_batch(batch)
+        except SQLAlchemyError as exc:
+            log.exception("falha ao gravar lote %d da importação", rep.batches)
+            for sku, (line, _) in batch.items():
+                rep.error(line, sku, f"falha ao gravar o lote: {exc.__class__.__name__}")
+            return
+        rep.inserted += inserted
+        rep.updated += updated
+
+    try:
+        for line, rec in rows:
+            rep.rows += 1
+            try:
+                if isinstance(rec, RowError):
+                    raise rec
+                row = clean_row(rec)
+            except RowError as exc:
+                rep.error(line, _raw_sku(rec), str(exc))
+                continue
+            rep.valid += 1
+            batch[row["sku"]] = (line, row)   # SKU repetido no arquivo: vale a última linha
+            if len(batch) >= batch_size:
+                flush()
+                batch = {}
+    except UploadTooLarge as exc:
+        if not rep.batches or dry_run:
+            raise
+        # lotes anteriores já foram gravados: grava as linhas lidas e descarta o resto
+        rep.aborted = f"{exc}; importação interrompida após a linha {rep.rows}"
+    except (UnicodeDecodeError, csv.Error) as exc:
+        if not rep.batches or dry_run:
+            raise ImportFormatError(f"arquivo ilegível na linha {rep.rows + 1}: {exc}") from None
+        rep.aborted = f"leitura interrompida após a linha {rep.rows}: {exc}"
+    except Exception as exc:
+        if not (rep.inserted or rep.updated):
+            raise
+        # idem: há lotes gravados, então o relatório (e a invalidação) precisam sair
+        log.exception("importação interrompida após a linha %d", rep.rows)
+        rep.aborted = f"importação interrompida após a linha {rep.rows}: {exc.__class__.__name__}"
+        return rep.as_dict(time.perf_counter() - t0)
+    if batch:
+        flush()
+    return rep.as_dict(time.perf_counter() - t0)
+
+
+async def run(chunks: AsyncIterator[bytes], fmt: str, batch_size: int = IMPORT_BATCH_SIZE,
+              dry_run: bool = False) -> dict:
+    """Importa o corpo `chunks` (ex.: request.stream()) e devolve o relatório."""
+    it = chunks.__aiter__()
+
+    async def _next() -> Optional[bytes]:
+        while True:
+            try:
+                chunk = await it.__anext__()
+            except StopAsyncIteration:
+                return None
+            if chunk:
+                return chunk
+
+    def next_chunk() -> Optional[bytes]:
+        return anyio.from_thread.run(_next)
+
+    return await anyio.to_thread.run_sync(_import, next_chunk, fmt, batch_size, dry_run)
@@ -0,0 +1,205 @@
+# backend/inbox.py
+"""
+Inbox durável das notificações do Mercado Pago.
+
+O webhook só grava a notificação em `webhook_inbox` e responde 200.
+Um pool de threads drena a inbox:
+
+1. reivindica (claim) um lote de payment ids pendentes — todas as linhas
+   de um mesmo payment id vão juntas, então notificações duplicadas ou de
+   tópicos diferentes viram UMA consulta ao MP;
+2. busca o pagamento uma vez e aplica o status ao pedido
+   (payments.apply_payment, idempotente);
+3. marca as linhas como `done`; em caso de falha (do MP ou qualquer erro
+   ao aplicar) incrementa `attempts`, reagenda com backoff e, ao esgotar
+   as tentativas, marca `dead`.
+
+Linhas presas em `processing` (processo morreu no meio) voltam a ser
+elegíveis depois de WEBHOOK_LEASE_SECONDS.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, select, update
+
+from .database import SessionLocal
+from .mercadopago import MPError, mp_client
+from .models import WebhookInbox
+from .payments import apply_payment
+
+log = logging.getLogger(__name__)
+
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+WEBHOOK_BATCH = int(os.getenv("WEBHOOK_BATCH", "20"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_RETRY_BASE = float(os.getenv("WEBHOOK_RETRY_BASE", "5"))       # segundos
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1"))  # segundos
+# janela de espera antes de processar: duplicatas que chegam nela viram uma única consulta
+WEBHOOK_COALESCE_SECONDS = float(os.getenv("WEBHOOK_COALESCE_SECONDS", "1"))
+WEBHOOK_LEASE_SECONDS = int(os.getenv("WEBHOOK_LEASE_SECONDS", "120"))
+
+
+def enqueue(topic: str, resource_id: str, payload: Dict[str, Any]) -> int:
+    """Grava a notificação (um INSERT local); os workers a pegam após a janela de coalescência."""
+    db = SessionLocal()
+    try:
+        row = WebhookInbox(
+            topic=topic[:60],
+            resource_id=resource_id[:80],
+            payload=json.dumps(payload, ensure_ascii=False),
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=WEBHOOK_COALESCE_SECONDS),
+        )
+        db.add(row)
+        db.commit()
+        row_id = row.id
+    finally:
+        db.close()
+    if WEBHOOK_COALESCE_SECONDS <= 0:
+        workers.wake()
+    return row_id
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(WebhookInbox.status == "pending", WebhookInbox.next_attempt_at <= now),
+        and_(WebhookInbox.status == "processing",
+             WebhookInbox.claimed_at < now - timedelta(seconds=WEBHOOK_LEASE_SECONDS)),
+    )
+
+
+def claim(db, limit: int = WEBHOOK_BATCH) -> Dict[str, List[WebhookInbox]]:
+    """Reivindica até `limit` payment ids; devolve {payment_id: [linhas]}."""
+    now = datetime.utcnow()
+    resource_ids = db.execute(
+        select(WebhookInbox.resource_id)
+        .where(_claimable(now))
+        .group_by(WebhookInbox.resource_id)
+        .order_by(WebhookInbox.resource_id)
+        .limit(limit)
+    ).scalars().all()
+    if not resource_ids:
+        return {}
+
+    # leva junto TODAS as linhas pendentes desses payment ids, mesmo as que
+    # ainda não venceram: a consulta ao MP vai acontecer de qualquer jeito
+    token = uuid.uuid4().hex
+    db.execute(
+        update(WebhookInbox)
+        .where(WebhookInbox.resource_id.in_(resource_ids),
+               or_(WebhookInbox.status == "pending", _claimable(now)))
+        .values(status="processing", claim_token=token, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    rows = db.execute(
+        select(WebhookInbox).where(WebhookInbox.claim_token == token, WebhookInbox.status == "processing")
+    ).scalars().all()
+    groups: Dict[str, List[WebhookInbox]] = {}
+    for row in rows:
+        groups.setdefault(row.resource_id, []).append(row)
+    return groups
+
+
+def record_failure(db, payment_id: str, rows: List[WebhookInbox], error: Exception) -> None:
+    """Conta a tentativa e reagenda com backoff (ou `dead`), numa transação própria."""
+    now = datetime.utcnow()
+    for row in rows:
+        row.attempts += 1
+        row.last_error = (str(error) or repr(error))[:2000]
+        row.claim_token = None
+        if row.attempts >= WEBHOOK_MAX_ATTEMPTS:
+            row.status = "dead"
+            log.error("webhook %s (payment %s) dead-lettered: %s", row.id, payment_id, error)
+        else:
+            row.status = "pending"
+            row.next_attempt_at = now + timedelta(seconds=WEBHOOK_RETRY_BASE * (2 ** (row.attempts - 1)))
+    db.commit()
+
+
+def process_group(db, payment_id: str, rows: List[WebhookInbox]) -> None:
+    now = datetime.utcnow()
+    try:
+        pay = mp_client.get_payment(payment_id, timeout=20)
+    except MPError as e:
+        record_failure(db, payment_id, rows, e)
+        return
+
+    apply_payment(db, pay)
+    for row in rows:
+        row.attempts += 1
+        row.status = "done"
+        row.processed_at = now
+        row.claim_token = None
+    db.commit()
+
+
+def drain_once(limit: int = WEBHOOK_BATCH) -> int:
+    """Processa um lote; devolve quantos payment ids foram tratados."""
+    db = SessionLocal()
+    try:
+        groups = claim(db, limit)
+        for payment_id, rows in groups.items():
+            try:
+                process_group(db, payment_id, rows)
+            except Exception as e:
+                # erro ao aplicar (KeyError, IntegrityError...): sem isso as linhas
+                # ficariam em `processing` e voltariam a cada lease, para sempre
+                db.rollback()
+                log.exception("falha processando webhook do pagamento %s", payment_id)
+                try:
+                    record_failure(db, payment_id, rows, e)   # as linhas recarregam após o rollback
+                except Exception:
+                    db.rollback()
+                    log.exception("falha registrando o erro do webhook do pagamento %s", payment_id)
+        return len(groups)
+    finally:
+        db.close()
+
+
+class InboxWorkers:
+    def __init__(self, size: int = WEBHOOK_WORKERS):
+        self.size = size
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._threads or self.size <= 0:
+            return
+        self._stop.clear()
+        for i in range(self.size):
+            t = threading.Thread(target=self._run, name=f"webhook-inbox-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: Optional[float] = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                busy = drain_once()
+            except Exception:
+                log.exception("worker da inbox falhou")
+                busy = 0
+            if not busy:
+                self._wake.wait(WEBHOOK_POLL_INTERVAL)
+                self._wake.clear()
+
+
+workers = InboxWorkers()
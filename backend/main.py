@@ -1,32 +1,45 @@
 # backend/main.py
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import List, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, EmailStr
-from sqlalchemy.orm import Session
+from sqlalchemy import false, update
+from sqlalchemy.orm import Session, selectinload
 
-from .database import Base, engine, get_db
+from .database import engine, get_db, get_read_db
 from .models import User, Product, Order, OrderItem
+from . import catalog, coherence, events, exports, facets, fastjson, idempotency, images, importer, inbox, metrics, migrations, orderstatus, ratelimit, reports, search
+from .assets import PrecompressedStaticFiles, html_response
+from .mercadopago import MPError, mp_client
+from .payments import FINAL_STATUSES
+from .pagination import DEFAULT_LIMIT, MAX_LIMIT, after, decode_cursor, encode_cursor
 from .auth import (
     create_access_token,
-    get_password_hash,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
+    rehash_password,
+    cached_user,
     get_current_user,
     get_current_admin,
+    get_scoped_user,
+    get_token_user,
+    invalidate_user,
+    AuthUser,
 )
+from . import hashing
 
 # -----------------------------------------------------------------------------
 # Config / Mercado Pago
 # -----------------------------------------------------------------------------
 # ==== topo (mantém os seus imports) ====
-import os, json, requests, traceback
+import os, logging, time
 from typing import Optional, List
 from fastapi import FastAPI, Depends, HTTPException, Request
 # ...
@@ -41,7 +54,10 @@ def _sanitize_base_url(raw: Optional[str]) -> str:
 MP_ACCESS_TOKEN = os.getenv("MP_ACCESS_TOKEN", "")
 MP_PUBLIC_KEY   = os.getenv("MP_PUBLIC_KEY", "")
 MP_BASE_URL     = _sanitize_base_url(os.getenv("MP_BASE_URL") or os.getenv("BASE_URL"))
-print("MP_BASE_URL:", MP_BASE_URL)
+# mesmo carrinho do mesmo cliente dentro da janela: reaproveita pedido + preferência (0 = desliga)
+CHECKOUT_REUSE_SECONDS = int(os.getenv("CHECKOUT_REUSE_SECONDS", "1800"))
+log = logging.getLogger("soutech")
+log.info("MP_BASE_URL: %s", MP_BASE_URL)
 
 def make_base_url(request: Request) -> str:
     # prioridade para env (produção)
@@ -62,14 +78,22 @@ def make_base_url(request: Request) -> str:
 # -----------------------------------------------------------------------------
 app = FastAPI(title="SOUTECH Shop API")
 
+# login/cadastro/checkout: token buckets + teto de concorrência (backend/ratelimit.py);
+# dentro do CORS, para o 429 também levar os cabeçalhos de CORS
+app.add_middleware(ratelimit.RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # em produção, defina domínios específicos
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["location"],
+    expose_headers=["location", "etag", "server-timing", "retry-after"],
 )
+# por último = mais externo: mede o request inteiro, inclusive o CORS
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument()
+orderstatus.install()
+events.install()
 
 # -----------------------------------------------------------------------------
 # Pastas (caminhos absolutos) e estáticos
@@ -78,12 +102,26 @@ BACKEND_DIR  = Path(__file__).resolve().parent
 FRONTEND_DIR = BACKEND_DIR.parent / "frontend"
 
 if FRONTEND_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(FRONTEND_DIR)), name="static")
+    # usa frontend/dist (hash + .br/.gz) quando o build existe; senão frontend/
+    app.mount("/static", PrecompressedStaticFiles(directory=FRONTEND_DIR), name="static")
 
 # -----------------------------------------------------------------------------
-# DB: cria tabelas (se não existirem)
+# DB: tabelas/migrações/FTS e coerência de caches entre workers
 # -----------------------------------------------------------------------------
-Base.metadata.create_all(bind=engine)
+# backend/serve.py prepara o banco UMA vez antes de subir os workers e
+# exporta SOUTECH_DB_READY=1; rodando o app direto (dev), prepara aqui.
+@app.on_event("startup")
+def _init_db():
+    if os.getenv("SOUTECH_DB_READY") != "1":
+        applied = migrations.init_db(engine)
+        if applied:
+            log.info("migrações aplicadas: %s", ", ".join(applied))
+    coherence.install()
+    coherence.coherence.start()
+
+@app.on_event("shutdown")
+def _stop_coherence():
+    coherence.coherence.stop()
 
 # -----------------------------------------------------------------------------
 # Schemas (Pydantic v2)
@@ -144,8 +182,43 @@ class ProductIn(BaseModel):
 class ProductOut(ProductIn):
     id: int
     created_at: datetime
+    # srcset prontos (ver backend/images.py); vazios sem Pillow ou sem imagem
+    image_srcset: str = ""
+    image_srcset_jpeg: str = ""
     model_config = {"from_attributes": True}
 
+class ProductPage(BaseModel):
+    items: List[ProductOut]
+    next_cursor: Optional[str] = None
+
+class FacetCount(BaseModel):
+    name: str
+    count: int
+
+class FacetsOut(BaseModel):
+    categories: List[FacetCount]
+    tags: List[FacetCount]
+
+class ImportRowError(BaseModel):
+    line: int
+    sku: Optional[str] = None
+    error: str
+
+class ImportReport(BaseModel):
+    format: str
+    dry_run: bool
+    batch_size: int
+    rows: int
+    valid: int
+    inserted: int
+    updated: int
+    failed: int
+    batches: int
+    seconds: float
+    errors: List[ImportRowError]
+    errors_truncated: bool
+    aborted: Optional[str] = None
+
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
@@ -160,18 +233,33 @@ def _to_out(pr: Product) -> ProductOut:
         image_url=pr.image_url or "",
         active=pr.active,
         created_at=pr.created_at,
+        **images.srcset(pr.image_url),
     )
 
-def _file_or_404(path: Path) -> FileResponse:
-    if not path.exists():
-        raise HTTPException(status_code=404, detail="Página não encontrada")
-    return FileResponse(str(path))
+# listagens: só as colunas de ProductOut, como tuplas -> dict -> bytes JSON
+PRODUCT_COLUMNS = (
+    Product.id, Product.name, Product.sku, Product.price, Product.category,
+    Product.tags, Product.image_url, Product.active, Product.created_at,
+)
+
+def _product_row(r) -> dict:
+    return {
+        "name": r.name,
+        "sku": r.sku,
+        "price": float(r.price),
+        "category": r.category or "",
+        "tags": [t for t in (r.tags or "").split(",") if t],
+        "image_url": r.image_url or "",
+        "active": r.active,
+        "id": r.id,
+        "created_at": r.created_at,
+        **images.srcset(r.image_url),
+    }
 
 # -----------------------------------------------------------------------------
 # Auth
 # -----------------------------------------------------------------------------
-@app.post("/api/auth/signup", response_model=UserOut)
-def signup(payload: SignupIn, db: Session = Depends(get_db)):
+def _create_user_from_signup(db: Session, payload: SignupIn, password_hash: str) -> User:
     exists = db.query(User).filter(User.email == payload.email.lower()).first()
     if exists:
         raise HTTPException(status_code=400, detail="E-mail já cadastrado")
@@ -179,7 +267,7 @@ def signup(payload: SignupIn, db: Session = Depends(get_db)):
     user = User(
         name=payload.name,
         email=payload.email.lower(),
-        password_hash=get_password_hash(payload.password),
+        password_hash=password_hash,
         is_admin=False,
         # extras
         doc_type=payload.doc_type,
@@ -194,17 +282,33 @@ def signup(payload: SignupIn, db: Session = Depends(get_db)):
         state=(payload.state or "").strip()[:2].upper() if payload.state else None,
     )
     db.add(user)
+    db.flush()
+    events.publish(db, "user.created", _user_event(user))
     db.commit()
     db.refresh(user)
     return user
 
+@app.post("/api/auth/signup", response_model=UserOut)
+async def signup(payload: SignupIn, db: Session = Depends(get_db)):
+    # bcrypt no pool de processos; o banco (síncrono) no threadpool
+    password_hash = await hash_password_async(payload.password)
+    return await run_in_threadpool(_create_user_from_signup, db, payload, password_hash)
+
+def _user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
 @app.post("/api/auth/login", response_model=TokenOut)
-def login(payload: LoginIn, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email.lower()).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginIn, background: BackgroundTasks, db: Session = Depends(get_read_db)):
+    user = await run_in_threadpool(_user_by_email, db, payload.email.lower())
+    if not user:
+        raise HTTPException(status_code=401, detail="Credenciais inválidas")
+    ok, needs_rehash = await verify_password_async(payload.password, user.password_hash)
+    if not ok:
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
+    if needs_rehash:
+        background.add_task(rehash_password, user.id, payload.password, user.password_hash)
     token = create_access_token(
-        {"sub": str(user.id), "email": user.email, "is_admin": user.is_admin}
+        {"sub": str(user.id), "email": user.email, "name": user.name, "is_admin": user.is_admin}
     )
     return {"access_token": token, "token_type": "bearer"}
 
@@ -215,20 +319,99 @@ def me(current=Depends(get_current_user)):
 # -----------------------------------------------------------------------------
 # Produtos (público)
 # -----------------------------------------------------------------------------
-@app.get("/api/products", response_model=List[ProductOut])
+# ordenações do catálogo: coluna-chave do keyset e direção (id desempata)
+PRODUCT_SORTS = {
+    "newest":     (Product.created_at, True),
+    "price_asc":  (Product.price, False),
+    "price_desc": (Product.price, True),
+    "name_asc":   (Product.name, False),
+}
+
+def _query_products(
+    db: Session,
+    q: str,
+    category: str,
+    tags: List[str],
+    tag_mode: str,
+    sort: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+) -> bytes:
+    qry = db.query(*PRODUCT_COLUMNS).filter(Product.active.is_(True))
+    fts = None
+    if q:
+        fts = search.match_subquery(q, db.get_bind()) if search.enabled(db.get_bind()) else None
+        if fts is not None:
+            qry = qry.join(fts, fts.c.rowid == Product.id)
+        else:
+            like = f"%{q.lower()}%"
+            qry = qry.filter((Product.name.ilike(like)) | (Product.sku.ilike(like)))
+    # facetas normalizadas: nome -> id uma vez, depois filtro indexado por id
+    if category:
+        cid = facets.category_id(db, category)
+        qry = qry.filter(Product.category_id == cid) if cid is not None else qry.filter(false())
+    if tags:
+        ids = facets.tag_ids(db, tags)
+        if not ids or (tag_mode == "all" and len(ids) < len(facets.normalize_tags(tags))):
+            qry = qry.filter(false())
+        else:
+            qry = qry.filter(facets.tag_filter(list(ids.values()), tag_mode))
+
+    sort = sort or ("relevance" if q else "newest")
+    if sort == "relevance" and fts is not None:
+        key_col, desc = fts.c.rank, False
+    elif sort in PRODUCT_SORTS:
+        key_col, desc = PRODUCT_SORTS[sort]
+    elif sort == "relevance":
+        key_col, desc = PRODUCT_SORTS["newest"]
+    else:
+        raise HTTPException(status_code=400, detail=f"Ordenação inválida: {sort}")
+
+    key = decode_cursor(cursor, sort)
+    if key is not None:
+        qry = qry.filter(after(key_col, Product.id, key, desc=desc))
+    if desc:
+        qry = qry.order_by(key_col.desc(), Product.id.desc())
+    else:
+        qry = qry.order_by(key_col.asc(), Product.id.asc())
+
+    rows = qry.add_columns(key_col.label("sort_key")).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1].sort_key, rows[-1].id)
+
+    # mesmo formato de ProductPage, sem passar pelo Pydantic
+    return fastjson.dumps({"items": [_product_row(r) for r in rows], "next_cursor": next_cursor})
+
+@app.get("/api/products", response_model=ProductPage)
 def list_products(
+    request: Request,
     q: Optional[str] = None,
     category: Optional[str] = None,
-    db: Session = Depends(get_db),
+    tag: List[str] = Query([], description="repetível: ?tag=a&tag=b"),
+    tag_mode: str = Query("all", pattern="^(all|any)$", description="all = todas as tags, any = qualquer uma"),
+    sort: Optional[str] = Query(None, description="relevance | newest | price_asc | price_desc | name_asc"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
-    qry = db.query(Product).filter(Product.active.is_(True))
-    if q:
-        like = f"%{q.lower()}%"
-        qry = qry.filter((Product.name.ilike(like)) | (Product.sku.ilike(like)))
-    if category:
-        qry = qry.filter(Product.category == category)
-    items = qry.order_by(Product.created_at.desc()).all()
-    return [_to_out(p) for p in items]
+    # servido do snapshot em memória; o SQLite só é tocado quando o
+    # catálogo muda (create/update/delete chamam catalog.snapshots.invalidate)
+    q = (q or "").strip().lower()
+    category = category or ""
+    tags = facets.normalize_tags(tag)
+    snap = catalog.snapshots.get(
+        (q, category, tuple(sorted(tags)), tag_mode, sort, limit, cursor),
+        lambda: _query_products(db, q, category, tags, tag_mode, sort, limit, cursor),
+    )
+    return catalog.respond(request, snap)
+
+@app.get("/api/products/facets", response_model=FacetsOut)
+def product_facets(request: Request, db: Session = Depends(get_read_db)):
+    # contadores mantidos pelas escritas do admin; aqui é só ler (e cachear)
+    snap = catalog.snapshots.get(("facets",), lambda: fastjson.dumps(facets.counts(db)))
+    return catalog.respond(request, snap)
 
 # -----------------------------------------------------------------------------
 # Admin (protegido)
@@ -236,7 +419,7 @@ def list_products(
 @app.post("/api/admin/products", response_model=ProductOut)
 def create_product(
     payload: ProductIn,
-    _: User = Depends(get_current_admin),
+    _: AuthUser = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     if db.query(Product).filter(Product.sku == payload.sku).first():
@@ -245,29 +428,35 @@ def create_product(
         name=payload.name,
         sku=payload.sku,
         price=payload.price,
-        category=payload.category or "",
-        tags=",".join(payload.tags or []),
+        category=facets.normalize_category(payload.category),
+        tags=",".join(facets.clean_tags(payload.tags)),
         image_url=payload.image_url or "",
         active=payload.active,
     )
     db.add(pr)
+    db.flush()
+    facets.sync_product(db, pr, None)
+    search.index_product(db, pr)
+    events.publish(db, "product.created", _product_row(pr))
     db.commit()
     db.refresh(pr)
+    catalog.snapshots.invalidate()
     return _to_out(pr)
 
 @app.get("/api/admin/products", response_model=List[ProductOut])
 def admin_list_products(
-    _: User = Depends(get_current_admin),
-    db: Session = Depends(get_db),
+    request: Request,
+    _: AuthUser = Depends(get_current_admin),
+    db: Session = Depends(get_read_db),
 ):
-    items = db.query(Product).order_by(Product.created_at.desc()).all()
-    return [_to_out(p) for p in items]
+    rows = db.query(*PRODUCT_COLUMNS).order_by(Product.created_at.desc()).all()
+    return fastjson.json_response(request, [_product_row(r) for r in rows])
 
 @app.put("/api/admin/products/{pid}", response_model=ProductOut)
 def update_product(
     pid: int,
     payload: ProductIn,
-    _: User = Depends(get_current_admin),
+    _: AuthUser = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     pr = db.get(Product, pid)
@@ -275,48 +464,133 @@ def update_product(
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     if db.query(Product).filter(Product.sku == payload.sku, Product.id != pid).first():
         raise HTTPException(status_code=409, detail="SKU já cadastrado em outro produto.")
+    before = facets.state(db, pr)
     pr.name = payload.name
     pr.sku = payload.sku
     pr.price = payload.price
-    pr.category = payload.category or ""
-    pr.tags = ",".join(payload.tags or [])
+    pr.category = facets.normalize_category(payload.category)
+    pr.tags = ",".join(facets.clean_tags(payload.tags))
     pr.image_url = payload.image_url or ""
     pr.active = payload.active
+    facets.sync_product(db, pr, before)
+    search.index_product(db, pr)
+    events.publish(db, "product.updated", _product_row(pr))
     db.commit()
     db.refresh(pr)
+    catalog.snapshots.invalidate()
     return _to_out(pr)
 
 @app.delete("/api/admin/products/{pid}")
 def delete_product(
     pid: int,
-    _: User = Depends(get_current_admin),
+    _: AuthUser = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     pr = db.get(Product, pid)
     if not pr:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
+    facets.remove_product(db, pid, facets.state(db, pr))
     db.delete(pr)
+    search.remove_product(db, pid)
+    events.publish(db, "product.deleted", {"id": pid})
     db.commit()
+    catalog.snapshots.invalidate()
     return {"ok": True}
 
+@app.post("/api/admin/products/import", response_model=ImportReport)
+async def import_products(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(importer.IMPORT_BATCH_SIZE, ge=1, le=importer.IMPORT_MAX_BATCH),
+    dry_run: bool = False,
+    _: AuthUser = Depends(get_current_admin),
+):
+    """
+    Upsert em massa por SKU. Corpo = o arquivo cru (text/csv ou
+    application/x-ndjson), lido em streaming; `dry_run` só valida.
+    """
+    fmt = format or importer.detect_format(request.headers.get("content-type", ""))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Envie CSV (text/csv) ou NDJSON (application/x-ndjson).")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > importer.IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Arquivo grande demais para importar.")
+    try:
+        report = await importer.run(request.stream(), fmt, batch_size, dry_run)
+    except importer.UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Arquivo grande demais para importar.")
+    except importer.ImportFormatError as exc:
+        raise HTTPException(status_code=400, detail=f"Arquivo inválido: {exc}")
+    # o importador só levanta exceção se nenhum lote foi gravado; com lotes
+    # gravados (mesmo se parou no meio) devolve o relatório com `aborted`
+    if report["inserted"] or report["updated"]:
+        # uma vez, no fim
+        await run_in_threadpool(catalog.snapshots.invalidate)
+        await run_in_threadpool(events.emit, "products.reload", {})
+    return report
+
+# -----------------------------------------------------------------------------
+# Imagens de produto (ver backend/images.py)
+# -----------------------------------------------------------------------------
+@app.post("/api/admin/images")
+async def upload_image(request: Request, _: AuthUser = Depends(get_current_admin)):
+    """Corpo = a imagem crua (JPEG, PNG, WebP ou GIF). Devolve a URL para o image_url do produto."""
+    too_large = HTTPException(status_code=413, detail="Imagem grande demais.")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > images.IMAGE_MAX_SOURCE_BYTES:
+        raise too_large
+    data = bytearray()
+    async for chunk in request.stream():
+        data += chunk
+        if len(data) > images.IMAGE_MAX_SOURCE_BYTES:
+            raise too_large
+    try:
+        url = await run_in_threadpool(images.save_upload, bytes(data))
+    except images.BadImage as exc:
+        raise HTTPException(status_code=415, detail=f"Imagem inválida: {exc}")
+    return {"image_url": url, **images.srcset(url)}
+
+@app.get("/img/o/{name}")
+def image_original(name: str):
+    path = images.upload_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Imagem não encontrada")
+    return FileResponse(path, media_type=images.MEDIA_TYPES[path.suffix[1:]], headers=images.IMMUTABLE)
+
+@app.get("/img/{width}.{fmt}")
+async def image_variant(width: int, fmt: str, src: str, s: str = ""):
+    if fmt not in images.FORMATS or width not in images.IMAGE_WIDTHS or not images.verify(src, s):
+        raise HTTPException(status_code=404, detail="Imagem não encontrada")
+    try:
+        path = await images.variant(src, width, fmt)
+    except images.ImageUnavailable as exc:
+        # sem variante (sem Pillow, original fora do ar, pool cheio): o navegador tenta o original
+        log.info("imagem %s (%dpx %s) sem variante: %s", src, width, fmt, exc)
+        return RedirectResponse(src, status_code=307, headers=images.NO_STORE)
+    return FileResponse(path, media_type=images.FORMATS[fmt], headers=images.IMMUTABLE)
+
+@app.on_event("shutdown")
+def _stop_image_pool():
+    images.pool.shutdown()
+
 # -----------------------------------------------------------------------------
 # Páginas (HTML)
 # -----------------------------------------------------------------------------
 @app.get("/", response_class=HTMLResponse)
-def home():
-    return _file_or_404(FRONTEND_DIR / "index.html")
+def home(request: Request):
+    return html_response(request, "index.html")
 
 @app.get("/admin", response_class=HTMLResponse)
-def admin_page():
-    return _file_or_404(FRONTEND_DIR / "admin.html")
+def admin_page(request: Request):
+    return html_response(request, "admin.html")
 
 @app.get("/login", response_class=HTMLResponse)
-def login_page():
-    return _file_or_404(FRONTEND_DIR / "login.html")
+def login_page(request: Request):
+    return html_response(request, "login.html")
 
 @app.get("/cliente", response_class=HTMLResponse)
-def cliente_page():
-    return _file_or_404(FRONTEND_DIR / "cliente.html")
+def cliente_page(request: Request):
+    return html_response(request, "cliente.html")
 
 # -----------------------------------------------------------------------------
 # Checkout (Mercado Pago)
@@ -331,29 +605,137 @@ class CheckoutIn(BaseModel):
     customer_email: Optional[str] = ""
 
 def mp_create_preference(preference: dict) -> dict:
-    headers = {
-        "Authorization": f"Bearer {MP_ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
     try:
-        r = requests.post(
-            "https://api.mercadopago.com/checkout/preferences",
-            headers=headers,
-            data=json.dumps(preference),
-            timeout=25,
+        return mp_client.create_preference(preference, timeout=25)
+    except MPError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _cart_fingerprint(user_id: int, lines) -> str:
+    return idempotency.request_hash([(user_id,)] + [(pr.id, unit, qty) for pr, unit, qty in lines])
+
+
+def _checkout_create_order(db: Session, payload: CheckoutIn, current: AuthUser, base: str) -> tuple:
+    """
+    Fase 1: precifica o carrinho com UMA query IN e grava o pedido como
+    "created". A transação (e o lock de escrita do SQLite) dura só o
+    flush + commit. Devolve (order_id, preference, checkout_url) — sem
+    objetos ORM, para que nada mais toque a sessão depois do commit.
+
+    Se o mesmo cliente fechou o MESMO carrinho (mesmos itens, quantidades e
+    preços) há menos de CHECKOUT_REUSE_SECONDS e o pedido segue sem
+    pagamento, devolve esse pedido e a URL já criada no MP (preference=None).
+    """
+    for it in payload.items:
+        if it.quantity < 1:
+            raise HTTPException(status_code=400, detail="Quantidade inválida.")
+
+    ids = {it.product_id for it in payload.items}
+    products = {p.id: p for p in db.query(Product).filter(Product.id.in_(ids)).all()}
+
+    lines = []
+    total = 0.0
+    for it in payload.items:
+        pr = products.get(it.product_id)
+        if not pr or not pr.active:
+            raise HTTPException(status_code=400, detail=f"Produto {it.product_id} inválido/inativo.")
+        unit = round(float(pr.price), 2)
+        if unit < 0:
+            raise HTTPException(status_code=400, detail=f"Preço inválido para {pr.name}.")
+        total += unit * it.quantity
+        lines.append((pr, unit, int(it.quantity)))
+
+    fingerprint = _cart_fingerprint(current.id, lines)
+    if CHECKOUT_REUSE_SECONDS > 0:
+        reuse = (
+            db.query(Order.id, Order.checkout_url)
+            .filter(
+                Order.user_id == current.id,
+                Order.cart_fingerprint == fingerprint,
+                Order.created_at >= datetime.utcnow() - timedelta(seconds=CHECKOUT_REUSE_SECONDS),
+                Order.status == "created",
+                Order.checkout_url != "",
+            )
+            .order_by(Order.created_at.desc())
+            .first()
         )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Falha HTTP Mercado Pago: {e!r}")
-    if r.status_code not in (200, 201):
-        raise HTTPException(status_code=500, detail=f"Mercado Pago erro: {r.text}")
-    return r.json()
+        if reuse:
+            db.rollback()
+            return reuse.id, None, reuse.checkout_url
+
+    # cria pedido já com dados DO BANCO
+    order = Order(
+        user_id=current.id,
+        status="created",
+        total_amount=round(total, 2),
+        customer_name=(current.name or "").strip(),
+        customer_email=(current.email or "").strip(),
+        mp_preference_id="",
+        mp_payment_id="",
+        cart_fingerprint=fingerprint,
+    )
+    # fallback de e-mail (MP exige e-mail válido)
+    if not order.customer_email or "@" not in order.customer_email:
+        order.customer_email = "compras@soutechautomacao.com"
+
+    order.items = [
+        OrderItem(product_id=pr.id, name=pr.name, sku=pr.sku, unit_price=unit, quantity=qty)
+        for pr, unit, qty in lines
+    ]
+    db.add(order)
+    db.flush()
+    order_id = order.id
+    reports.order_changed(db, order, None)
+
+    preference = {
+        "items": [
+            {
+                "id": str(pr.id),
+                "title": pr.name,
+                "currency_id": "BRL",
+                "quantity": qty,
+                "unit_price": unit,
+            }
+            for pr, unit, qty in lines
+        ],
+        "payer": {"name": order.customer_name, "email": order.customer_email},  # do BD
+        "back_urls": {
+            "success": f"{base}/checkout/success",
+            "failure": f"{base}/checkout/failure",
+            "pending": f"{base}/checkout/pending",
+        },
+        "auto_return": "approved",
+        "notification_url": f"{base}/webhooks/mp",
+        "statement_descriptor": "SOUTECH",
+        "external_reference": str(order_id),
+    }
+    events.publish(db, "order.created", events.order_data(order))
+    db.commit()
+    return order_id, preference, ""
 
+def _checkout_abort(db: Session, order_id: int) -> None:
+    """Pedido sem preferência no MP: marca como cancelado (não fica "created" para sempre)."""
+    try:
+        res = db.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.status == "created")
+            .values(status="cancelled")
+        )
+        if res.rowcount == 1:
+            order = db.get(Order, order_id)
+            reports.order_changed(db, order, "created")
+            orderstatus.mark_changed(db, order_id)
+            events.publish(db, "order.updated", events.order_data(order))
+        db.commit()
+    except Exception:
+        db.rollback()
+        log.exception("checkout: falha ao cancelar o pedido %s", order_id)
 
 @app.post("/api/checkout")
 def create_checkout(
     payload: CheckoutIn,
     request: Request,
-    current: User = Depends(get_current_user),   # <<< OBRIGATÓRIO
+    current: AuthUser = Depends(get_current_user),   # <<< OBRIGATÓRIO
     db: Session = Depends(get_db),
 ):
     if not MP_ACCESS_TOKEN:
@@ -361,129 +743,91 @@ def create_checkout(
     if not payload.items:
         raise HTTPException(status_code=400, detail="Carrinho vazio.")
 
-    try:
-        # cria pedido já com dados DO BANCO
-        order = Order(
-            status="created",
-            total_amount=0.0,
-            customer_name=(current.name or "").strip(),
-            customer_email=(current.email or "").strip(),
-            mp_preference_id="",
-            mp_payment_id="",
-        )
-        # fallback de e-mail (MP exige e-mail válido)
-        if not order.customer_email or "@" not in order.customer_email:
-            order.customer_email = "compras@soutechautomacao.com"
+    # Idempotency-Key: repetição (duplo clique, retry do app) devolve a resposta original
+    key = (request.headers.get("idempotency-key") or "").strip()
+    if key:
+        if len(key) > idempotency.KEY_MAX_LEN:
+            raise HTTPException(status_code=400, detail="Idempotency-Key muito longa.")
+        req_hash = idempotency.request_hash([(it.product_id, it.quantity) for it in payload.items])
+        prior = idempotency.begin(db, current.id, key, req_hash)
+        if prior is not None:
+            if prior.request_hash != req_hash:
+                raise HTTPException(status_code=422, detail="Idempotency-Key já usada com outro carrinho.")
+            if prior.state != "done":
+                raise HTTPException(status_code=409, detail="Checkout em andamento para esta chave.",
+                                    headers={"Retry-After": "1"})
+            return Response(prior.response, status_code=prior.status_code, media_type="application/json",
+                            headers={"Idempotent-Replayed": "true"})
 
-        db.add(order)
-        db.flush()
-
-        mp_items: list[dict] = []
-        total = 0.0
-
-        for it in payload.items:
-            if it.quantity < 1:
-                raise HTTPException(status_code=400, detail="Quantidade inválida.")
-
-            pr = db.get(Product, it.product_id)
-            if not pr or not pr.active:
-                raise HTTPException(status_code=400, detail=f"Produto {it.product_id} inválido/inativo.")
-
-            unit = round(float(pr.price), 2)
-            if unit < 0:
-                raise HTTPException(status_code=400, detail=f"Preço inválido para {pr.name}.")
-
-            total += unit * it.quantity
+    try:
+        result = _checkout(db, payload, current, make_base_url(request))
+    except Exception:
+        if key:
+            idempotency.release(db, current.id, key)
+        raise
+    if key:
+        idempotency.complete(db, current.id, key, 200, result)
+    return result
 
-            db.add(OrderItem(
-                order_id=order.id,
-                product_id=pr.id,
-                name=pr.name,
-                sku=pr.sku,
-                unit_price=unit,
-                quantity=it.quantity,
-            ))
 
-            mp_items.append({
-                "id": str(pr.id),
-                "title": pr.name,
-                "currency_id": "BRL",
-                "quantity": int(it.quantity),
-                "unit_price": unit,
-            })
-
-        order.total_amount = round(total, 2)
-
-        base = make_base_url(request)
-        preference = {
-            "items": mp_items,
-            "payer": {"name": order.customer_name, "email": order.customer_email},  # do BD
-            "back_urls": {
-                "success": f"{base}/checkout/success",
-                "failure": f"{base}/checkout/failure",
-                "pending": f"{base}/checkout/pending",
-            },
-            "auto_return": "approved",
-            "notification_url": f"{base}/webhooks/mp",
-            "statement_descriptor": "SOUTECH",
-            "external_reference": str(order.id),
-        }
+def _checkout(db: Session, payload: CheckoutIn, current: AuthUser, base: str) -> dict:
+    # 1) transação curta: precifica e grava o pedido "created" (ou reaproveita um igual)
+    try:
+        order_id, preference, checkout_url = _checkout_create_order(db, payload, current, base)
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception:
+        db.rollback()
+        log.exception("checkout: falha ao criar o pedido")
+        raise HTTPException(status_code=500, detail="Checkout falhou. Veja logs do servidor.")
+    if checkout_url:
+        return {"checkout_url": checkout_url, "order_id": order_id}
 
+    # 2) chamada externa FORA de qualquer transação (nenhum lock no banco)
+    try:
         pref = mp_create_preference(preference)
-        order.mp_preference_id = pref.get("id", "")
-        db.commit()
-
-        init_point = pref.get("init_point") or pref.get("sandbox_init_point")
-        if not init_point:
-            raise HTTPException(status_code=500, detail="Não foi possível obter a URL de pagamento (init_point).")
-
-        return {"checkout_url": init_point, "order_id": order.id}
-
-    except HTTPException:
+    except Exception:
+        _checkout_abort(db, order_id)
         raise
-    except Exception as e:
+    init_point = pref.get("init_point") or pref.get("sandbox_init_point")
+    if not init_point:
+        _checkout_abort(db, order_id)
+        raise HTTPException(status_code=500, detail="Não foi possível obter a URL de pagamento (init_point).")
+
+    # 3) finalize: um UPDATE pontual
+    try:
+        db.execute(
+            update(Order)
+            .where(Order.id == order_id)
+            .values(mp_preference_id=pref.get("id", ""), checkout_url=init_point[:500])
+        )
+        db.commit()
+    except Exception:
         db.rollback()
-        traceback.print_exc()
+        log.exception("checkout: falha ao gravar a preferência do pedido %s", order_id)
         raise HTTPException(status_code=500, detail="Checkout falhou. Veja logs do servidor.")
 
+    return {"checkout_url": init_point, "order_id": order_id}
+
 
 @app.get("/checkout/result", response_class=HTMLResponse)
-def checkout_result(request: Request, db: Session = Depends(get_db)):
+def checkout_result(request: Request):
     """
     O MP volta aqui com query params (payment_id/collection_id, status etc).
-    Buscamos o pagamento para decidir sucesso/falha/pendente e atualizamos o pedido.
+    Se o webhook já decidiu o pedido, responde pelo status local; senão
+    consulta o pagamento no MP (em cache) e atualiza o pedido. Pendente:
+    a página espera a mudança via /api/orders/{id}/status?wait= e recarrega.
     """
     qp = dict(request.query_params)
-    payment_id = qp.get("payment_id") or qp.get("collection_id") or qp.get("id")
+    payment_id = qp.get("payment_id") or qp.get("collection_id") or qp.get("id") or ""
     ext_ref    = qp.get("external_reference") or qp.get("externalReference") or ""
     status_qs  = qp.get("status") or qp.get("collection_status") or ""
 
-    status = status_qs.lower()
-
-    # Se vier um payment_id, consultamos o MP para ter o status real:
-    if payment_id:
-        try:
-            r = requests.get(
-                f"https://api.mercadopago.com/v1/payments/{payment_id}",
-                headers={"Authorization": f"Bearer {MP_ACCESS_TOKEN}"},
-                timeout=20
-            )
-            if r.status_code == 200:
-                pay = r.json()
-                status = (pay.get("status") or status).lower()
-                ext_ref = ext_ref or str(pay.get("external_reference") or "")
-                # Atualiza pedido
-                if ext_ref.isdigit():
-                    o = db.get(Order, int(ext_ref))
-                    if o:
-                        o.status = status
-                        o.mp_payment_id = str(pay.get("id") or "")
-                        db.commit()
-        except Exception:
-            pass
+    status, order_id = orderstatus.resolve(str(payment_id), ext_ref, status_qs.lower())
 
     # Render simples baseado no status:
-    def page(title, msg, back="/"):
+    def page(title, msg, back="/", script=""):
         return f"""
         <meta charset="utf-8">
         <style>
@@ -497,57 +841,71 @@ def checkout_result(request: Request, db: Session = Depends(get_db)):
           <p>{msg}</p>
           <a class="btn" href="{back}">Voltar à loja</a>
         </div>
+        {script}
         """
 
     if status == "approved":
         return HTMLResponse(page("Pagamento aprovado ✅", "Obrigado pela compra!"))
-    if status in ("in_process", "pending", "authorized"):
-        return HTMLResponse(page("Pagamento pendente ⏳", "Estamos aguardando a confirmação."))
+    if status in ("in_process", "pending", "authorized", "created"):
+        return HTMLResponse(page("Pagamento pendente ⏳", "Estamos aguardando a confirmação.",
+                                 script=_wait_script(order_id, status)))
     # rejected, cancelled, etc.
     return HTMLResponse(page("Pagamento não concluído ❌", "Ocorreu um problema ao processar o pagamento."))
 
 
 
+def _wait_script(order_id: Optional[int], status: str) -> str:
+    """Espera (long-poll) o webhook mudar o pedido e recarrega a página; sem login, não faz nada."""
+    if order_id is None:
+        return ""
+    return f"""
+        <script>
+        (async () => {{
+          const token = localStorage.getItem("auth_token");
+          if (!token) return;
+          for (let i = 0; i < 40; i++) {{
+            const r = await fetch("/api/orders/{order_id}/status?wait=25&since={status}",
+                                  {{ headers: {{ Authorization: "Bearer " + token }} }}).catch(() => null);
+            if (!r || !r.ok) return;
+            const d = await r.json();
+            if (d.status !== "{status}") {{ location.reload(); return; }}
+          }}
+        }})();
+        </script>"""
+
+
 # -----------------------------------------------------------------------------
 # WEBHOOK Mercado Pago
 # -----------------------------------------------------------------------------
 @app.post("/webhooks/mp")
-async def mp_webhook(request: Request, db: Session = Depends(get_db)):
+async def mp_webhook(request: Request):
+    """
+    Só registra a notificação na inbox (um INSERT local) e responde 200.
+    A consulta ao MP e a atualização do pedido ficam com os workers de
+    backend/inbox.py, que deduplicam por payment id.
+    """
     try:
         data = await request.json()
     except Exception:
         data = {}
 
     topic = data.get("type") or data.get("topic") or data.get("action", "")
-    payment_id = None
 
     if "payment" in str(topic):
         d = data.get("data") or {}
         payment_id = d.get("id") or d.get("payment_id") or request.query_params.get("id")
-        if not payment_id:
-            return {"ok": True}
-
-        headers = {"Authorization": f"Bearer {MP_ACCESS_TOKEN}"}
-        r = requests.get(
-            f"https://api.mercadopago.com/v1/payments/{payment_id}",
-            headers=headers,
-            timeout=20,
-        )
-        if r.status_code != 200:
-            return {"ok": False, "detail": "payment fetch failed"}
+        if payment_id:
+            await run_in_threadpool(inbox.enqueue, str(topic), str(payment_id), data)
 
-        pay = r.json()
-        status = pay.get("status")
-        ext_ref = pay.get("external_reference")
+    return {"ok": True}
 
-        if ext_ref and str(ext_ref).isdigit():
-            order = db.get(Order, int(ext_ref))
-            if order:
-                order.status = status or order.status
-                order.mp_payment_id = str(pay.get("id") or "")
-                db.commit()
+@app.on_event("startup")
+def _start_inbox_workers():
+    inbox.workers.start()
 
-    return {"ok": True}
+@app.on_event("shutdown")
+def _stop_inbox_workers():
+    inbox.workers.stop()
 
 # -----------------------------------------------------------------------------
 # Páginas de retorno
@@ -611,6 +969,14 @@ def checkout_pending():
     """
     return HTMLResponse(html)
 
+@app.on_event("shutdown")
+def _close_mp_client():
+    mp_client.close()
+
+@app.on_event("shutdown")
+def _stop_hash_pool():
+    hashing.pool.shutdown()
+
 # -----------------------------------------------------------------------------
 # Saúde
 # -----------------------------------------------------------------------------
@@ -618,6 +984,12 @@ def checkout_pending():
 def health():
     return {"ok": True, "mp": bool(MP_ACCESS_TOKEN), "base_url": MP_BASE_URL}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    if metrics.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {metrics.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # -----------------------------------------------------------------------------
 # Pedidos do cliente autenticado
 # -----------------------------------------------------------------------------
@@ -634,17 +1006,35 @@ class OrderOut(BaseModel):
     items: List[OrderItemOut] = []
     model_config = {"from_attributes": True}
 
-@app.get("/api/orders/mine", response_model=List[OrderOut])
-def my_orders(current=Depends(get_current_user), db: Session = Depends(get_db)):
-    orders = (
+class OrderPage(BaseModel):
+    items: List[OrderOut]
+    next_cursor: Optional[str] = None
+
+@app.get("/api/orders/mine", response_model=OrderPage)
+def my_orders(
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current=Depends(get_token_user),   # só precisa do id: claims do JWT, sem ir ao banco
+    db: Session = Depends(get_read_db),
+):
+    # 2 queries por página: pedidos (índice user_id/created_at) + itens via selectinload
+    qry = (
         db.query(Order)
-        .filter(Order.customer_email == current.email)
-        .order_by(Order.created_at.desc())
-        .all()
+        .options(selectinload(Order.items))
+        .filter(Order.user_id == current.id)
     )
+    key = decode_cursor(cursor, "newest")
+    if key is not None:
+        qry = qry.filter(after(Order.created_at, Order.id, key, desc=True))
+    orders = qry.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor("newest", orders[-1].created_at, orders[-1].id)
+
     out: List[OrderOut] = []
     for o in orders:
-        items = db.query(OrderItem).filter(OrderItem.order_id == o.id).all()
         out.append(
             OrderOut(
                 id=o.id,
@@ -655,11 +1045,53 @@ def my_orders(current=Depends(get_current_user), db: Session = Depends(get_db)):
                     OrderItemOut(
                         name=i.name, quantity=i.quantity, unit_price=float(i.unit_price)
                     )
-                    for i in items
+                    for i in o.items
                 ],
             )
         )
-    return out
+    return OrderPage(items=out, next_cursor=next_cursor)
+
+class OrderStatusOut(BaseModel):
+    order_id: int
+    status: str
+    final: bool
+
+@app.get("/api/orders/{order_id}/status", response_model=OrderStatusOut)
+async def order_status(
+    order_id: int,
+    wait: float = Query(0, ge=0, le=orderstatus.ORDER_STATUS_MAX_WAIT),
+    since: Optional[str] = None,
+    current=Depends(get_token_user),   # o token só identifica o dono
+):
+    """
+    Status do pedido. Com `wait`, segura a requisição até o status mudar
+    (diferente de `since`; sem `since`, até ficar final) ou o tempo acabar.
+    A espera é uma notificação em memória (backend/orderstatus.py): nenhuma
+    conexão de banco fica presa e não há polling no servidor.
+    """
+    admin_ok: Optional[bool] = None   # pedido de outro usuário: admin confirmado no cache/banco
+    hub = orderstatus.hub
+    deadline = time.monotonic() + wait
+    while True:
+        # registra ANTES de ler: uma mudança entre a leitura e a espera não se perde
+        waiter = hub.subscribe(order_id) if wait else None
+        try:
+            row = await run_in_threadpool(orderstatus.read_status, order_id)
+            if row is not None and row[0] != current.id and admin_ok is None:
+                user = await cached_user(current.id)
+                admin_ok = user is not None and user.is_admin
+            if row is None or (row[0] != current.id and not admin_ok):
+                raise HTTPException(status_code=404, detail="Pedido não encontrado")
+            status = row[1]
+            settled = status != since if since else status in FINAL_STATUSES
+            remaining = deadline - time.monotonic()
+            # acordado por outro pedido (aviso vindo de outro worker): volta a esperar
+            if waiter is None or settled or remaining <= 0 or not await hub.wait(waiter, remaining):
+                break
+        finally:
+            if waiter is not None:
+                hub.unsubscribe(order_id, waiter)
+    return OrderStatusOut(order_id=order_id, status=status, final=status in FINAL_STATUSES)
 
 # -----------------------------------------------------------------------------
 # ADMIN · CLIENTES
@@ -713,19 +1145,25 @@ def _user_to_out(u: User) -> UserAdminOut:
     )
 
 
+USER_ADMIN_COLUMNS = tuple(getattr(User, f) for f in UserAdminOut.model_fields)
+
+def _user_event(u: User) -> dict:
+    # as colunas cruas, como em admin_list_users: sem a validação EmailStr do
+    # UserAdminOut (o cadastro aceita e-mails que ela recusaria)
+    return {f: getattr(u, f) for f in UserAdminOut.model_fields}
+
 @app.get("/api/admin/users", response_model=List[UserAdminOut])
-def admin_list_users(_: User = Depends(get_current_admin), db: Session = Depends(get_db)):
-    users = db.query(User).order_by(User.created_at.desc()).all()
-    return [_user_to_out(u) for u in users]
+def admin_list_users(request: Request, _: AuthUser = Depends(get_current_admin), db: Session = Depends(get_read_db)):
+    rows = db.query(*USER_ADMIN_COLUMNS).order_by(User.created_at.desc()).all()
+    return fastjson.json_response(request, [r._asdict() for r in rows])
 
-@app.post("/api/admin/users", response_model=UserAdminOut, status_code=201)
-def admin_create_user(payload: UserAdminCreate, _: User = Depends(get_current_admin), db: Session = Depends(get_db)):
+def _admin_insert_user(db: Session, payload: UserAdminCreate, password_hash: str) -> UserAdminOut:
     if db.query(User).filter(User.email == payload.email.lower()).first():
         raise HTTPException(status_code=400, detail="E-mail já cadastrado")
     u = User(
         name=payload.name,
         email=payload.email.lower(),
-        password_hash=get_password_hash(payload.password),
+        password_hash=password_hash,
         is_admin=payload.is_admin,
         phone=payload.phone,
         doc_type=payload.doc_type,
@@ -738,15 +1176,24 @@ def admin_create_user(payload: UserAdminCreate, _: User = Depends(get_current_ad
         city=payload.city,
         state=(payload.state or "").upper()[:2] if payload.state else None,
     )
-    db.add(u); db.commit(); db.refresh(u)
-    return _user_to_out(u)
+    db.add(u); db.flush()
+    out = _user_to_out(u)
+    events.publish(db, "user.created", _user_event(u))
+    db.commit()
+    invalidate_user(u.id)
+    return out
+
+@app.post("/api/admin/users", response_model=UserAdminOut, status_code=201)
+async def admin_create_user(payload: UserAdminCreate, _: AuthUser = Depends(get_current_admin), db: Session = Depends(get_db)):
+    password_hash = await hash_password_async(payload.password)
+    return await run_in_threadpool(_admin_insert_user, db, payload, password_hash)
 
 
 @app.patch("/api/admin/users/{uid}", response_model=UserAdminOut)
 def admin_patch_user(
     uid: int,
     payload: UserAdminPatch,
-    _: User = Depends(get_current_admin),
+    _: AuthUser = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ):
     u = db.get(User, uid)
@@ -756,6 +1203,129 @@ def admin_patch_user(
     if payload.toggle_admin:
         u.is_admin = not bool(u.is_admin)
 
+    out = _user_to_out(u)
+    events.publish(db, "user.updated", _user_event(u))
     db.commit()
-    db.refresh(u)
-    return _user_to_out(u)
+    invalidate_user(uid)
+    return out
+
+# -----------------------------------------------------------------------------
+# ADMIN · EVENTOS AO VIVO (SSE; ver backend/events.py)
+# -----------------------------------------------------------------------------
+@app.on_event("startup")
+def _start_events_bus():
+    events.bus.start()
+
+@app.on_event("shutdown")
+def _stop_events_bus():
+    events.bus.stop()
+
+@app.post("/api/admin/events/ticket")
+def admin_events_ticket(admin: AuthUser = Depends(get_current_admin)):
+    """
+    EventSource não manda Authorization: o painel troca o token por um
+    ticket curto (EVENTS_TICKET_SECONDS) que vai na URL do stream, para o
+    token de acesso não aparecer em logs de acesso.
+    """
+    ticket = create_access_token(
+        {"sub": str(admin.id), "scope": "events"},
+        expires_delta=timedelta(seconds=events.EVENTS_TICKET_SECONDS),
+    )
+    return {"ticket": ticket, "expires_in": events.EVENTS_TICKET_SECONDS}
+
+async def _events_admin(ticket: str = Query(...)) -> AuthUser:
+    # o ticket só vale aqui; como Bearer nas outras rotas ele é recusado (decode_token)
+    return get_current_admin(await get_scoped_user(ticket, "events"))
+
+@app.get("/api/admin/events")
+async def admin_events(
+    request: Request,
+    last_id: Optional[str] = Query(None, description="retomada manual; o Last-Event-ID tem prioridade"),
+    _: AuthUser = Depends(_events_admin),
+):
+    resume = events.parse_last_id(request.headers.get("last-event-id"))
+    if resume is None:
+        resume = events.parse_last_id(last_id)
+    return StreamingResponse(
+        events.stream(resume),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},   # nginx: sem buffer
+    )
+
+# -----------------------------------------------------------------------------
+# ADMIN · EXPORTAÇÕES (streaming; ver backend/exports.py)
+# -----------------------------------------------------------------------------
+@app.get("/api/admin/export/{kind}")
+def admin_export(
+    kind: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    status: List[str] = Query([]),
+    _: AuthUser = Depends(get_current_admin),
+):
+    if kind not in exports.KINDS:
+        raise HTTPException(status_code=404, detail="Exportação desconhecida (orders, order_items, customers).")
+    if status and not exports.KINDS[kind][1]:
+        raise HTTPException(status_code=400, detail="Filtro de status só vale para pedidos.")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from depois de date_to.")
+    body = exports.stream(kind, format, gzip=gzip, date_from=date_from, date_to=date_to, statuses=status)
+    name = exports.filename(kind, format, gzip)
+    return StreamingResponse(
+        body,
+        media_type="application/gzip" if gzip else exports.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}"', "Cache-Control": "no-store"},
+    )
+
+# -----------------------------------------------------------------------------
+# ADMIN · RELATÓRIOS (agregados mantidos por backend/reports.py)
+# -----------------------------------------------------------------------------
+class DailySales(BaseModel):
+    day: date
+    orders: int
+    units: int
+    revenue: float
+
+class StatusCount(BaseModel):
+    status: str
+    orders: int
+    amount: float
+
+class SkuSales(BaseModel):
+    sku: str
+    name: str
+    orders: int
+    units: int
+    revenue: float
+
+class SalesTotals(BaseModel):
+    orders: int
+    units: int
+    revenue: float
+
+class ReportOut(BaseModel):
+    date_from: date
+    date_to: date
+    totals: SalesTotals
+    daily: List[DailySales]
+    statuses: List[StatusCount]
+    top_skus: List[SkuSales]
+
+@app.get("/api/admin/reports", response_model=ReportOut)
+def admin_reports(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    top: int = Query(10, ge=1, le=100),
+    by: str = Query("revenue", pattern="^(revenue|units)$"),
+    _: AuthUser = Depends(get_current_admin),
+    db: Session = Depends(get_read_db),
+):
+    # receita diária: pedidos aprovados, pela data de criação do pedido
+    date_from, date_to = reports.default_range(date_from, date_to)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from depois de date_to.")
+    if (date_to - date_from).days >= reports.REPORT_MAX_DAYS:
+        raise HTTPException(status_code=400, detail="Período máximo de 3 anos.")
+    return reports.summary(db, date_from, date_to, top=top, by=by)
@@ -0,0 +1,190 @@
+# backend/mercadopago.py
+"""
+Cliente HTTP compartilhado para a API do Mercado Pago.
+
+- um único pool async (httpx) com keep-alive, reaproveitando conexões TLS
+- timeout por chamada, retries limitados com backoff exponencial + jitter
+  (só em falha de transporte, 429 e 5xx; POSTs levam X-Idempotency-Key,
+  então repetir é seguro)
+- limite de chamadas simultâneas (semáforo)
+
+O pool vive num event loop próprio, numa thread de fundo. Assim ele é
+compartilhado por endpoints async (await client.aget_payment(...)) e
+por endpoints síncronos do threadpool (client.get_payment(...)), sem
+nunca bloquear o loop do uvicorn.
+
+MP_API_URL permite apontar para um stub local nos testes.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import httpx
+
+from . import metrics
+
+MP_API_URL = (os.getenv("MP_API_URL") or "https://api.mercadopago.com").rstrip("/")
+MP_MAX_CONNECTIONS = int(os.getenv("MP_MAX_CONNECTIONS", "20"))
+MP_MAX_CONCURRENCY = int(os.getenv("MP_MAX_CONCURRENCY", "10"))
+MP_RETRIES = int(os.getenv("MP_RETRIES", "2"))
+MP_BACKOFF = float(os.getenv("MP_BACKOFF", "0.25"))
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class MPError(Exception):
+    """Falha ao falar com o Mercado Pago (transporte ou status != 2xx)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, body: str = ""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class MPClient:
+    def __init__(
+        self,
+        base_url: str = MP_API_URL,
+        access_token: Optional[str] = None,
+        max_connections: int = MP_MAX_CONNECTIONS,
+        max_concurrency: int = MP_MAX_CONCURRENCY,
+        retries: int = MP_RETRIES,
+        backoff: float = MP_BACKOFF,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.access_token = access_token if access_token is not None else os.getenv("MP_ACCESS_TOKEN", "")
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    # ------------------------------------------------------------------
+    # ciclo de vida
+    # ------------------------------------------------------------------
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="mp-client", daemon=True)
+            thread.start()
+
+            async def _setup() -> None:
+                self._client = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                    headers={"Authorization": f"Bearer {self.access_token}"},
+                )
+                self._sem = asyncio.Semaphore(self.max_concurrency)
+
+            asyncio.run_coroutine_threadsafe(_setup(), loop).result()
+            self._loop, self._thread = loop, thread
+            return loop
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = self._sem = None
+        if loop is None:
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        loop.close()
+
+    # ------------------------------------------------------------------
+    # núcleo (roda no loop do cliente)
+    # ------------------------------------------------------------------
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        json: Optional[Dict[str, Any]] = None,
+        timeout: float = 20,
+        idempotency_key: Optional[str] = None,
+        op: str = "",
+    ) -> Dict[str, Any]:
+        assert self._client is not None and self._sem is not None
+        headers = {"X-Idempotency-Key": idempotency_key} if idempotency_key else None
+        last_exc: Optional[MPError] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # full jitter: espera aleatória em [0, backoff * 2^tentativa]
+                await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+            try:
+                async with self._sem:
+                    t0 = time.perf_counter()
+                    try:
+                        r = await self._client.request(method, path, json=json, headers=headers, timeout=timeout)
+                    finally:
+                        elapsed = time.perf_counter() - t0
+            except httpx.HTTPError as e:
+                metrics.observe_mp(op, elapsed, type(e).__name__)
+                last_exc = MPError(f"Falha HTTP Mercado Pago: {e!r}")
+                continue
+            metrics.observe_mp(op, elapsed, str(r.status_code))
+            if r.status_code in (200, 201):
+                return r.json()
+            last_exc = MPError(f"Mercado Pago erro: {r.text}", status_code=r.status_code, body=r.text)
+            if r.status_code not in RETRY_STATUS:
+                break
+        assert last_exc is not None
+        raise last_exc
+
+    def _submit(self, method: str, path: str, **kw: Any) -> "concurrent.futures.Future[Dict[str, Any]]":
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._request(method, path, **kw), loop)
+
+    def _wait(self, fut: "concurrent.futures.Future[Dict[str, Any]]", timeout: float) -> Dict[str, Any]:
+        # pior caso: todas as tentativas estourando o timeout + backoff máximo
+        deadline = (timeout + self.backoff * (2 ** self.retries)) * (self.retries + 1)
+        try:
+            return fut.result(timeout=deadline)
+        except concurrent.futures.TimeoutError:
+            fut.cancel()
+            raise MPError("Timeout Mercado Pago")
+
+    # ------------------------------------------------------------------
+    # API síncrona (endpoints def / threads)
+    # ------------------------------------------------------------------
+    def create_preference(self, preference: Dict[str, Any], timeout: float = 25) -> Dict[str, Any]:
+        fut = self._submit("POST", "/checkout/preferences", json=preference, timeout=timeout,
+                           idempotency_key=str(uuid.uuid4()), op="create_preference")
+        return self._wait(fut, timeout)
+
+    def get_payment(self, payment_id: str, timeout: float = 20) -> Dict[str, Any]:
+        fut = self._submit("GET", f"/v1/payments/{payment_id}", timeout=timeout, op="get_payment")
+        return self._wait(fut, timeout)
+
+    # ------------------------------------------------------------------
+    # API async (endpoints async def)
+    # ------------------------------------------------------------------
+    async def acreate_preference(self, preference: Dict[str, Any], timeout: float = 25) -> Dict[str, Any]:
+        fut = self._submit("POST", "/checkout/preferences", json=preference, timeout=timeout,
+                           idempotency_key=str(uuid.uuid4()), op="create_preference")
+        return await asyncio.wrap_future(fut)
+
+    async def aget_payment(self, payment_id: str, timeout: float = 20) -> Dict[str, Any]:
+        fut = self._submit("GET", f"/v1/payments/{payment_id}", timeout=timeout, op="get_payment")
+        return await asyncio.wrap_future(fut)
+
+
+mp_client = MPClient()
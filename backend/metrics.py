@@ -0,0 +1,305 @@
+# backend/metrics.py
+"""
+Métricas do app em formato Prometheus (GET /metrics) e diagnóstico por request.
+
+- MetricsMiddleware (ASGI puro): latência por rota (histograma), requests em
+  andamento, contagem por status e o cabeçalho `Server-Timing`
+  (app;dur=..., db;dur=...;desc="N queries")
+- eventos do SQLAlchemy: nº de queries e tempo de SQL por request (via
+  contextvar), log de queries lentas (SLOW_QUERY_MS) e alerta de N+1 quando
+  a mesma instrução roda N_PLUS_ONE_THRESHOLD+ vezes num único request
+- chamadas ao Mercado Pago: latência e resultado (backend/mercadopago.py)
+
+O registro é por processo: com vários workers do uvicorn, cada um expõe
+os próprios números (o Prometheus agrega por instância).
+METRICS_TOKEN, se definido, protege o /metrics (Authorization: Bearer).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") not in ("0", "false", "no")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+# -----------------------------------------------------------------------------
+# Registro (Prometheus text format 0.0.4)
+# -----------------------------------------------------------------------------
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # por série: [contagem por bucket..., +Inf], soma
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][i] += 1
+            series[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s[0])) for k, (c, s) in self._series.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            acc = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                acc += n
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {acc}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {acc}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "Requests HTTP por rota e status.", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Latência dos requests HTTP.", ("method", "route")))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests HTTP em andamento."))
+db_queries = registry.register(Counter(
+    "db_queries_total", "Instruções SQL executadas.", ("route",)))
+db_latency = registry.register(Histogram(
+    "db_query_duration_seconds", "Duração de cada instrução SQL.", ()))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "Instruções SQL por request.", ("route",), buckets=QUERY_COUNT_BUCKETS))
+db_slow_queries = registry.register(Counter(
+    "db_slow_queries_total", f"Instruções SQL acima de {SLOW_QUERY_MS:g} ms.", ("route",)))
+db_n_plus_one = registry.register(Counter(
+    "db_n_plus_one_total", "Requests com a mesma instrução repetida (suspeita de N+1).", ("route",)))
+mp_requests = registry.register(Counter(
+    "mp_requests_total", "Chamadas HTTP ao Mercado Pago por resultado.", ("op", "outcome")))
+mp_latency = registry.register(Histogram(
+    "mp_request_duration_seconds", "Latência das chamadas ao Mercado Pago (por tentativa).", ("op",)))
+
+
+# -----------------------------------------------------------------------------
+# Contabilidade por request (contextvar; chega às threads do threadpool)
+# -----------------------------------------------------------------------------
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    root = scope.get("root_path") or ""
+    return f"{root}/*" if root else "<sem rota>"
+
+
+@dataclass
+class RequestStats:
+    scope: dict = field(default_factory=dict)
+    queries: int = 0
+    sql_seconds: float = 0.0
+    statements: _Counter = field(default_factory=_Counter)
+
+    @property
+    def route(self) -> str:
+        # o roteador grava a rota no scope antes de chamar o endpoint
+        return _route_label(self.scope)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    db_latency.observe(elapsed)
+    stats = _current.get()
+    route = stats.route if stats else "background"
+    db_queries.inc(route=route)
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        stats.statements[statement] += 1
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        db_slow_queries.inc(route=route)
+        log.warning("query lenta (%.0f ms) em %s: %s", elapsed * 1000, route, " ".join(statement.split())[:500])
+
+
+def instrument() -> None:
+    """Liga os contadores de SQL a todos os Engines (escrita, leitura, réplica); idempotente."""
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _finish_request(stats: RequestStats) -> None:
+    db_queries_per_request.observe(stats.queries, route=stats.route)
+    if not stats.statements:
+        return
+    statement, n = stats.statements.most_common(1)[0]
+    if n >= N_PLUS_ONE_THRESHOLD:
+        db_n_plus_one.inc(route=stats.route)
+        log.warning("possível N+1 em %s: %d× %s", stats.route, n, " ".join(statement.split())[:300])
+
+
+# -----------------------------------------------------------------------------
+# Mercado Pago
+# -----------------------------------------------------------------------------
+def observe_mp(op: str, seconds: float, outcome: str) -> None:
+    mp_latency.observe(seconds, op=op)
+    mp_requests.inc(op=op, outcome=outcome)
+
+
+# -----------------------------------------------------------------------------
+# Middleware ASGI
+# -----------------------------------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        stats = RequestStats(scope=scope)
+        token = _current.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if SERVER_TIMING:
+                    app_ms = (time.perf_counter() - t0) * 1000
+                    timing = (f'app;dur={app_ms:.1f}, '
+                              f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.queries} queries"')
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            _current.reset(token)
+            elapsed = time.perf_counter() - t0
+            route = stats.route
+            http_latency.observe(elapsed, method=scope["method"], route=route)
+            http_requests.inc(method=scope["method"], route=route, status=str(status["code"]))
+            _finish_request(stats)
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,116 @@
+# backend/migrate_db.py
+"""
+Copia todas as tabelas de um banco (por padrão o soutech.db local) para
+outro — tipicamente PostgreSQL — em lotes, sem carregar tabelas inteiras
+na memória.
+
+    python -m backend.migrate_db --target postgresql+psycopg2://user:pw@host/soutech
+    python -m backend.migrate_db --source sqlite:///outro.db --target sqlite:///copia.db --batch 2000
+
+O schema de destino é criado pelo próprio app (create_all + migrações),
+as tabelas são copiadas em ordem de dependência (FKs), os dados derivados
+(user_id dos pedidos, facetas, agregados) são refeitos sobre as linhas
+copiadas — a origem pode ser um soutech.db que nunca foi migrado — e, no
+PostgreSQL, as sequences de id são ajustadas para o maior id copiado. A
+origem é aberta só para leitura (SQLite: mode=ro, sem os PRAGMAs do app).
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from .database import Base, DB_PATH, make_engine
+from . import migrations, search
+
+
+def source_engine(url: str):
+    """Engine simples e somente leitura para a origem (não mexe no arquivo/WAL)."""
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database and u.database != ":memory:":
+        return create_engine(f"sqlite:///file:{u.database}?mode=ro&uri=true", future=True)
+    eng = create_engine(url, future=True)
+    if u.get_backend_name() == "postgresql":
+        eng = eng.execution_options(postgresql_readonly=True)
+    return eng
+
+
+def _source_columns(src_engine, table):
+    present = {c["name"] for c in inspect(src_engine).get_columns(table.name)}
+    return [c for c in table.columns if c.name in present]
+
+
+def copy_table(src_engine, dst_engine, table, batch: int) -> int:
+    if not inspect(src_engine).has_table(table.name):
+        return 0
+    cols = _source_columns(src_engine, table)
+    total = 0
+    with src_engine.connect() as src:
+        result = src.execution_options(stream_results=True, yield_per=batch).execute(select(*cols))
+        for part in result.partitions(batch):
+            rows = [dict(r._mapping) for r in part]
+            with dst_engine.begin() as dst:
+                dst.execute(table.insert(), rows)
+            total += len(rows)
+    return total
+
+
+def reset_sequences(dst_engine) -> None:
+    if dst_engine.dialect.name != "postgresql":
+        return
+    with dst_engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if "id" not in table.c:
+                continue
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table.name}"
+            ))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Migra o soutech.db para outro banco (ex.: PostgreSQL).")
+    ap.add_argument("--source", default=f"sqlite:///{DB_PATH}", help="URL do banco de origem")
+    ap.add_argument("--target", required=True, help="URL do banco de destino")
+    ap.add_argument("--batch", type=int, default=5000, help="linhas por lote/transação")
+    ap.add_argument("--truncate", action="store_true", help="apaga os dados do destino antes de copiar")
+    args = ap.parse_args(argv)
+
+    src_engine = source_engine(args.source)
+    dst_engine = make_engine(args.target)
+
+    Base.metadata.create_all(bind=dst_engine)
+    migrations.run(dst_engine)
+
+    with dst_engine.begin() as conn:
+        if args.truncate:
+            for table in reversed(Base.metadata.sorted_tables):
+                conn.execute(table.delete())
+        else:
+            for table in Base.metadata.sorted_tables:
+                if conn.execute(select(func.count()).select_from(table)).scalar():
+                    print(f"Destino não está vazio ({table.name}); use --truncate.", file=sys.stderr)
+                    return 2
+
+    for table in Base.metadata.sorted_tables:
+        t0 = time.perf_counter()
+        n = copy_table(src_engine, dst_engine, table, args.batch)
+        print(f"{table.name}: {n} linha(s) em {time.perf_counter() - t0:.1f}s")
+
+    with dst_engine.begin() as conn:
+        migrations.backfill(conn)   # as migrações rodaram com o destino vazio
+    reset_sequences(dst_engine)
+    search.ensure_schema(dst_engine)
+    with Session(dst_engine) as db:
+        search.rebuild(db)
+        db.commit()
+    print("✅ Migração concluída:", dst_engine.url.render_as_string(hide_password=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+# backend/migrations.py
+"""
+Migrações de schema "one-off", aplicadas uma única vez por banco.
+
+`Base.metadata.create_all` só cria tabelas que ainda não existem; colunas
+e índices novos em tabelas antigas (e backfills de dados) ficam aqui.
+Cada migração roda na sua própria transação e é registrada em
+`schema_migrations`. Todas devem ser idempotentes: num banco novo o
+create_all já criou as colunas/índices.
+"""
+from __future__ import annotations
+
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import facets, reports, search
+from .models import Order, OrderItem, Product, ProductTag
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _create_indexes(conn: Connection, table, *names: str) -> None:
+    """
+    Cria os índices `names` de `table` (todos, sem nomes). Cada migração
+    nomeia só os que ela introduz: o modelo atual pode ter índices sobre
+    colunas que uma migração posterior é que adiciona.
+    """
+    for idx in table.indexes:
+        if not names or idx.name in names:
+            idx.create(bind=conn, checkfirst=True)
+
+
+def _m0001_product_keyset_indexes(conn: Connection) -> None:
+    _create_indexes(conn, Product.__table__,
+                    "idx_products_active_created", "idx_products_active_price", "idx_products_active_name")
+
+
+def _m0002_orders_user_id(conn: Connection) -> None:
+    if not _has_column(conn, "orders", "user_id"):
+        conn.execute(text("ALTER TABLE orders ADD COLUMN user_id INTEGER REFERENCES users(id)"))
+    _create_indexes(conn, Order.__table__, "idx_orders_user_created")
+    _backfill_order_user_ids(conn)
+
+
+def _backfill_order_user_ids(conn: Connection) -> None:
+    # pedidos antigos só tinham o e-mail do cliente
+    conn.execute(text(
+        "UPDATE orders SET user_id = ("
+        "  SELECT u.id FROM users u WHERE u.email = lower(trim(orders.customer_email))"
+        ") WHERE user_id IS NULL"
+    ))
+
+
+def _m0003_product_facets(conn: Connection) -> None:
+    # categories/tags/product_tags são tabelas novas (create_all); aqui só a FK
+    if not _has_column(conn, "products", "category_id"):
+        conn.execute(text("ALTER TABLE products ADD COLUMN category_id INTEGER REFERENCES categories(id)"))
+    _create_indexes(conn, Product.__table__, "idx_products_category_created")
+    _create_indexes(conn, ProductTag.__table__, "idx_product_tags_tag")
+    # backfill a partir dos textos category/tags
+    facets.rebuild(conn)
+
+
+def _m0004_order_export_indexes(conn: Connection) -> None:
+    _create_indexes(conn, Order.__table__, "idx_orders_created")
+    _create_indexes(conn, OrderItem.__table__, "idx_order_items_order")
+
+
+def _m0005_sales_aggregates(conn: Connection) -> None:
+    # sales_daily/sales_sku/order_status_counts são novas (create_all); backfill
+    reports.rebuild(conn)
+
+
+def _m0006_checkout_reuse(conn: Connection) -> None:
+    # idempotency_keys é nova (create_all); aqui só as colunas novas de orders
+    for column, ddl in (
+        ("cart_fingerprint", "VARCHAR(64) NOT NULL DEFAULT ''"),
+        ("checkout_url", "VARCHAR(500) NOT NULL DEFAULT ''"),
+    ):
+        if not _has_column(conn, "orders", column):
+            conn.execute(text(f"ALTER TABLE orders ADD COLUMN {column} {ddl}"))
+    _create_indexes(conn, Order.__table__, "idx_orders_user_fingerprint")
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_product_keyset_indexes", _m0001_product_keyset_indexes),
+    ("0002_orders_user_id", _m0002_orders_user_id),
+    ("0003_product_facets", _m0003_product_facets),
+    ("0004_order_export_indexes", _m0004_order_export_indexes),
+    ("0005_sales_aggregates", _m0005_sales_aggregates),
+    ("0006_checkout_reuse", _m0006_checkout_reuse),
+]
+
+
+def backfill(conn: Connection) -> None:
+    """
+    Refaz os dados derivados (user_id dos pedidos, facetas, agregados de
+    vendas) a partir das tabelas de origem. Idempotente; usado pelo
+    migrate_db DEPOIS da cópia, quando a origem nunca foi migrada.
+    """
+    _backfill_order_user_ids(conn)
+    facets.rebuild(conn)
+    reports.rebuild(conn)
+
+
+def run(engine: Engine) -> List[str]:
+    """Aplica as migrações pendentes; devolve os ids aplicados nesta chamada."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            " id VARCHAR(120) PRIMARY KEY,"
+            " applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        done = {row[0] for row in conn.execute(text("SELECT id FROM schema_migrations"))}
+
+    applied: List[str] = []
+    for mid, fn in MIGRATIONS:
+        if mid in done:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(text("INSERT INTO schema_migrations (id) VALUES (:id)"), {"id": mid})
+        applied.append(mid)
+    return applied
+
+
+def init_db(engine: Engine) -> List[str]:
+    """
+    Preparação completa do banco: tabelas novas, migrações pendentes e FTS.
+    Roda UMA vez por deploy (backend/serve.py, antes de subir os workers)
+    ou no startup do app quando ele roda sozinho (dev).
+    """
+    from .database import Base
+
+    Base.metadata.create_all(bind=engine)
+    applied = run(engine)
+    search.ensure_schema(engine)
+    return applied
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    print("Migrações aplicadas:", init_db(engine) or "nenhuma")
@@ -1,5 +1,5 @@
 # backend/models.py (complemento)
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -44,6 +44,42 @@ class Product(Base):
     image_url = Column(String(500), default="")
     active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # categoria normalizada (o texto em `category` continua para exibição/busca)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+
+    # índices compostos para a paginação keyset do catálogo (ativo + chave + id)
+    __table_args__ = (
+        Index("idx_products_active_created", "active", "created_at", "id"),
+        Index("idx_products_active_price", "active", "price", "id"),
+        Index("idx_products_active_name", "active", "name", "id"),
+        Index("idx_products_category_created", "category_id", "active", "created_at", "id"),
+    )
+
+
+# ---- facetas: categorias e tags normalizadas (ver backend/facets.py) --------
+class Category(Base):
+    __tablename__ = "categories"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(120), unique=True, nullable=False)
+    product_count = Column(Integer, default=0, nullable=False)   # produtos ativos
+
+
+class Tag(Base):
+    __tablename__ = "tags"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(60), unique=True, nullable=False)       # minúsculas
+    product_count = Column(Integer, default=0, nullable=False)   # produtos ativos
+
+
+class ProductTag(Base):
+    __tablename__ = "product_tags"
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+
+    # PK (product_id, tag_id) atende o EXISTS por produto; este atende "produtos da tag"
+    __table_args__ = (
+        Index("idx_product_tags_tag", "tag_id", "product_id"),
+    )
 
 
 class Order(Base):
@@ -56,9 +92,22 @@ class Order(Base):
     mp_preference_id = Column(String(80), default="", nullable=False)
     mp_payment_id = Column(String(80), default="", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # checkout: hash do carrinho precificado e a URL do MP (reuso da preferência)
+    cart_fingerprint = Column(String(64), default="", nullable=False)
+    checkout_url = Column(String(500), default="", nullable=False)
 
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    # histórico do cliente: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+    __table_args__ = (
+        Index("idx_orders_user_created", "user_id", "created_at", "id"),
+        # exportações/relatórios por período: WHERE created_at BETWEEN ... ORDER BY created_at, id
+        Index("idx_orders_created", "created_at", "id"),
+        # mesmo carrinho do mesmo cliente há pouco tempo (ver create_checkout)
+        Index("idx_orders_user_fingerprint", "user_id", "cart_fingerprint", "created_at"),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -72,12 +121,95 @@ class OrderItem(Base):
 
     order = relationship("Order", back_populates="items")
 
+    # itens de um pedido (selectinload do histórico, exportação por período)
+    __table_args__ = (
+        Index("idx_order_items_order", "order_id", "id"),
+    )
 
 
+# ---- agregados de vendas (mantidos por backend/reports.py) ------------------
+class SalesDaily(Base):
+    """Pedidos aprovados por dia (data de criação do pedido)."""
+    __tablename__ = "sales_daily"
+    day = Column(Date, primary_key=True)
+    orders = Column(Integer, default=0, nullable=False)
+    units = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
 
 
+class SalesSku(Base):
+    """Unidades e receita aprovadas por SKU."""
+    __tablename__ = "sales_sku"
+    sku = Column(String(120), primary_key=True)
+    name = Column(String(255), default="", nullable=False)   # nome do item mais recente
+    orders = Column(Integer, default=0, nullable=False)
+    units = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
 
+    # "top SKUs" sem ordenar a tabela inteira
+    __table_args__ = (
+        Index("idx_sales_sku_revenue", "revenue"),
+        Index("idx_sales_sku_units", "units"),
+    )
+
+
+class OrderStatusCount(Base):
+    """Pedidos (e valor) por status atual."""
+    __tablename__ = "order_status_counts"
+    status = Column(String(30), primary_key=True)
+    orders = Column(Integer, default=0, nullable=False)
+    amount = Column(Float, default=0.0, nullable=False)
+
+
+class IdempotencyKey(Base):
+    """Respostas de POST /api/checkout por (usuário, Idempotency-Key) (ver backend/idempotency.py)."""
+    __tablename__ = "idempotency_keys"
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(120), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    state = Column(String(10), default="pending", nullable=False)   # pending, done
+    status_code = Column(Integer, nullable=True)
+    response = Column(Text, default="", nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("idx_idempotency_created", "created_at"),
+    )
+
+
+class CacheVersion(Base):
+    """Versões dos caches em memória, para coerência entre workers (ver backend/coherence.py)."""
+    __tablename__ = "cache_versions"
+    name = Column(String(40), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class WebhookInbox(Base):
+    """Notificações do Mercado Pago aguardando processamento (ver backend/inbox.py)."""
+    __tablename__ = "webhook_inbox"
+    id = Column(Integer, primary_key=True)
+    topic = Column(String(60), default="", nullable=False)
+    resource_id = Column(String(80), nullable=False)                   # payment id
+    payload = Column(Text, default="", nullable=False)                 # corpo bruto
+    status = Column(String(20), default="pending", nullable=False)     # pending, processing, done, dead
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, default="", nullable=False)
+    claim_token = Column(String(40), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        Index("idx_inbox_status_next", "status", "next_attempt_at"),
+        Index("idx_inbox_resource", "resource_id", "status"),
+    )
 
 
- 
+class AdminEvent(Base):
+    """Eventos do painel do admin: transporte entre workers + histórico curto (ver backend/events.py)."""
+    __tablename__ = "admin_events"
+    id = Column(Integer, primary_key=True)
+    type = Column(String(40), nullable=False)
+    data = Column(Text, default="{}", nullable=False)                   # JSON
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,222 @@
+# backend/orderstatus.py
+"""
+Status de pedido para o navegador: retorno do checkout e long-poll.
+
+- `resolve()` (GET /checkout/result): decide pelo pedido LOCAL quando o
+  webhook já gravou um status final para aquele pagamento; só consulta o
+  MP quando o pedido ainda não foi decidido (ou o pagamento é outro). As
+  consultas ficam em cache por PAYMENT_CACHE_SECONDS, com uma única
+  chamada por payment id mesmo com vários retornos simultâneos. A leitura
+  local usa a conexão de leitura e a chamada ao MP não segura conexão
+  nenhuma: só a gravação do pagamento pega a (única) conexão de escrita,
+  numa transação curta.
+- `hub` (GET /api/orders/{id}/status?wait=): a requisição espera numa
+  future do event loop até o pedido mudar. Toda atribuição a
+  `Order.status` pelo ORM (payments.apply_payment) marca o pedido na
+  sessão; UPDATEs diretos chamam `mark_changed(db, order_id)`. Depois do
+  COMMIT o hub acorda quem espera aquele pedido (notificação em memória,
+  sem laço de SELECT).
+  Com vários workers, `listeners` avisa os outros processos
+  (backend/coherence.py, canal "orders"), que acordam todos os seus
+  waiters para reler o próprio pedido.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from .cache import LRUCache
+from .database import ReadSessionLocal, SessionLocal
+from .mercadopago import mp_client
+from .models import Order
+from .payments import FINAL_STATUSES, apply_payment
+
+log = logging.getLogger(__name__)
+
+PAYMENT_CACHE_SECONDS = float(os.getenv("PAYMENT_CACHE_SECONDS", "30"))
+ORDER_STATUS_MAX_WAIT = float(os.getenv("ORDER_STATUS_MAX_WAIT", "30"))
+ORDER_STATUS_MAX_WAITERS = int(os.getenv("ORDER_STATUS_MAX_WAITERS", "2000"))
+
+_PENDING = "orderstatus_changed"   # chave em Session.info
+
+payments_cache = LRUCache(maxsize=2048, ttl=PAYMENT_CACHE_SECONDS)
+
+
+# -----------------------------------------------------------------------------
+# Notificação em memória
+# -----------------------------------------------------------------------------
+Waiter = Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]
+
+
+def _wake(fut: "asyncio.Future[None]") -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+class StatusHub:
+    """Waiters por pedido; `notify` pode vir de qualquer thread (inbox, threadpool)."""
+
+    def __init__(self, max_waiters: int = ORDER_STATUS_MAX_WAITERS):
+        self.max_waiters = max_waiters
+        self._lock = threading.Lock()
+        self._waiters: Dict[int, Set[Waiter]] = {}
+        self._count = 0
+        self.listeners: List[Callable[[], None]] = []
+
+    def __len__(self) -> int:
+        return self._count
+
+    def subscribe(self, order_id: int) -> Optional[Waiter]:
+        """Registra um waiter (ANTES de ler o status, para não perder a notificação)."""
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._lock:
+            if self._count >= self.max_waiters:
+                return None   # lotado: a rota responde na hora, sem esperar
+            self._waiters.setdefault(order_id, set()).add(waiter)
+            self._count += 1
+        return waiter
+
+    def unsubscribe(self, order_id: int, waiter: Waiter) -> None:
+        with self._lock:
+            waiters = self._waiters.get(order_id)
+            if waiters and waiter in waiters:
+                waiters.discard(waiter)
+                self._count -= 1
+                if not waiters:
+                    del self._waiters[order_id]
+
+    async def wait(self, waiter: Waiter, timeout: float) -> bool:
+        """True se houve notificação, False no timeout."""
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[1]), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def notify(self, order_ids: Iterable[int]) -> None:
+        with self._lock:
+            woken = [w for oid in order_ids for w in self._waiters.get(oid, ())]
+        for loop, fut in woken:
+            loop.call_soon_threadsafe(_wake, fut)
+
+    def notify_all(self) -> None:
+        with self._lock:
+            ids = list(self._waiters)
+        self.notify(ids)
+
+
+hub = StatusHub()
+
+
+def mark_changed(db: Session, order_id: int) -> None:
+    """O status de `order_id` mudou nesta sessão; avisa quem espera depois do commit."""
+    db.info.setdefault(_PENDING, set()).add(order_id)
+
+
+def _after_commit(session: Session) -> None:
+    ids = session.info.pop(_PENDING, None)
+    if not ids:
+        return
+    hub.notify(ids)
+    for notify in hub.listeners:
+        notify()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def _status_set(target: Order, value, oldvalue, initiator) -> None:
+    if target.id is None or value == oldvalue:
+        return   # pedido sendo criado: ninguém espera por ele ainda
+    session = object_session(target)
+    if session is not None:
+        mark_changed(session, target.id)
+
+
+def install() -> None:
+    """Liga as notificações às mudanças de Order.status e ao commit; idempotente."""
+    if event.contains(Session, "after_commit", _after_commit):
+        return
+    event.listen(Order.status, "set", _status_set)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+
+
+def read_status(order_id: int) -> Optional[Tuple[Optional[int], str]]:
+    """(user_id, status) com uma conexão de leitura curta (o long-poll não segura conexão)."""
+    db = ReadSessionLocal()
+    try:
+        row = db.execute(select(Order.user_id, Order.status).where(Order.id == order_id)).first()
+        return (row.user_id, row.status) if row else None
+    finally:
+        db.close()
+
+
+# -----------------------------------------------------------------------------
+# Retorno do checkout: local primeiro, MP (em cache) quando necessário
+# -----------------------------------------------------------------------------
+def fetch_payment(payment_id: str) -> dict:
+    return payments_cache.get_or_build(payment_id, lambda: mp_client.get_payment(payment_id, timeout=20))
+
+
+def _local_order(order_id: int) -> Optional[Tuple[str, str]]:
+    """(status, mp_payment_id) do pedido, pela conexão de leitura."""
+    db = ReadSessionLocal()
+    try:
+        row = db.execute(select(Order.status, Order.mp_payment_id).where(Order.id == order_id)).first()
+        return (row.status, row.mp_payment_id) if row else None
+    finally:
+        db.close()
+
+
+def _apply(pay: dict) -> Optional[Tuple[str, int]]:
+    """Grava o pagamento numa transação curta; (status, id do pedido) ou None."""
+    db = SessionLocal()
+    try:
+        order = apply_payment(db, pay)
+        if order is None:
+            db.rollback()
+            return None
+        result = (order.status, order.id)
+        db.commit()
+        return result
+    finally:
+        db.close()
+
+
+def resolve(payment_id: str, ext_ref: str, status: str) -> Tuple[str, Optional[int]]:
+    """
+    Status a mostrar no retorno do MP e o id do pedido. `status` (o da
+    query string) só vale se nem o pedido nem o MP responderem.
+    """
+    order_id = int(ext_ref) if ext_ref.isdigit() else None
+    local = _local_order(order_id) if order_id is not None else None
+    if local is None:
+        order_id = None
+    elif local[0] in FINAL_STATUSES and (not payment_id or local[1] == payment_id):
+        return local[0], order_id   # o webhook já decidiu
+
+    if payment_id:
+        try:
+            pay = fetch_payment(payment_id)   # sem sessão aberta: o MP pode demorar
+        except Exception:
+            log.warning("retorno do checkout: consulta do pagamento %s falhou", payment_id, exc_info=True)
+        else:
+            if pay:
+                ext_ref = ext_ref or str(pay.get("external_reference") or "")
+                applied = _apply({**pay, "external_reference": ext_ref})
+                if applied is not None:
+                    return applied
+                return (pay.get("status") or status).lower(), None
+
+    if local is not None and local[0] != "created":
+        return local[0], order_id
+    return status, order_id
@@ -0,0 +1,51 @@
+# backend/pagination.py
+"""
+Paginação por cursor (keyset).
+
+O cursor é opaco para o cliente: base64url de um JSON com a ordenação e a
+chave (valor, id) da última linha entregue. A próxima página é lida com
+`(col, id) > (valor, id)` (ou `<` em ordem decrescente), que usa o índice
+composto e custa o mesmo em qualquer profundidade da lista.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 24
+MAX_LIMIT = 100
+
+
+def encode_cursor(sort: str, value: Any, id_: int) -> str:
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    raw = json.dumps({"s": sort, "k": [value, id_]}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], sort: str) -> Optional[Tuple[Any, int]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value, id_ = data["k"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+        if data.get("s") != sort:
+            raise ValueError("sort mismatch")
+        return value, int(id_)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def after(key_col, id_col, key: Tuple[Any, int], desc: bool = False):
+    """Filtro keyset: linhas estritamente depois de `key` na ordenação (key_col, id_col)."""
+    lhs = tuple_(key_col, id_col)
+    rhs = tuple_(*key)
+    return lhs < rhs if desc else lhs > rhs
@@ -0,0 +1,54 @@
+# backend/payments.py
+"""
+Aplicação do status de um pagamento do Mercado Pago ao `Order`.
+
+Usado pelo worker do webhook e pelo retorno do checkout. É idempotente:
+reaplicar o mesmo pagamento não altera nada, e uma notificação atrasada
+("pending" depois de "approved") não faz o pedido regredir. A mudança
+de status atualiza os agregados de vendas (backend/reports.py) e publica
+`order.updated` no feed do admin (backend/events.py) na mesma transação.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from . import events, reports
+from .models import Order
+
+# status em que o pedido já foi decidido pelo MP
+FINAL_STATUSES = {"approved", "rejected", "cancelled", "refunded", "charged_back"}
+
+
+def transition_allowed(current: str, new: str) -> bool:
+    if not new:
+        return False
+    if (current or "") in FINAL_STATUSES and new not in FINAL_STATUSES:
+        return False
+    return True
+
+
+def apply_payment(db: Session, pay: Dict[str, Any]) -> Optional[Order]:
+    """Atualiza o pedido referenciado por `pay` (sem commit). Devolve o pedido ou None."""
+    ext_ref = str(pay.get("external_reference") or "")
+    if not ext_ref.isdigit():
+        return None
+    # FOR UPDATE (PostgreSQL): dois workers não contam a mesma transição duas vezes
+    order = db.get(Order, int(ext_ref), with_for_update=True)
+    if not order:
+        return None
+
+    new_status = (pay.get("status") or "").lower()
+    payment_id = str(pay.get("id") or "")
+    if order.status == new_status and order.mp_payment_id == payment_id:
+        return order
+    if not transition_allowed(order.status, new_status):
+        return order
+
+    old_status = order.status
+    order.status = new_status
+    order.mp_payment_id = payment_id
+    reports.order_changed(db, order, old_status)
+    events.publish(db, "order.updated", events.order_data(order))
+    return order
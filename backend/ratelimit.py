@@ -0,0 +1,269 @@
+# backend/ratelimit.py
+"""
+Controle de admissão para as rotas caras: login, cadastro e checkout.
+
+RateLimitMiddleware (ASGI puro) roda antes do roteador e recusa o excesso
+sem tocar em bcrypt, banco ou Mercado Pago:
+
+- token bucket por chave: cada chave guarda só (fichas, último acesso);
+  as fichas voltam continuamente (N por S segundos), o que equivale a uma
+  janela deslizante sem guardar o histórico de requisições
+- chaves: "ip" (cliente; atrás do nginx o uvicorn já aplica o
+  X-Forwarded-For dos proxies em --forwarded-allow-ips), "user" (`sub`
+  do JWT, validado) e "account" (e-mail do corpo do login: segura o
+  ataque a uma conta vindo de muitos IPs)
+- estouro: 429 + Retry-After (segundos até a próxima ficha)
+- as rotas caras também dividem um teto GLOBAL de requisições simultâneas
+  (RATE_EXPENSIVE_CONCURRENCY); acima dele, 503 + Retry-After na hora, em
+  vez de formar fila
+- no máximo RATE_MAX_KEYS chaves em memória; as paradas há mais tempo
+  saem primeiro (LRU). Chave descartada volta com o balde cheio, que é
+  o mesmo estado de uma chave ociosa.
+
+Limites por regra em variáveis de ambiente, formato "N/S" (N requisições a
+cada S segundos; vazio ou 0 desliga aquela chave), ex.:
+RATE_LOGIN_IP=10/60, RATE_CHECKOUT_USER=10/60. RATE_LIMIT=0 desliga tudo
+(benchmarks). Os baldes são por processo: com W workers o limite efetivo
+fica até W vezes maior.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from . import metrics
+from .auth import decode_token
+
+log = logging.getLogger(__name__)
+
+RATE_LIMIT = os.getenv("RATE_LIMIT", "1") not in ("0", "false", "no")
+RATE_MAX_KEYS = int(os.getenv("RATE_MAX_KEYS", "100000"))
+RATE_EXPENSIVE_CONCURRENCY = int(os.getenv("RATE_EXPENSIVE_CONCURRENCY", "64"))
+PEEK_MAX_BYTES = 16 * 1024   # corpo do login lido para achar o e-mail
+
+rate_limited = metrics.registry.register(metrics.Counter(
+    "ratelimit_rejected_total", "Requisições recusadas pelo controle de admissão.", ("rule", "reason")))
+
+
+# -----------------------------------------------------------------------------
+# Token bucket
+# -----------------------------------------------------------------------------
+@dataclass(frozen=True)
+class Limit:
+    capacity: float   # rajada máxima
+    rate: float       # fichas por segundo
+
+    @classmethod
+    def parse(cls, spec: str) -> Optional["Limit"]:
+        """"N/S" -> N fichas, recarga de N a cada S segundos. Vazio/0 -> sem limite."""
+        spec = (spec or "").strip()
+        if not spec or spec == "0":
+            return None
+        n, _, s = spec.partition("/")
+        n, s = float(n), float(s or 1)
+        if n <= 0 or s <= 0:
+            return None
+        return cls(capacity=n, rate=n / s)
+
+
+class BucketStore:
+    """Baldes por chave, com LRU. `take` consome de todos ou de nenhum."""
+
+    def __init__(self, maxsize: int = RATE_MAX_KEYS):
+        self.maxsize = max(1, maxsize)
+        self._data: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def take(self, checks: List[Tuple[Tuple[str, str], Limit]], now: Optional[float] = None) -> float:
+        """
+        Tenta tirar uma ficha de cada balde. Devolve 0 se passou; senão, os
+        segundos até todos terem ficha (nada é consumido).
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            states = []
+            wait = 0.0
+            for key, limit in checks:
+                state = self._data.get(key)
+                tokens = limit.capacity if state is None else min(
+                    limit.capacity, state[0] + (now - state[1]) * limit.rate)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / limit.rate)
+                states.append((key, tokens))
+            if wait:
+                return wait
+            for key, tokens in states:
+                self._data[key] = [tokens - 1, now]
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# -----------------------------------------------------------------------------
+# Regras
+# -----------------------------------------------------------------------------
+@dataclass
+class Rule:
+    name: str
+    method: str
+    path: str
+    limits: Dict[str, Limit]   # tipo de chave ("ip", "user", "account") -> limite
+    expensive: bool = True
+
+
+def _rule(name: str, method: str, path: str, expensive: bool = True, **defaults: str) -> Rule:
+    limits = {}
+    for kind, default in defaults.items():
+        limit = Limit.parse(os.getenv(f"RATE_{name.upper()}_{kind.upper()}", default))
+        if limit is not None:
+            limits[kind] = limit
+    return Rule(name, method, path, limits, expensive)
+
+
+RULES: List[Rule] = [
+    _rule("login", "POST", "/api/auth/login", ip="20/60", account="10/300"),
+    _rule("signup", "POST", "/api/auth/signup", ip="5/600"),
+    _rule("checkout", "POST", "/api/checkout", ip="30/60", user="10/60"),
+]
+
+
+# -----------------------------------------------------------------------------
+# Chaves
+# -----------------------------------------------------------------------------
+def _client_ip(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "-"
+
+
+def _token_user(scope) -> Optional[str]:
+    for name, value in scope.get("headers") or ():
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                return str(decode_token(token.strip()).get("sub") or "") or None
+            except HTTPException:
+                return None   # token inválido: a rota responde 401; fica só o limite por IP
+    return None
+
+
+async def _peek_body(receive) -> Tuple[bytes, list]:
+    """Lê o corpo (até PEEK_MAX_BYTES) e devolve as mensagens para repassar à rota."""
+    messages, body = [], b""
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body") or len(body) > PEEK_MAX_BYTES:
+            break
+    return body, messages
+
+
+def _account(body: bytes) -> Optional[str]:
+    if len(body) > PEEK_MAX_BYTES:
+        return None
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+# -----------------------------------------------------------------------------
+# Middleware ASGI
+# -----------------------------------------------------------------------------
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, rules: Optional[List[Rule]] = None, store: Optional[BucketStore] = None,
+                 max_concurrency: int = RATE_EXPENSIVE_CONCURRENCY, enabled: bool = RATE_LIMIT):
+        self.app = app
+        self.rules = {(r.method, r.path): r for r in (RULES if rules is None else rules)}
+        self.store = store or BucketStore()
+        self.max_concurrency = max_concurrency
+        self.enabled = enabled
+        self.in_flight = 0   # só mexido no event loop
+
+    async def __call__(self, scope, receive, send):
+        rule = None
+        if self.enabled and scope["type"] == "http":
+            rule = self.rules.get((scope["method"], scope["path"].rstrip("/") or "/"))
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        checks = []
+        if "ip" in rule.limits:
+            checks.append(((rule.name + ":ip", _client_ip(scope)), rule.limits["ip"]))
+        if "user" in rule.limits:
+            uid = _token_user(scope)
+            if uid is not None:
+                checks.append(((rule.name + ":user", uid), rule.limits["user"]))
+        if "account" in rule.limits:
+            body, messages = await _peek_body(receive)
+            account = _account(body)
+            if account is not None:
+                checks.append(((rule.name + ":account", account), rule.limits["account"]))
+            receive = _replay(messages, receive)
+
+        wait = self.store.take(checks) if checks else 0.0
+        if wait:
+            rate_limited.inc(rule=rule.name, reason="rate")
+            await _reject(send, 429, "Muitas tentativas. Aguarde um pouco e tente novamente.", wait)
+            return
+
+        if rule.expensive and self.max_concurrency > 0:
+            if self.in_flight >= self.max_concurrency:
+                rate_limited.inc(rule=rule.name, reason="concurrency")
+                await _reject(send, 503, "Servidor ocupado, tente novamente em instantes.", 1)
+                return
+            self.in_flight += 1
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.in_flight -= 1
+        else:
+            await self.app(scope, receive, send)
+
+
+def _replay(messages: list, receive):
+    pending = list(messages)
+
+    async def replay():
+        if pending:
+            return pending.pop(0)
+        return await receive()
+
+    return replay
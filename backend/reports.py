@@ -0,0 +1,197 @@
+# backend/reports.py
+"""
+Agregados de vendas mantidos incrementalmente + consultas do painel.
+
+- `order_status_counts`: pedidos e valor por status ATUAL
+- `sales_daily`:         pedidos aprovados por dia de criação (pedidos, unidades, receita)
+- `sales_sku`:           pedidos aprovados por SKU (pedidos, unidades, receita)
+
+Toda mudança de status de um pedido chama `order_changed()` na MESMA
+transação (criação no checkout, cancelamento por falha no MP e
+`payments.apply_payment`, usado pelo webhook e pelo retorno do checkout):
+só as linhas afetadas recebem `col = col + delta` via upsert. Um pedido
+que entra em "approved" soma nos agregados de venda; um que sai
+(refunded, charged_back...) subtrai.
+
+`rebuild()` recalcula tudo a partir de orders/order_items (backfill,
+migração, seed do benchmark):
+
+    python -m backend.reports
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from .database import dialect_insert
+from .models import Order, OrderItem, OrderStatusCount, SalesDaily, SalesSku
+
+REVENUE_STATUSES = ("approved",)
+REPORT_MAX_DAYS = 3 * 366
+TOP_SKU_ORDER = ("revenue", "units")
+
+
+def _bind(db):
+    return db.get_bind() if isinstance(db, Session) else db
+
+
+def _add(db, model, keys: List[str], rows: List[dict], replace: Iterable[str] = ()) -> None:
+    """Upsert somando as colunas que não são chave (e sobrescrevendo as de `replace`)."""
+    if not rows:
+        return
+    table = model.__table__
+    insert = dialect_insert(_bind(db))
+    stmt = insert(table)
+    set_ = {}
+    for col in rows[0]:
+        if col in keys:
+            continue
+        set_[col] = stmt.excluded[col] if col in replace else table.c[col] + stmt.excluded[col]
+    db.execute(stmt.on_conflict_do_update(index_elements=keys, set_=set_), rows)
+
+
+# -----------------------------------------------------------------------------
+# Manutenção incremental
+# -----------------------------------------------------------------------------
+def order_changed(db, order: Order, old_status: Optional[str]) -> None:
+    """
+    `order` acabou de ir de `old_status` (None = pedido novo) para
+    `order.status`. Chamar após o flush/UPDATE, antes do commit.
+    """
+    new_status = order.status
+    if old_status == new_status:
+        return
+    amount = float(order.total_amount or 0)
+    rows = [{"status": new_status, "orders": 1, "amount": amount}]
+    if old_status is not None:
+        rows.append({"status": old_status, "orders": -1, "amount": -amount})
+    _add(db, OrderStatusCount, ["status"], rows)
+
+    was = old_status in REVENUE_STATUSES
+    now = new_status in REVENUE_STATUSES
+    if was == now:
+        return
+    sign = 1 if now else -1
+    items = db.execute(
+        select(OrderItem.sku, OrderItem.name, OrderItem.unit_price, OrderItem.quantity)
+        .where(OrderItem.order_id == order.id)
+    ).all()
+
+    per_sku: Dict[str, dict] = {}
+    for sku, name, unit, qty in items:
+        row = per_sku.setdefault(sku, {"sku": sku, "name": name, "orders": sign, "units": 0, "revenue": 0.0})
+        row["units"] += sign * qty
+        row["revenue"] += sign * float(unit) * qty
+    _add(db, SalesSku, ["sku"], list(per_sku.values()), replace=("name",))
+
+    day = (order.created_at or datetime.utcnow()).date()
+    _add(db, SalesDaily, ["day"], [{
+        "day": day,
+        "orders": sign,
+        "units": sum(r["units"] for r in per_sku.values()),
+        "revenue": sign * amount,
+    }])
+
+
+def rebuild(db) -> None:
+    """Recalcula os três agregados a partir de orders/order_items (Session ou Connection)."""
+    for model in (OrderStatusCount, SalesDaily, SalesSku):
+        db.execute(delete(model.__table__))
+
+    db.execute(OrderStatusCount.__table__.insert().from_select(
+        ["status", "orders", "amount"],
+        select(Order.status, func.count(), func.coalesce(func.sum(Order.total_amount), 0.0))
+        .group_by(Order.status),
+    ))
+
+    approved = Order.status.in_(REVENUE_STATUSES)
+    units = (
+        select(OrderItem.order_id, func.sum(OrderItem.quantity).label("units"))
+        .group_by(OrderItem.order_id)
+        .subquery()
+    )
+    day = func.date(Order.created_at)
+    db.execute(SalesDaily.__table__.insert().from_select(
+        ["day", "orders", "units", "revenue"],
+        select(day, func.count(), func.coalesce(func.sum(units.c.units), 0), func.sum(Order.total_amount))
+        .select_from(Order)
+        .outerjoin(units, units.c.order_id == Order.id)
+        .where(approved)
+        .group_by(day),
+    ))
+
+    db.execute(SalesSku.__table__.insert().from_select(
+        ["sku", "name", "orders", "units", "revenue"],
+        select(
+            OrderItem.sku, func.max(OrderItem.name), func.count(func.distinct(OrderItem.order_id)),
+            func.sum(OrderItem.quantity), func.sum(OrderItem.unit_price * OrderItem.quantity),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(approved)
+        .group_by(OrderItem.sku),
+    ))
+
+
+# -----------------------------------------------------------------------------
+# Consultas do painel (só leem os agregados)
+# -----------------------------------------------------------------------------
+def summary(db, date_from: date, date_to: date, top: int = 10, by: str = "revenue") -> dict:
+    daily = db.execute(
+        select(SalesDaily.day, SalesDaily.orders, SalesDaily.units, SalesDaily.revenue)
+        .where(SalesDaily.day >= date_from, SalesDaily.day <= date_to)
+        .order_by(SalesDaily.day)
+    ).all()
+    statuses = db.execute(
+        select(OrderStatusCount.status, OrderStatusCount.orders, OrderStatusCount.amount)
+        .where(OrderStatusCount.orders != 0)
+        .order_by(OrderStatusCount.orders.desc())
+    ).all()
+    key = SalesSku.units if by == "units" else SalesSku.revenue
+    skus = db.execute(
+        select(SalesSku.sku, SalesSku.name, SalesSku.orders, SalesSku.units, SalesSku.revenue)
+        .order_by(key.desc())
+        .limit(top)
+    ).all()
+
+    totals = defaultdict(float)
+    for d in daily:
+        totals["orders"] += d.orders
+        totals["units"] += d.units
+        totals["revenue"] += d.revenue
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "totals": {
+            "orders": int(totals["orders"]),
+            "units": int(totals["units"]),
+            "revenue": round(totals["revenue"], 2),
+        },
+        "daily": [
+            {"day": d.day, "orders": d.orders, "units": d.units, "revenue": round(d.revenue, 2)} for d in daily
+        ],
+        "statuses": [{"status": s, "orders": n, "amount": round(a, 2)} for s, n, a in statuses],
+        "top_skus": [
+            {"sku": s.sku, "name": s.name, "orders": s.orders, "units": s.units, "revenue": round(s.revenue, 2)}
+            for s in skus
+        ],
+    }
+
+
+def default_range(date_from: Optional[date], date_to: Optional[date]) -> tuple:
+    """Sem datas: últimos 30 dias (UTC)."""
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    return date_from, date_to
+
+
+if __name__ == "__main__":
+    from .database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        rebuild(conn)
+    print("Agregados de vendas reconstruídos.")
@@ -0,0 +1,166 @@
+# backend/search.py
+"""
+Busca textual de produtos com SQLite FTS5.
+
+A tabela virtual `products_fts` indexa name, sku, category e tags, com
+rowid = products.id. Ela é mantida em sincronia pelos endpoints de admin
+(index_product / remove_product na mesma transação da escrita; a
+importação em massa usa index_many por lote).
+
+- tokenizer unicode61 com remove_diacritics: "automacao" casa "automação"
+- cada termo da busca vira prefixo ("sens" casa "sensor")
+- ranking por bm25, com peso maior para nome e SKU
+
+No PostgreSQL o equivalente é um índice GIN de expressão sobre
+to_tsvector('simple', ...) com ranking por ts_rank (sem remoção de
+acentos: unaccent() não é IMMUTABLE e não entra em índice).
+"""
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+FTS_TABLE = "products_fts"
+# pesos bm25 na ordem das colunas: name, sku, category, tags
+BM25_WEIGHTS = (10.0, 8.0, 2.0, 4.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# expressão do índice GIN no PostgreSQL (a query precisa repetir a mesma expressão)
+PG_TSVECTOR = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(sku, '') || ' ' || "
+    "coalesce(category, '') || ' ' || replace(coalesce(tags, ''), ',', ' '))"
+)
+
+
+def enabled(bind) -> bool:
+    return bind.dialect.name in ("sqlite", "postgresql")
+
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_schema(engine: Engine) -> None:
+    """Cria a tabela FTS (se preciso) e popula a partir de `products` quando vazia."""
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_products_fts ON products USING gin ({PG_TSVECTOR})"))
+        return
+    if not _is_sqlite(engine):
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "name, sku, category, tags, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+        indexed = conn.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+        if not indexed:
+            _rebuild(conn)
+
+
+def _rebuild(conn) -> None:
+    conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    conn.execute(text(
+        f"INSERT INTO {FTS_TABLE}(rowid, name, sku, category, tags) "
+        "SELECT id, name, sku, coalesce(category, ''), replace(coalesce(tags, ''), ',', ' ') "
+        "FROM products"
+    ))
+
+
+def rebuild(db: Session) -> None:
+    if _is_sqlite(db.get_bind()):
+        _rebuild(db.connection())
+
+
+def _fts_row(pr) -> dict:
+    return {
+        "id": pr.id,
+        "name": pr.name or "",
+        "sku": pr.sku or "",
+        "category": pr.category or "",
+        "tags": (pr.tags or "").replace(",", " "),
+    }
+
+
+def index_product(db: Session, pr) -> None:
+    """(Re)indexa um produto; chamar após o flush, antes do commit."""
+    index_many(db, [pr])
+
+
+def index_many(db, products) -> None:
+    """(Re)indexa vários produtos em executemany (Session ou Connection)."""
+    bind = db.get_bind() if isinstance(db, Session) else db
+    if not _is_sqlite(bind):   # no PostgreSQL o índice GIN se mantém sozinho
+        return
+    rows = [_fts_row(pr) for pr in products]
+    if not rows:
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), [{"id": r["id"]} for r in rows])
+    db.execute(
+        text(f"INSERT INTO {FTS_TABLE}(rowid, name, sku, category, tags) "
+             "VALUES (:id, :name, :sku, :category, :tags)"),
+        rows,
+    )
+
+
+def remove_product(db: Session, pid: int) -> None:
+    if not _is_sqlite(db.get_bind()):
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": pid})
+
+
+def match_expression(q: str) -> Optional[str]:
+    """Converte a busca do usuário numa expressão MATCH segura (AND de prefixos)."""
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def tsquery_expression(q: str) -> Optional[str]:
+    """Equivalente para to_tsquery do PostgreSQL: 'tok1:* & tok2:*'."""
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    return " & ".join(f"{t.lower()}:*" for t in tokens)
+
+
+def match_subquery(q: str, bind):
+    """
+    Subquery (rowid, rank) com os produtos que casam `q`, ou None se `q`
+    não tem termos. Menor rank = mais relevante nos dois dialetos.
+    """
+    if bind.dialect.name == "postgresql":
+        expr = tsquery_expression(q)
+        if expr is None:
+            return None
+        return (
+            text(
+                f"SELECT id AS rowid, -ts_rank({PG_TSVECTOR}, to_tsquery('simple', :match)) AS rank "
+                f"FROM products WHERE {PG_TSVECTOR} @@ to_tsquery('simple', :match)"
+            )
+            .bindparams(match=expr)
+            .columns(rowid=Integer, rank=Float)
+            .subquery("fts")
+        )
+
+    expr = match_expression(q)
+    if expr is None:
+        return None
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    return (
+        text(
+            f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        )
+        .bindparams(match=expr)
+        .columns(rowid=Integer, rank=Float)
+        .subquery("fts")
+    )
@@ -0,0 +1,94 @@
+# backend/serve.py
+"""
+Launcher de produção: prepara o banco UMA vez e sobe N workers do uvicorn.
+
+    python -m backend.serve --host 0.0.0.0 --port 8000 --workers 4
+    python -m backend.serve --init-only          # só tabelas/migrações/FTS (pipeline de deploy)
+
+- o processo pai roda `migrations.init_db` (create_all, migrações, FTS) e
+  exporta SOUTECH_DB_READY=1: os workers pulam essa etapa no startup
+- o socket é aberto pelo pai e compartilhado; o uvicorn reinicia worker
+  que morrer
+- cada worker tem seus caches em memória; backend/coherence.py os mantém
+  coerentes (tabela cache_versions)
+- HASH_WORKERS (pool de bcrypt) não definido: os núcleos são divididos
+  entre os workers, para N workers não criarem N pools do tamanho da máquina;
+  o mesmo para IMAGE_WORKERS (redimensionamento, metade dos núcleos)
+
+Para desenvolvimento continua valendo `uvicorn backend.main:app --reload`.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import logging
+import os
+
+log = logging.getLogger("soutech")
+
+
+def _log_config(level: str) -> dict:
+    from uvicorn.config import LOGGING_CONFIG
+
+    cfg = copy.deepcopy(LOGGING_CONFIG)
+    for name in ("soutech", "backend"):
+        cfg["loggers"][name] = {"handlers": ["default"], "level": level.upper(), "propagate": False}
+    return cfg
+
+
+def main(argv=None) -> int:
+    cpus = os.cpu_count() or 1
+    ap = argparse.ArgumentParser(description="Sobe a loja com vários workers do uvicorn.")
+    ap.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(cpus))),
+                    help="processos (padrão: WEB_CONCURRENCY ou nº de núcleos)")
+    ap.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    ap.add_argument("--forwarded-allow-ips", default=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+                    help="proxies confiáveis para X-Forwarded-* (ex.: o nginx)")
+    ap.add_argument("--timeout-keep-alive", type=int, default=5)
+    ap.add_argument("--timeout-graceful-shutdown", type=int, default=10,
+                    help="segundos para conexões longas (SSE, long-poll) terminarem no deploy")
+    ap.add_argument("--init-only", action="store_true", help="só prepara o banco e sai")
+    args = ap.parse_args(argv)
+    workers = max(1, args.workers)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(message)s")
+
+    # 1) banco: uma vez, antes de qualquer worker
+    from .database import engine
+    from .migrations import init_db
+
+    applied = init_db(engine)
+    log.info("banco pronto (%s); migrações aplicadas: %s",
+             engine.url.render_as_string(hide_password=True), ", ".join(applied) or "nenhuma")
+    engine.dispose()   # nada de conexões abertas no processo pai
+    if args.init_only:
+        return 0
+
+    # 2) ambiente herdado pelos workers
+    os.environ["SOUTECH_DB_READY"] = "1"
+    os.environ.setdefault("HASH_WORKERS", str(max(1, cpus // workers)))
+    os.environ.setdefault("IMAGE_WORKERS", str(max(1, cpus // (2 * workers))))
+
+    # 3) workers
+    import uvicorn
+
+    log.info("subindo %d worker(s) em http://%s:%d", workers, args.host, args.port)
+    uvicorn.run(
+        "backend.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        log_level=args.log_level,
+        log_config=_log_config(args.log_level),
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        timeout_keep_alive=args.timeout_keep_alive,
+        timeout_graceful_shutdown=args.timeout_graceful_shutdown,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
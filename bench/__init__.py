@@ -0,0 +1,22 @@
+# bench/__init__.py
+"""
+Benchmark / teste de carga da loja.
+
+    # 1) massa de dados (usa DATABASE_URL, ou o soutech.db local)
+    python -m bench.seed --products 100000 --users 50000 --orders 1000000
+
+    # 2) stub do Mercado Pago (latência e erros configuráveis)
+    python -m bench.mp_stub --port 8765 --latency-ms 120 --jitter-ms 60 --error-rate 0.02
+
+    # 3) o app apontando para o stub
+    MP_API_URL=http://127.0.0.1:8765 MP_ACCESS_TOKEN=bench \\
+        uvicorn backend.main:app --port 8001
+
+    # 4) cenários
+    python -m bench.runner --base http://127.0.0.1:8001 --stub http://127.0.0.1:8765 \\
+        --scenarios browse,search,login,checkout,webhook_storm,orders \\
+        --duration 60 --concurrency 50 --out results.json [--baseline baseline.json]
+
+O runner grava p50/p95/p99 e vazão por endpoint em JSON; com --baseline
+compara e sai com código 1 se algum endpoint regrediu além da tolerância.
+"""
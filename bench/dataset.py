@@ -0,0 +1,13 @@
+# bench/dataset.py
+"""Vocabulário da massa sintética, compartilhado pelo seed e pelos cenários."""
+
+CATEGORIES = ["Sensores", "Inversores", "IoT", "Serviços", "CLPs", "Motores", "Cabos", "Painéis"]
+TAGS = ["esp32", "wifi", "modbus", "rs485", "arduino", "24v", "trifásico", "bluetooth",
+        "industrial", "ip67", "usb", "ethernet", "lora", "zigbee", "hmi", "encoder"]
+WORDS = ["sensor", "módulo", "inversor", "controlador", "relé", "fonte", "motor", "cabo",
+         "painel", "gateway", "medidor", "conversor", "driver", "chave", "botoeira", "ihm"]
+BRANDS = ["WEG", "Siemens", "Schneider", "Delta", "Omron", "Espressif", "Balluff", "Sick"]
+STATUSES = ["approved"] * 6 + ["pending"] * 2 + ["rejected", "cancelled", "created"]
+
+EMAIL_FMT = "bench{}@bench.local"
+DEFAULT_PASSWORD = "bench123"
@@ -0,0 +1,125 @@
+# bench/mp_stub.py
+"""
+Stub local das APIs do Mercado Pago usadas pelo app (preferências e pagamentos).
+
+    python -m bench.mp_stub --port 8765 --latency-ms 120 --jitter-ms 60 --error-rate 0.02
+
+Rotas do MP:
+    POST /checkout/preferences     -> {"id", "init_point", ...}
+    GET  /v1/payments/{id}         -> {"id", "status", "external_reference", ...}
+
+Rotas de controle (usadas pelos cenários):
+    POST /_bench/payments          {"external_reference", "status"?} -> cria pagamento
+    POST /_bench/config            {"latency_ms", "jitter_ms", "error_rate", "payment_status"}
+    GET  /_bench/stats             contadores de chamadas/erros
+
+Erros injetados saem como 429/500/503 (os códigos que o cliente do app
+re-tenta). Pagamento desconhecido: 404.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import random
+import threading
+from collections import Counter
+from typing import Dict
+
+from fastapi import FastAPI, HTTPException, Request
+
+app = FastAPI(title="Mercado Pago (stub de benchmark)")
+
+config = {"latency_ms": 0.0, "jitter_ms": 0.0, "error_rate": 0.0, "payment_status": "approved"}
+stats: Counter = Counter()
+payments: Dict[str, dict] = {}
+_ids = itertools.count(1_000_000_001)
+_lock = threading.Lock()
+_rng = random.Random()
+
+
+async def _simulate(kind: str) -> None:
+    stats[f"{kind}.calls"] += 1
+    delay = config["latency_ms"] + _rng.uniform(0, config["jitter_ms"])
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if config["error_rate"] and _rng.random() < config["error_rate"]:
+        stats[f"{kind}.errors"] += 1
+        raise HTTPException(status_code=_rng.choice((429, 500, 503)), detail="erro injetado")
+
+
+@app.post("/checkout/preferences")
+async def create_preference(request: Request):
+    body = await request.json()
+    await _simulate("preferences")
+    with _lock:
+        pref_id = f"bench-{next(_ids)}"
+    return {
+        "id": pref_id,
+        "init_point": f"https://stub.local/checkout/{pref_id}",
+        "sandbox_init_point": f"https://stub.local/sandbox/{pref_id}",
+        "external_reference": body.get("external_reference"),
+    }
+
+
+@app.get("/v1/payments/{payment_id}")
+async def get_payment(payment_id: str):
+    await _simulate("payments")
+    pay = payments.get(payment_id)
+    if pay is None:
+        raise HTTPException(status_code=404, detail="payment not found")
+    return pay
+
+
+@app.post("/_bench/payments")
+async def bench_create_payment(request: Request):
+    body = await request.json()
+    with _lock:
+        pid = str(next(_ids))
+    payments[pid] = {
+        "id": int(pid),
+        "status": body.get("status") or config["payment_status"],
+        "status_detail": "accredited",
+        "external_reference": str(body.get("external_reference", "")),
+        "transaction_amount": body.get("amount", 0),
+    }
+    return payments[pid]
+
+
+@app.post("/_bench/config")
+async def bench_config(request: Request):
+    body = await request.json()
+    for key in config:
+        if key in body:
+            config[key] = type(config[key])(body[key])
+    return config
+
+
+@app.get("/_bench/stats")
+async def bench_stats():
+    return {"config": config, "stats": dict(stats), "payments": len(payments)}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Stub do Mercado Pago para benchmark.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="latência fixa por chamada")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="latência extra aleatória (0..N)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 429/5xx")
+    ap.add_argument("--payment-status", default="approved")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    config.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                  error_rate=args.error_rate, payment_status=args.payment_status)
+    if args.seed is not None:
+        _rng.seed(args.seed)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
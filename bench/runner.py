@@ -0,0 +1,214 @@
+# bench/runner.py
+"""
+Executa os cenários contra um app rodando e grava os resultados em JSON.
+
+    python -m bench.runner --base http://127.0.0.1:8001 --stub http://127.0.0.1:8765 \\
+        --scenarios browse,search,orders --duration 30 --concurrency 32 --out results.json
+
+    # regressão: compara com um resultado salvo (sai com 1 se piorou)
+    python -m bench.runner ... --out atual.json --baseline baseline.json --tolerance 0.15
+
+Cada cenário roda isolado por --duration segundos (após --warmup segundos
+não medidos) com --concurrency usuários virtuais em laço fechado.
+Por endpoint: requisições, erros, vazão (req/s), média, p50/p95/p99 e máx (ms).
+Suba o app com RATE_LIMIT=0: os cenários de login/checkout passam dos
+limites por IP de backend/ratelimit.py.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+
+from .scenarios import SCENARIOS, Context, Recorder
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentil por "nearest rank" (p em 0..100) de uma lista já ordenada."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+def summarize(rec: Recorder, elapsed: float) -> Dict[str, dict]:
+    out = {}
+    for name, values in sorted(rec.latencies.items()):
+        values = sorted(values)
+        out[name] = {
+            "requests": len(values),
+            "errors": rec.errors.get(name, 0),
+            "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(values[-1], 2),
+            "statuses": {str(k): v for k, v in sorted(rec.statuses[name].items())},
+        }
+    return out
+
+
+async def run_scenario(name: str, args, client: httpx.AsyncClient, seed: int) -> dict:
+    rec = Recorder()
+    ctx = Context(
+        base=args.base.rstrip("/"),
+        stub=args.stub.rstrip("/") if args.stub else None,
+        client=client,
+        recorder=rec,
+        rng=random.Random(seed),
+        users=args.users,
+        password=args.password,
+        max_order_id=args.max_order_id,
+        storm_duplicates=args.storm_duplicates,
+    )
+    await ctx.prepare()
+    scenario = SCENARIOS[name]
+    iterations = 0
+    failures = 0
+
+    async def worker(stop_at: float) -> None:
+        nonlocal iterations, failures
+        while time.perf_counter() < stop_at:
+            try:
+                await scenario(ctx)
+                iterations += 1
+            except Exception as exc:   # erro do próprio cenário (não HTTP)
+                failures += 1
+                if failures <= 3:
+                    print(f"  [{name}] falha no cenário: {exc!r}", file=sys.stderr)
+
+    if args.warmup > 0:
+        rec.enabled = False
+        stop = time.perf_counter() + args.warmup
+        await asyncio.gather(*[worker(stop) for _ in range(args.concurrency)])
+        rec.enabled = True
+        iterations = failures = 0
+
+    t0 = time.perf_counter()
+    stop = t0 + args.duration
+    await asyncio.gather(*[worker(stop) for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "duration_s": round(elapsed, 2),
+        "concurrency": args.concurrency,
+        "iterations": iterations,
+        "scenario_failures": failures,
+        "endpoints": summarize(rec, elapsed),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Comparação com baseline
+# -----------------------------------------------------------------------------
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Lista de regressões (p95/p99 maiores, vazão menor ou mais erros que a baseline)."""
+    problems = []
+    for scen, data in current.get("scenarios", {}).items():
+        base_scen = baseline.get("scenarios", {}).get(scen)
+        if not base_scen:
+            continue
+        for ep, cur in data["endpoints"].items():
+            old = base_scen["endpoints"].get(ep)
+            if not old:
+                continue
+            label = f"{scen} · {ep}"
+            for key in ("p95_ms", "p99_ms"):
+                if old[key] > 0 and cur[key] > old[key] * (1 + tolerance):
+                    problems.append(f"{label}: {key} {old[key]:.1f} -> {cur[key]:.1f}")
+            if old["rps"] > 0 and cur["rps"] < old["rps"] * (1 - tolerance):
+                problems.append(f"{label}: rps {old['rps']:.1f} -> {cur['rps']:.1f}")
+            old_rate = old["errors"] / max(1, old["requests"])
+            cur_rate = cur["errors"] / max(1, cur["requests"])
+            if cur_rate > old_rate + 0.01:
+                problems.append(f"{label}: erros {old_rate:.1%} -> {cur_rate:.1%}")
+    return problems
+
+
+def print_table(results: dict) -> None:
+    head = f"{'cenário':<14} {'endpoint':<28} {'req':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(head)
+    print("-" * len(head))
+    for scen, data in results["scenarios"].items():
+        for ep, m in data["endpoints"].items():
+            print(f"{scen:<14} {ep:<28} {m['requests']:>7} {m['errors']:>5} {m['rps']:>8.1f} "
+                  f"{m['p50_ms']:>8.1f} {m['p95_ms']:>8.1f} {m['p99_ms']:>8.1f}")
+
+
+async def main_async(args) -> dict:
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Cenário(s) desconhecido(s): {', '.join(unknown)} (opções: {', '.join(SCENARIOS)})")
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    results = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "base": args.base,
+            "label": args.label,
+            "python": platform.python_version(),
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": {},
+    }
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for i, name in enumerate(names):
+            print(f"▶ {name} ({args.duration}s, {args.concurrency} usuários)", file=sys.stderr)
+            results["scenarios"][name] = await run_scenario(name, args, client, args.seed + i)
+    return results
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark de carga da loja.")
+    ap.add_argument("--base", default="http://127.0.0.1:8001", help="URL do app")
+    ap.add_argument("--stub", default=None, help="URL do bench.mp_stub (webhook_storm)")
+    ap.add_argument("--scenarios", default="browse,search,login,orders", help=f"separados por vírgula: {','.join(SCENARIOS)}")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--warmup", type=float, default=3.0)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--users", type=int, default=1000, help="usuários do seed sorteados (bench1..N)")
+    ap.add_argument("--password", default="bench123")
+    ap.add_argument("--max-order-id", type=int, default=1000, help="external_reference sorteado no webhook_storm")
+    ap.add_argument("--storm-duplicates", type=int, default=5, help="notificações por pagamento no webhook_storm")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--label", default="", help="rótulo livre gravado no JSON")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", default=None, help="JSON de uma execução anterior para comparar")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="piora relativa aceita (0.15 = 15%%)")
+    args = ap.parse_args(argv)
+
+    results = asyncio.run(main_async(args))
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2, ensure_ascii=False)
+    print_table(results)
+    print(f"\nResultados em {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        problems = compare(results, baseline, args.tolerance)
+        if problems:
+            print(f"\n❌ {len(problems)} regressão(ões) vs {args.baseline}:")
+            for p in problems:
+                print("  -", p)
+            return 1
+        print(f"\n✅ sem regressões vs {args.baseline} (tolerância {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
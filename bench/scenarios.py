@@ -0,0 +1,193 @@
+# bench/scenarios.py
+"""
+Cenários de carga. Cada cenário é uma corrotina que executa UMA iteração
+(um "usuário virtual" fazendo uma ação) usando `ctx.call(...)`, que mede
+e registra a latência por endpoint.
+
+- browse:         catálogo paginado (1–3 páginas), com ordenação/categoria/tag
+- search:         busca textual por prefixos
+- login:          POST /api/auth/login com usuários do seed
+- checkout:       login (cacheado) + POST /api/checkout de 1–3 produtos
+- webhook_storm:  rajada de notificações duplicadas para o mesmo pagamento
+- orders:         histórico de pedidos do cliente (1–2 páginas)
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .dataset import BRANDS, DEFAULT_PASSWORD, EMAIL_FMT, WORDS
+
+SORTS = ["newest", "price_asc", "price_desc", "name_asc"]
+
+
+class Recorder:
+    """Latências (ms) e erros por endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.enabled = True
+
+    def add(self, name: str, ms: float, status: Optional[int], ok: bool) -> None:
+        if not self.enabled:
+            return
+        self.latencies[name].append(ms)
+        self.statuses[name][status or 0] += 1
+        if not ok:
+            self.errors[name] += 1
+
+
+@dataclass
+class Context:
+    base: str
+    stub: Optional[str]
+    client: httpx.AsyncClient
+    recorder: Recorder
+    rng: random.Random
+    users: int = 1000
+    password: str = DEFAULT_PASSWORD
+    max_order_id: int = 1000
+    storm_duplicates: int = 5
+    products: List[int] = field(default_factory=list)
+    categories: List[str] = field(default_factory=list)
+    tags: List[str] = field(default_factory=list)
+    tokens: Dict[str, str] = field(default_factory=dict)
+
+    async def call(self, name: str, method: str, url: str, **kw) -> Optional[httpx.Response]:
+        t0 = time.perf_counter()
+        try:
+            r = await self.client.request(method, self.base + url, **kw)
+        except httpx.HTTPError:
+            self.recorder.add(name, (time.perf_counter() - t0) * 1000, None, False)
+            return None
+        self.recorder.add(name, (time.perf_counter() - t0) * 1000, r.status_code, r.status_code < 400)
+        return r
+
+    def email(self) -> str:
+        return EMAIL_FMT.format(self.rng.randint(1, self.users))
+
+    async def token(self) -> Optional[str]:
+        """Token de um usuário do seed; o login aqui não entra nas métricas."""
+        email = self.email()
+        if email not in self.tokens:
+            r = await self.client.post(self.base + "/api/auth/login",
+                                       json={"email": email, "password": self.password})
+            if r.status_code != 200:
+                return None
+            self.tokens[email] = r.json()["access_token"]
+        return self.tokens[email]
+
+    async def prepare(self) -> None:
+        """Amostra de produtos/categorias/tags do próprio app."""
+        r = await self.client.get(self.base + "/api/products/facets")
+        if r.status_code == 200:
+            data = r.json()
+            self.categories = [c["name"] for c in data.get("categories", [])]
+            self.tags = [t["name"] for t in data.get("tags", [])]
+        cursor = None
+        for _ in range(5):
+            params = {"limit": 100, "sort": "newest"}
+            if cursor:
+                params["cursor"] = cursor
+            r = await self.client.get(self.base + "/api/products", params=params)
+            if r.status_code != 200:
+                break
+            page = r.json()
+            self.products += [p["id"] for p in page["items"]]
+            cursor = page.get("next_cursor")
+            if not cursor:
+                break
+
+
+# -----------------------------------------------------------------------------
+# Cenários
+# -----------------------------------------------------------------------------
+async def browse(ctx: Context) -> None:
+    params = {"sort": ctx.rng.choice(SORTS), "limit": 24}
+    roll = ctx.rng.random()
+    if roll < 0.3 and ctx.categories:
+        params["category"] = ctx.rng.choice(ctx.categories)
+    elif roll < 0.45 and ctx.tags:
+        params["tag"] = ctx.rng.choice(ctx.tags)
+    if ctx.rng.random() < 0.2:
+        await ctx.call("GET /api/products/facets", "GET", "/api/products/facets")
+    for _ in range(ctx.rng.randint(1, 3)):
+        r = await ctx.call("GET /api/products", "GET", "/api/products", params=params)
+        if r is None or r.status_code != 200:
+            return
+        cursor = r.json().get("next_cursor")
+        if not cursor:
+            return
+        params["cursor"] = cursor
+
+
+async def search(ctx: Context) -> None:
+    words = [ctx.rng.choice(WORDS)]
+    if ctx.rng.random() < 0.4:
+        words.append(ctx.rng.choice(BRANDS))
+    # prefixos de 3+ letras, como quem ainda está digitando
+    q = " ".join(w[: ctx.rng.randint(3, len(w))] if len(w) > 3 else w for w in words)
+    await ctx.call("GET /api/products?q", "GET", "/api/products", params={"q": q, "limit": 24})
+
+
+async def login(ctx: Context) -> None:
+    await ctx.call("POST /api/auth/login", "POST", "/api/auth/login",
+                   json={"email": ctx.email(), "password": ctx.password})
+
+
+async def checkout(ctx: Context) -> None:
+    token = await ctx.token()
+    if not token or not ctx.products:
+        return
+    items = [{"product_id": pid, "quantity": ctx.rng.randint(1, 2)}
+             for pid in ctx.rng.sample(ctx.products, min(len(ctx.products), ctx.rng.randint(1, 3)))]
+    await ctx.call("POST /api/checkout", "POST", "/api/checkout", json={"items": items},
+                   headers={"Authorization": f"Bearer {token}"})
+
+
+async def webhook_storm(ctx: Context) -> None:
+    if not ctx.stub:
+        raise RuntimeError("webhook_storm precisa do stub (--stub)")
+    ref = str(ctx.rng.randint(1, ctx.max_order_id))
+    r = await ctx.client.post(ctx.stub + "/_bench/payments", json={"external_reference": ref})
+    pid = r.json()["id"]
+    body = {"type": "payment", "action": "payment.updated", "data": {"id": str(pid)}}
+    # o MP re-envia a mesma notificação várias vezes, quase ao mesmo tempo
+    await asyncio.gather(*[
+        ctx.call("POST /webhooks/mp", "POST", "/webhooks/mp", json=body)
+        for _ in range(ctx.storm_duplicates)
+    ])
+
+
+async def orders(ctx: Context) -> None:
+    token = await ctx.token()
+    if not token:
+        return
+    headers = {"Authorization": f"Bearer {token}"}
+    params = {"limit": 20}
+    for _ in range(ctx.rng.randint(1, 2)):
+        r = await ctx.call("GET /api/orders/mine", "GET", "/api/orders/mine", params=params, headers=headers)
+        if r is None or r.status_code != 200:
+            return
+        cursor = r.json().get("next_cursor")
+        if not cursor:
+            return
+        params["cursor"] = cursor
+
+
+SCENARIOS: Dict[str, Callable[[Context], Awaitable[None]]] = {
+    "browse": browse,
+    "search": search,
+    "login": login,
+    "checkout": checkout,
+    "webhook_storm": webhook_storm,
+    "orders": orders,
+}
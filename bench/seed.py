@@ -0,0 +1,190 @@
+# bench/seed.py
+"""
+Gera uma massa de dados sintética no banco do app (DATABASE_URL ou soutech.db).
+
+    python -m bench.seed --products 100000 --users 50000 --orders 1000000
+    python -m bench.seed --products 2000 --users 500 --orders 5000 --truncate
+
+- os usuários são bench<N>@bench.local, todos com a senha --password
+  (um único hash bcrypt reaproveitado: semear 50k usuários não custa 50k hashes)
+- pedidos com 1..--max-items itens, distribuídos entre os usuários, com
+  status e datas variados
+- no fim, índice de busca (FTS), facetas e agregados de vendas são reconstruídos
+
+Determinístico para um mesmo --seed. Tudo em lotes (executemany), uma
+transação por lote.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend import facets, migrations, reports, search
+from backend.database import Base, engine
+from backend.hashing import hash_password
+from backend.migrate_db import reset_sequences
+from backend.models import Order, OrderItem, Product, User
+
+from .dataset import BRANDS, CATEGORIES, DEFAULT_PASSWORD, EMAIL_FMT, STATUSES, TAGS, WORDS
+
+
+def _batches(total: int, size: int) -> Iterator[range]:
+    for start in range(0, total, size):
+        yield range(start, min(total, start + size))
+
+
+def _progress(label: str, done: int, total: int, t0: float) -> None:
+    rate = done / max(1e-9, time.perf_counter() - t0)
+    print(f"\r{label}: {done}/{total} ({rate:,.0f}/s)", end="", file=sys.stderr, flush=True)
+
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def seed_users(n: int, batch: int, password: str, rng: random.Random) -> List[int]:
+    pw_hash = hash_password(password)
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        first = _next_id(conn, User)
+    now = datetime.utcnow()
+    for part in _batches(n, batch):
+        rows = [{
+            "id": first + i,
+            "name": f"Cliente Bench {first + i}",
+            "email": EMAIL_FMT.format(first + i),
+            "password_hash": pw_hash,
+            "is_admin": False,
+            "created_at": now - timedelta(minutes=rng.randint(0, 525_600)),
+            "doc_type": "CPF",
+            "doc_number": f"{rng.randrange(10**11):011d}",
+            "phone": f"119{rng.randrange(10**8):08d}",
+            "city": "São Paulo",
+            "state": "SP",
+        } for i in part]
+        with engine.begin() as conn:
+            conn.execute(User.__table__.insert(), rows)
+        _progress("users", part.stop, n, t0)
+    print(file=sys.stderr)
+    return list(range(first, first + n))
+
+
+def seed_products(n: int, batch: int, rng: random.Random) -> List[int]:
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        first = _next_id(conn, Product)
+    now = datetime.utcnow()
+    for part in _batches(n, batch):
+        rows = []
+        for i in part:
+            pid = first + i
+            rows.append({
+                "id": pid,
+                "name": f"{rng.choice(WORDS).capitalize()} {rng.choice(BRANDS)} {rng.choice(WORDS)} {pid}",
+                "sku": f"BN-{pid:07d}",
+                "price": round(rng.uniform(5, 5000), 2),
+                "category": rng.choice(CATEGORIES),
+                "tags": ",".join(rng.sample(TAGS, rng.randint(0, 4))),
+                "image_url": "",
+                "active": rng.random() > 0.05,
+                "created_at": now - timedelta(minutes=rng.randint(0, 525_600)),
+            })
+        with engine.begin() as conn:
+            conn.execute(Product.__table__.insert(), rows)
+        _progress("products", part.stop, n, t0)
+    print(file=sys.stderr)
+    return list(range(first, first + n))
+
+
+def seed_orders(n: int, batch: int, max_items: int, user_ids: List[int], rng: random.Random) -> None:
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        first = _next_id(conn, Order)
+        products = conn.execute(select(Product.id, Product.name, Product.sku, Product.price)).all()
+    if not products or not user_ids:
+        print("sem produtos/usuários: pedidos não gerados", file=sys.stderr)
+        return
+    now = datetime.utcnow()
+    for part in _batches(n, batch):
+        orders, items = [], []
+        for i in part:
+            oid = first + i
+            uid = rng.choice(user_ids)
+            total = 0.0
+            for pr in rng.sample(products, rng.randint(1, max_items)):
+                qty = rng.randint(1, 3)
+                total += pr.price * qty
+                items.append({
+                    "order_id": oid, "product_id": pr.id, "name": pr.name,
+                    "sku": pr.sku, "unit_price": pr.price, "quantity": qty,
+                })
+            status = rng.choice(STATUSES)
+            orders.append({
+                "id": oid,
+                "status": status,
+                "total_amount": round(total, 2),
+                "customer_name": f"Cliente Bench {uid}",
+                "customer_email": EMAIL_FMT.format(uid),
+                "mp_preference_id": f"bench-pref-{oid}",
+                "mp_payment_id": f"{9_000_000_000 + oid}" if status in ("approved", "rejected") else "",
+                "created_at": now - timedelta(minutes=rng.randint(0, 525_600)),
+                "user_id": uid,
+            })
+        with engine.begin() as conn:
+            conn.execute(Order.__table__.insert(), orders)
+            conn.execute(OrderItem.__table__.insert(), items)
+        _progress("orders", part.stop, n, t0)
+    print(file=sys.stderr)
+
+
+def truncate() -> None:
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Gera dados sintéticos para benchmark.")
+    ap.add_argument("--products", type=int, default=100_000)
+    ap.add_argument("--users", type=int, default=50_000)
+    ap.add_argument("--orders", type=int, default=1_000_000)
+    ap.add_argument("--max-items", type=int, default=3, help="itens por pedido (1..N)")
+    ap.add_argument("--batch", type=int, default=5000)
+    ap.add_argument("--password", default=DEFAULT_PASSWORD, help="senha de todos os usuários bench")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--truncate", action="store_true", help="apaga TODOS os dados antes")
+    args = ap.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    Base.metadata.create_all(bind=engine)
+    migrations.run(engine)
+    if args.truncate:
+        truncate()
+
+    t0 = time.perf_counter()
+    user_ids = seed_users(args.users, args.batch, args.password, rng)
+    seed_products(args.products, args.batch, rng)
+    seed_orders(args.orders, args.batch, args.max_items, user_ids, rng)
+
+    reset_sequences(engine)   # ids explícitos: no PostgreSQL as sequences precisam andar
+    print("reconstruindo busca, facetas e agregados...", file=sys.stderr)
+    search.ensure_schema(engine)
+    with Session(engine) as db:
+        search.rebuild(db)
+        facets.rebuild(db)
+        reports.rebuild(db)
+        db.commit()
+    print(f"✅ seed concluído em {time.perf_counter() - t0:.1f}s:",
+          engine.url.render_as_string(hide_password=True))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
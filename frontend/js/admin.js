@@ -274,9 +274,34 @@
         <button class="btn btn-sm" data-del="${p.id}">Excluir</button>
       </td>
     `;
+    tr.dataset.id = p.id;
+    tr.querySelector("[data-del]").addEventListener("click", () => deleteProduct(p.id));
     return tr;
   }
 
+  // deltas (resposta da própria ação ou evento do feed): troca/insere/remove só a linha
+  function upsertRow(body, tr) {
+    if (!body) return;
+    const old = body.querySelector(`tr[data-id="${tr.dataset.id}"]`);
+    if (old) old.replaceWith(tr);
+    else {
+      body.querySelector("tr:not([data-id])")?.remove();   // "Carregando…" / lista vazia
+      body.prepend(tr);   // listas em ordem de criação, mais novos primeiro
+    }
+  }
+  function removeRow(body, id) {
+    body?.querySelector(`tr[data-id="${id}"]`)?.remove();
+  }
+  const upsertProduct = (p) => upsertRow($("#productsBody"), rowProduct(p));
+  const removeProduct = (id) => removeRow($("#productsBody"), id);
+
+  async function deleteProduct(id) {
+    if (!confirm("Excluir produto #" + id + "?")) return;
+    const rr = await fetch(`${API}/api/admin/products/${id}`, { method: "DELETE", headers: authHeaders() });
+    if (!rr.ok) { const e = await rr.json().catch(()=>({})); alert(e.detail || "Erro"); return; }
+    removeProduct(id);
+  }
+
   async function listProducts() {
     const body = $("#productsBody");
     if (!body) return;
@@ -287,15 +312,6 @@
       const data = await r.json();
       body.innerHTML = "";
       data.forEach(p => body.appendChild(rowProduct(p)));
-      body.querySelectorAll("[data-del]").forEach(btn => {
-        btn.addEventListener("click", async () => {
-          const id = Number(btn.dataset.del);
-          if (!confirm("Excluir produto #" + id + "?")) return;
-          const rr = await fetch(`${API}/api/admin/products/${id}`, { method: "DELETE", headers: authHeaders() });
-          if (!rr.ok) { const e = await rr.json().catch(()=>({})); alert(e.detail || "Erro"); return; }
-          await listProducts();
-        });
-      });
     } catch { body.innerHTML = `<tr><td colspan="8">Erro ao carregar.</td></tr>`; }
   }
 
@@ -312,12 +328,68 @@
     if (!payload.name || !payload.sku) { alert("Nome e SKU são obrigatórios."); return; }
     const r = await fetch(`${API}/api/admin/products`, { method:"POST", headers:authHeaders(), body:JSON.stringify(payload) });
     if (!r.ok) { const e = await r.json().catch(()=>({})); alert(e.detail || "Erro"); return; }
+    upsertProduct(await r.json());
     ["p_name","p_sku","p_price","p_cat","p_tags","p_img"].forEach(id => { const el = $("#"+id); if (el) el.value=""; });
     $("#p_active") && ($("#p_active").checked = true);
-    await listProducts();
     alert("Produto salvo!");
   }
 
+  async function uploadImage() {
+    const file = $("#p_img_file")?.files?.[0];
+    if (!file) { alert("Escolha uma imagem."); return; }
+    const btn = $("#btnUploadImg");
+    if (btn) btn.disabled = true;
+    try {
+      // o arquivo vai cru no corpo; a URL devolvida entra no campo da imagem
+      const r = await fetch(`${API}/api/admin/images`, {
+        method: "POST",
+        headers: { ...authHeaders(false), "Content-Type": file.type || "application/octet-stream" },
+        body: file,
+      });
+      if (r.status === 401 || r.status === 403) { goLogin(); return; }
+      const data = await r.json().catch(() => ({}));
+      if (!r.ok) { alert(data.detail || "Erro ao enviar a imagem."); return; }
+      $("#p_img") && ($("#p_img").value = data.image_url);
+      $("#p_img_file").value = "";
+    } catch { alert("Erro ao enviar a imagem."); }
+    finally { if (btn) btn.disabled = false; }
+  }
+
+  async function importProducts() {
+    const file = $("#imp_file")?.files?.[0];
+    const out = $("#importResult");
+    if (!file) { alert("Escolha um arquivo CSV ou NDJSON."); return; }
+    const isCsv = /\.csv$/i.test(file.name) || file.type === "text/csv";
+    const dry = $("#imp_dry")?.checked ? "true" : "false";
+    const btn = $("#btnImport");
+    if (btn) btn.disabled = true;
+    if (out) out.textContent = "Importando…";
+    try {
+      // o arquivo vai cru no corpo; o servidor lê em streaming
+      const r = await fetch(`${API}/api/admin/products/import?dry_run=${dry}`, {
+        method: "POST",
+        headers: { Authorization: `Bearer ${token}`, "Content-Type": isCsv ? "text/csv" : "application/x-ndjson" },
+        body: file,
+      });
+      if (r.status === 401 || r.status === 403) { goLogin(); return; }
+      const rep = await r.json().catch(() => ({}));
+      if (!r.ok) { if (out) out.textContent = rep.detail || "Erro na importação."; return; }
+      const resumo = `${rep.rows} linha(s): ${rep.inserted} nova(s), ${rep.updated} atualizada(s), ${rep.failed} com erro` +
+        (rep.dry_run ? " (só validação)" : "") + ` em ${rep.seconds}s.`;
+      const erros = (rep.errors || []).slice(0, 50)
+        .map(e => `linha ${e.line}${e.sku ? " (" + e.sku + ")" : ""}: ${e.error}`);
+      if (rep.failed > erros.length) erros.push(`… e mais ${rep.failed - erros.length}`);
+      if (rep.aborted) erros.unshift(rep.aborted);
+      if (out) {
+        out.innerHTML = "";
+        const p = document.createElement("p"); p.textContent = resumo; out.appendChild(p);
+        if (erros.length) { const pre = document.createElement("pre"); pre.textContent = erros.join("\n"); out.appendChild(pre); }
+      }
+      if (!rep.dry_run) await listProducts();
+    } catch { if (out) out.textContent = "Erro na importação."; }
+    finally { if (btn) btn.disabled = false; }
+  }
+
   // ==========================================================
   // CLIENTES
   // (Necessita rotas no backend: 
@@ -347,9 +419,23 @@
         <button class="btn btn-sm" data-toggle="${u.id}">${u.is_admin ? "Remover admin" : "Tornar admin"}</button>
       </td>
     `;
+    tr.dataset.id = u.id;
+    tr.querySelector("[data-toggle]").addEventListener("click", () => toggleAdmin(u.id));
     return tr;
   }
 
+  function upsertUser(u) {
+    upsertRow($("#usersBody"), rowUser(u));
+    const info = $("#usersInfo");
+    if (info) info.textContent = `${document.querySelectorAll("#usersBody tr[data-id]").length} cliente(s)`;
+  }
+
+  async function toggleAdmin(id) {
+    const rr = await fetch(`${API}/api/admin/users/${id}`, { method:"PATCH", headers:authHeaders(), body:JSON.stringify({ toggle_admin: true }) });
+    if (!rr.ok) { const e = await rr.json().catch(()=>({})); alert(e.detail || "Erro"); return; }
+    upsertUser(await rr.json());
+  }
+
   async function listUsers() {
     const body = $("#usersBody");
     const info = $("#usersInfo");
@@ -362,14 +448,6 @@
       info.textContent = `${data.length} cliente(s)`;
       body.innerHTML = "";
       data.forEach(u => body.appendChild(rowUser(u)));
-      body.querySelectorAll("[data-toggle]").forEach(btn => {
-        btn.addEventListener("click", async () => {
-          const id = Number(btn.dataset.toggle);
-          const rr = await fetch(`${API}/api/admin/users/${id}`, { method:"PATCH", headers:authHeaders(), body:JSON.stringify({ toggle_admin: true }) });
-          if (!rr.ok) { const e = await rr.json().catch(()=>({})); alert(e.detail || "Erro"); return; }
-          await listUsers();
-        });
-      });
     } catch { body.innerHTML = `<tr><td colspan="8">Erro ao carregar.</td></tr>`; }
   }
 
@@ -396,13 +474,79 @@
     }
     const r = await fetch(`${API}/api/admin/users`, { method:"POST", headers:authHeaders(), body:JSON.stringify(payload) });
     if (!r.ok) { const e = await r.json().catch(()=>({})); alert(e.detail || "Erro"); return; }
+    upsertUser(await r.json());
     alert("Cliente criado com sucesso!");
     // limpa form
     ["c_name","c_email","c_phone","c_doc_number","c_password","c_zip","c_state","c_city","c_district","c_street","c_number","c_complement"].forEach(id=>{
       const el=$("#"+id); if(el) el.value="";
     });
     $("#c_is_admin") && ($("#c_is_admin").checked=false);
-    await listUsers();
+  }
+
+  // ==========================================================
+  // PEDIDOS AO VIVO + FEED DE EVENTOS (SSE: /api/admin/events)
+  // ==========================================================
+  const MAX_ORDER_ROWS = 200;
+  const STATUS_LABEL = {
+    created: "Criado", pending: "Pendente", in_process: "Em análise", authorized: "Autorizado",
+    approved: "Aprovado", rejected: "Recusado", cancelled: "Cancelado", refunded: "Estornado",
+    charged_back: "Chargeback",
+  };
+
+  function rowOrder(o) {
+    const tr = document.createElement("tr");
+    tr.innerHTML = `
+      <td>${o.id}</td>
+      <td>${new Date(o.created_at + (String(o.created_at).endsWith("Z") ? "" : "Z")).toLocaleString("pt-BR")}</td>
+      <td>${o.customer_name || "—"}<div class="muted">${o.customer_email || ""}</div></td>
+      <td>${fmtBRL(o.total_amount)}</td>
+      <td>${STATUS_LABEL[o.status] || o.status}</td>
+    `;
+    tr.dataset.id = o.id;
+    return tr;
+  }
+
+  function upsertOrder(o) {
+    const body = $("#ordersBody");
+    if (!body) return;
+    upsertRow(body, rowOrder(o));
+    const rows = body.querySelectorAll("tr[data-id]");
+    for (let i = MAX_ORDER_ROWS; i < rows.length; i++) rows[i].remove();
+  }
+
+  let lastEventId = "";
+  function connectEvents() {
+    const info = $("#ordersInfo");
+    const setInfo = (t) => { if (info) info.textContent = t; };
+    (async () => {
+      // EventSource não manda Authorization: troca o token por um ticket curto
+      const r = await fetch(`${API}/api/admin/events/ticket`, { method: "POST", headers: authHeaders() }).catch(() => null);
+      if (!r) { setInfo("desconectado, tentando de novo…"); setTimeout(connectEvents, 5000); return; }
+      if (r.status === 401 || r.status === 403) { goLogin(); return; }
+      const { ticket } = await r.json();
+      const qs = `ticket=${encodeURIComponent(ticket)}` + (lastEventId ? `&last_id=${lastEventId}` : "");
+      const es = new EventSource(`${API}/api/admin/events?${qs}`);
+      const on = (type, fn) => es.addEventListener(type, (ev) => {
+        if (ev.lastEventId) lastEventId = ev.lastEventId;
+        fn(JSON.parse(ev.data || "{}"));
+      });
+      es.onopen = () => setInfo("ao vivo");
+      on("order.created", upsertOrder);
+      on("order.updated", upsertOrder);
+      on("product.created", upsertProduct);
+      on("product.updated", upsertProduct);
+      on("product.deleted", (d) => removeProduct(d.id));
+      on("products.reload", () => listProducts());
+      on("user.created", upsertUser);
+      on("user.updated", upsertUser);
+      // eventos perdidos além do buffer do servidor: recarrega as listas inteiras
+      on("reset", () => { listProducts(); listUsers(); });
+      es.onerror = () => {
+        setInfo("reconectando…");
+        // o navegador reconecta sozinho com Last-Event-ID; se desistiu (ex.: ticket vencido), novo ticket
+        if (es.readyState === EventSource.CLOSED) { es.close(); setTimeout(connectEvents, 3000); }
+      };
+    })();
   }
 
   // ==========================================================
@@ -417,11 +561,16 @@
     // Produtos
     await listProducts();
     $("#btnSave")?.addEventListener("click", createProduct);
+    $("#btnImport")?.addEventListener("click", importProducts);
+    $("#btnUploadImg")?.addEventListener("click", uploadImage);
 
     // Clientes
     await listUsers();
     $("#btnCreateCustomer")?.addEventListener("click", createUser);
 
+    // Pedidos e atualizações ao vivo
+    connectEvents();
+
     // Sair
     $("#btnLogout")?.addEventListener("click", () => {
       localStorage.removeItem("auth_token");
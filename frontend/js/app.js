@@ -84,34 +84,72 @@ function renderCart(){
 }
 
 /* produtos */
-const state={pagina:1, porPagina:8, filtro:{q:"", cat:"", ord:"nome-asc"}};
+// paginação por cursor: o backend ordena e devolve {items, next_cursor}
+const state={porPagina:24, cursor:null, items:[], carregando:false, filtro:{q:"", cat:"", tag:"", ord:"nome-asc"}};
+const SORTS={"nome-asc":"name_asc","preco-asc":"price_asc","preco-desc":"price_desc","novidades":"newest"};
 
-async function fetchProducts(){
+// cache por URL: {etag, data} — o backend responde 304 quando o catálogo não mudou
+const productsCache=new Map();
+
+async function fetchProducts(cursor){
   const p=new URLSearchParams();
   if(state.filtro.q)   p.set("q", state.filtro.q);
   if(state.filtro.cat) p.set("category", state.filtro.cat);
+  if(state.filtro.tag) p.set("tag", state.filtro.tag);
+  p.set("sort", SORTS[state.filtro.ord] || "name_asc");
+  p.set("limit", state.porPagina);
+  if(cursor) p.set("cursor", cursor);
+  const url=`${API}/api/products?${p.toString()}`;
+  const cached=productsCache.get(url);
+  const vazio={items:[], next_cursor:null};
   try{
-    const r=await fetch(`${API}/api/products?${p.toString()}`);
-    return r.ok? await r.json():[];
+    const r=await fetch(url, { headers: cached ? { "If-None-Match": cached.etag } : {} });
+    if(r.status===304 && cached) return cached.data;
+    if(!r.ok) return vazio;
+    const data=await r.json();
+    const etag=r.headers.get("ETag");
+    if(etag) productsCache.set(url, {etag, data});
+    return data;
   }catch{
-    return [];
+    return cached ? cached.data : vazio;
   }
 }
 
-function applySort(list){
-  switch(state.filtro.ord){
-    case "preco-asc":  return list.sort((a,b)=>(a.price??0)-(b.price??0));
-    case "preco-desc": return list.sort((a,b)=>(b.price??0)-(a.price??0));
-    case "novidades":  return list.sort((a,b)=> new Date(b.created_at)-new Date(a.created_at));
-    default:           return list.sort((a,b)=>(a.name||"").localeCompare(b.name||""));
-  }
+// facetas: categorias/tags com contagem "Nome (n)"; se falhar, ficam as opções fixas do HTML
+async function carregarFacetas(){
+  let data;
+  try{
+    const r=await fetch(`${API}/api/products/facets`);
+    if(!r.ok) return;
+    data=await r.json();
+  }catch{ return; }
+  const preencher=(sel, lista, todas)=>{
+    if(!sel || !lista.length) return;
+    const atual=sel.value;
+    sel.innerHTML=`<option value="">${todas}</option>`+
+      lista.map(f=>`<option value="${f.name}">${f.name} (${f.count})</option>`).join("");
+    sel.value=atual;
+  };
+  preencher($("#categoria"), data.categories||[], "Todas");
+  preencher($("#tag"), data.tags||[], "Todas as tags");
 }
-function paginate(list){ const s=(state.pagina-1)*state.porPagina; return list.slice(s,s+state.porPagina); }
 
-function productCardHTML(p){
+// card ocupa ~1 coluna do grid; com srcset o navegador baixa a menor variante que serve
+const THUMB_SIZES="(max-width: 600px) 50vw, 300px";
+
+function productThumbHTML(p){
   const img=(p.image_url && typeof p.image_url==="string") ? p.image_url : "https://placehold.co/300x300/png";
+  const alt=p.name||"Produto";
+  if(!p.image_srcset) return `<img src="${img}" alt="${alt}" loading="lazy">`;
+  return `<picture>
+      <source type="image/webp" srcset="${p.image_srcset}" sizes="${THUMB_SIZES}">
+      <img src="${img}" srcset="${p.image_srcset_jpeg||""}" sizes="${THUMB_SIZES}" alt="${alt}" loading="lazy" decoding="async">
+    </picture>`;
+}
+
+function productCardHTML(p){
   return `
-    <div class="product-thumb"><img src="${img}" alt="${p.name||"Produto"}" loading="lazy"></div>
+    <div class="product-thumb">${productThumbHTML(p)}</div>
     <div class="body">
       <h3>${p.name||"Produto"}</h3>
       <div class="row">
@@ -125,41 +163,66 @@ function productCardHTML(p){
     </div>`;
 }
 
-async function renderProdutos(){
-  const grid=$("#lista"); if(!grid) return; grid.innerHTML="";
-  let items=applySort(await fetchProducts());
-  $("#resultInfo") && ($("#resultInfo").textContent = `${items.length} produto(s)`);
-  if(!items.length){
-    const d=document.createElement("div"); d.className="card"; d.textContent="Nenhum produto encontrado.";
-    grid.appendChild(d); renderPaginacao(0); return;
-  }
-  const page=paginate(items);
-  page.forEach(p=>{
+function appendCards(list){
+  const grid=$("#lista"); if(!grid) return;
+  list.forEach(p=>{
     const card=document.createElement("article");
     card.className="card";
     card.innerHTML=productCardHTML(p);
+    card.querySelector("[data-add]")?.addEventListener("click", ()=>addToCart(p,1));
     grid.appendChild(card);
   });
-  grid.querySelectorAll("[data-add]").forEach(btn=>{
-    btn.addEventListener("click", ()=>{
-      const id=Number(btn.dataset.add);
-      const p=items.find(x=>x.id===id);
-      if(p) addToCart(p,1);
-    });
-  });
-  renderPaginacao(items.length);
-}
-
-function renderPaginacao(total){
-  const bar=$("#paginacao"); if(!bar) return; bar.innerHTML="";
-  const pages=Math.max(1, Math.ceil(total/state.porPagina));
-  for(let i=1;i<=pages;i++){
-    const b=document.createElement("button");
-    b.className="btn"+(i===state.pagina?" active":"");
-    b.textContent=i;
-    b.addEventListener("click",()=>{ state.pagina=i; renderProdutos(); window.scrollTo({top:0,behavior:"smooth"}); });
-    bar.appendChild(b);
+}
+
+function renderInfo(){
+  const info=$("#resultInfo"); if(!info) return;
+  info.textContent = `${state.items.length}${state.cursor ? "+" : ""} produto(s)`;
+}
+
+async function renderProdutos(){
+  const grid=$("#lista"); if(!grid) return; grid.innerHTML="";
+  state.items=[]; state.cursor=null; state.carregando=true;
+  const page=await fetchProducts(null);
+  state.carregando=false;
+  state.items=page.items.slice(); state.cursor=page.next_cursor;
+  renderInfo();
+  if(!state.items.length){
+    const d=document.createElement("div"); d.className="card"; d.textContent="Nenhum produto encontrado.";
+    grid.appendChild(d); return;
   }
+  appendCards(state.items);
+}
+
+async function carregarMais(){
+  if(state.carregando || !state.cursor) return;
+  state.carregando=true;
+  const page=await fetchProducts(state.cursor);
+  state.carregando=false;
+  state.items.push(...page.items); state.cursor=page.next_cursor;
+  appendCards(page.items); renderInfo();
+}
+
+// rolagem infinita: #paginacao funciona como sentinela no fim da grade
+function bindInfiniteScroll(){
+  const sentinel=$("#paginacao"); if(!sentinel) return;
+  if("IntersectionObserver" in window){
+    new IntersectionObserver(es=>{ if(es.some(e=>e.isIntersecting)) carregarMais(); }, {rootMargin:"400px"}).observe(sentinel);
+  }else{
+    const b=document.createElement("button"); b.className="btn"; b.textContent="Carregar mais";
+    b.addEventListener("click", carregarMais); sentinel.appendChild(b);
+  }
+}
+
+/* Idempotency-Key: a mesma para o mesmo carrinho (duplo clique/retry não duplica o pedido) */
+function checkoutKey(items){
+  const sig = JSON.stringify(items);
+  let k = null; try{ k = JSON.parse(sessionStorage.getItem("checkout_key") || "null"); }catch{}
+  if (!k || k.sig !== sig) {
+    const key = window.crypto?.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    k = { sig, key };
+    sessionStorage.setItem("checkout_key", JSON.stringify(k));
+  }
+  return k.key;
 }
 
 /* checkout: pega o usuário do backend na hora */
@@ -176,11 +239,17 @@ async function finalizarCompra() {
 
   const btn = $("#btnCheckout"); if (btn) btn.disabled = true;
   try {
-    const res = await fetch(`${API}/api/checkout`, {
-      method: "POST",
-      headers: { "Content-Type":"application/json", "Authorization": `Bearer ${getToken()}` },
-      body: JSON.stringify(payload),
-    });
+    const headers = {
+      "Content-Type":"application/json",
+      "Authorization": `Bearer ${getToken()}`,
+      "Idempotency-Key": checkoutKey(payload.items),
+    };
+    let res;
+    for (let tentativa = 0; tentativa < 10; tentativa++) {
+      res = await fetch(`${API}/api/checkout`, { method: "POST", headers, body: JSON.stringify(payload) });
+      if (res.status !== 409) break;   // 409: a mesma compra ainda está sendo criada
+      await new Promise(r => setTimeout(r, 1000));
+    }
 
     if (res.status === 401 || res.status === 403) {
       alert("Sua sessão expirou. Entre novamente.");
@@ -205,8 +274,9 @@ window.addEventListener("DOMContentLoaded", async ()=>{
   $("#btnAplicarFiltros")?.addEventListener("click", ()=>{
     state.filtro.q   = $("#q")?.value?.trim() || "";
     state.filtro.cat = $("#categoria")?.value || "";
+    state.filtro.tag = $("#tag")?.value || "";
     state.filtro.ord = $("#ordenar")?.value || "nome-asc";
-    state.pagina=1; renderProdutos();
+    renderProdutos();
   });
 
   $$('[data-open-cart]').forEach(el=>el.addEventListener("click", openCart));
@@ -226,7 +296,8 @@ window.addEventListener("DOMContentLoaded", async ()=>{
 
   renderCart(); renderCartIconCount();
   await ensureHeaderUserPill();
-  renderProdutos();
+  await Promise.all([renderProdutos(), carregarFacetas()]);
+  bindInfiniteScroll();
 
   const y=$("#year"); if(y) y.textContent=new Date().getFullYear();
 });
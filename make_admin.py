@@ -1,12 +1,22 @@
-# make_admin.py
-import sqlite3, sys, os
-EMAIL = (sys.argv[1] if len(sys.argv) > 1 else "").strip().lower()
-if not EMAIL:
-    print("Uso: python make_admin.py email@dominio.com"); raise SystemExit(1)
-DB = os.path.abspath("soutech.db")
-con = sqlite3.connect(DB); cur = con.cursor()
-cur.execute("UPDATE users SET is_admin=1 WHERE email=?", (EMAIL,))
-if cur.rowcount == 0:
-    print("Nenhum usuário com esse e-mail."); con.close(); raise SystemExit(2)
-con.commit(); con.close()
-print("✅ Promovido a admin:", EMAIL, "no banco:", DB)
+# make_admin.py
+# Usa a mesma configuração do app (DATABASE_URL ou soutech.db), então funciona em SQLite e PostgreSQL.
+import sys
+from backend.auth import invalidate_user
+from backend.coherence import coherence
+from backend.database import SessionLocal, engine
+from backend.models import User
+EMAIL = (sys.argv[1] if len(sys.argv) > 1 else "").strip().lower()
+if not EMAIL:
+    print("Uso: python make_admin.py email@dominio.com"); raise SystemExit(1)
+DB = engine.url.render_as_string(hide_password=True)
+db = SessionLocal()
+user = db.query(User).filter(User.email == EMAIL).first()
+if not user:
+    print("Nenhum usuário com esse e-mail."); db.close(); raise SystemExit(2)
+user.is_admin = True
+uid = user.id
+db.commit(); db.close()
+# workers rodando têm o usuário em cache (auth.user_cache): avisa como as rotas do admin fazem
+invalidate_user(uid, broadcast=False)
+coherence.bump("users")
+print("✅ Promovido a admin:", EMAIL, "no banco:", DB)
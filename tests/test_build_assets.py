@@ -0,0 +1,50 @@
+# tests/test_build_assets.py
+"""Build dos assets: referências entre arquivos de texto apontam para os nomes finais."""
+import hashlib
+
+import pytest
+
+from backend.build_assets import HASH_LEN, AssetCycleError, build
+
+
+def _src(tmp_path, files):
+    src = tmp_path / "frontend"
+    for rel, data in files.items():
+        p = src / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(data if isinstance(data, bytes) else data.encode("utf-8"))
+    return src
+
+
+def test_text_refs_follow_dependency_order(tmp_path):
+    # a.css -> z.css -> js/b.js -> img/logo.png: a ordem alfabética processaria a.css primeiro
+    src = _src(tmp_path, {
+        "css/a.css": "@import url(/static/css/z.css);",
+        "css/z.css": ".x { background: url(/static/js/b.js); }",
+        "js/b.js": "const LOGO = '/static/img/logo.png';",
+        "img/logo.png": b"\x89PNG fake",
+        "index.html": '<link href="/static/css/a.css"><script src="/static/js/b.js"></script>',
+    })
+    out = tmp_path / "dist"
+    manifest = build(src, out)
+
+    for rel, hashed in manifest.items():
+        data = (out / "static" / hashed).read_bytes()
+        assert hashed.split(".")[-2] == hashlib.sha256(data).hexdigest()[:HASH_LEN]
+        assert not any(f"/static/{orig}".encode() in data for orig in manifest), f"{rel}: referência sem hash"
+    assert f"/static/{manifest['css/z.css']}" in (out / "static" / manifest["css/a.css"]).read_text()
+    html = (out / "index.html").read_text()
+    assert manifest["css/a.css"] in html and manifest["js/b.js"] in html
+
+
+def test_cycle_fails_without_touching_output(tmp_path):
+    src = _src(tmp_path, {
+        "css/a.css": "@import url(/static/css/b.css);",
+        "css/b.css": "@import url(/static/css/a.css);",
+    })
+    out = tmp_path / "dist"
+    out.mkdir()
+    (out / "keep.txt").write_text("build anterior")
+    with pytest.raises(AssetCycleError, match="css/a.css -> css/b.css -> css/a.css"):
+        build(src, out)
+    assert (out / "keep.txt").exists()
@@ -0,0 +1,55 @@
+# tests/test_events_ticket.py
+"""O ticket do SSE (/api/admin/events) não vale como token de acesso."""
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="soutech-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'soutech.db')}")
+os.environ.setdefault("IMAGES_DIR", os.path.join(_TMP, "media"))
+os.environ.setdefault("RATE_LIMIT", "0")
+os.environ.setdefault("HASH_WORKERS", "0")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.database import SessionLocal
+from backend.main import app
+from backend.models import User
+
+
+@pytest.fixture(scope="module")
+def admin():
+    with TestClient(app) as client:
+        client.post("/api/auth/signup", json={"name": "Adm", "email": "adm@x.com", "password": "secret1"})
+        db = SessionLocal()
+        db.query(User).filter(User.email == "adm@x.com").update({"is_admin": True})
+        db.commit()
+        db.close()
+        token = client.post("/api/auth/login", json={"email": "adm@x.com", "password": "secret1"}).json()["access_token"]
+        yield client, {"Authorization": f"Bearer {token}"}
+
+
+def _ticket(client, headers) -> str:
+    r = client.post("/api/admin/events/ticket", headers=headers)
+    assert r.status_code == 200
+    return r.json()["ticket"]
+
+
+def test_access_token_works_on_admin_endpoint(admin):
+    client, headers = admin
+    assert client.get("/api/admin/users", headers=headers).status_code == 200
+
+
+def test_ticket_is_rejected_as_bearer(admin):
+    client, headers = admin
+    ticket = {"Authorization": f"Bearer {_ticket(client, headers)}"}
+    assert client.get("/api/admin/users", headers=ticket).status_code == 401
+    assert client.get("/api/auth/me", headers=ticket).status_code == 401
+    assert client.get("/api/orders/mine", headers=ticket).status_code == 401   # get_token_user
+
+
+def test_access_token_is_rejected_as_ticket(admin):
+    client, headers = admin
+    token = headers["Authorization"].split(" ", 1)[1]
+    assert client.get("/api/admin/events", params={"ticket": token}).status_code == 401
@@ -0,0 +1,66 @@
+# tests/test_import_reload.py
+"""A importação só invalida o catálogo quando algum lote foi gravado."""
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="soutech-test-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'soutech.db')}")
+os.environ.setdefault("IMAGES_DIR", os.path.join(_TMP, "media"))
+os.environ.setdefault("RATE_LIMIT", "0")
+os.environ.setdefault("HASH_WORKERS", "0")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.database import SessionLocal
+from backend.main import app
+from backend.models import User
+
+CSV = {"Content-Type": "text/csv"}
+
+
+@pytest.fixture(scope="module")
+def admin():
+    with TestClient(app) as client:
+        client.post("/api/auth/signup", json={"name": "Imp", "email": "imp@x.com", "password": "secret1"})
+        db = SessionLocal()
+        db.query(User).filter(User.email == "imp@x.com").update({"is_admin": True})
+        db.commit()
+        db.close()
+        token = client.post("/api/auth/login", json={"email": "imp@x.com", "password": "secret1"}).json()["access_token"]
+        yield client, {"Authorization": f"Bearer {token}", **CSV}
+
+
+@pytest.fixture
+def reloads(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main.catalog.snapshots, "invalidate", lambda: calls.append("invalidate"))
+    monkeypatch.setattr(main.events, "emit", lambda name, data: calls.append(name))
+    return calls
+
+
+def test_failed_import_does_not_reload(admin, reloads):
+    client, headers = admin
+    r = client.post("/api/admin/products/import", headers=headers, content=b"nome;preco\n\xff\xfe\n")
+    assert r.status_code == 400
+    r = client.post("/api/admin/products/import", headers=headers, content=b"sku,name,price\nX1,,abc\n")
+    assert r.status_code == 200 and r.json()["failed"] == 1
+    assert reloads == []
+
+
+def test_dry_run_does_not_reload(admin, reloads):
+    client, headers = admin
+    r = client.post("/api/admin/products/import", params={"dry_run": "true"}, headers=headers,
+                    content=b"sku,name,price\nD1,Dry,10\n")
+    assert r.status_code == 200 and r.json()["valid"] == 1
+    assert reloads == []
+
+
+def test_committed_import_reloads_once(admin, reloads):
+    client, headers = admin
+    body = b"sku,name,price\nA1,Um,10\nA2,Dois,20\nA3,Tres,30\n"
+    r = client.post("/api/admin/products/import", params={"batch_size": 2}, headers=headers, content=body)
+    assert r.status_code == 200 and r.json()["inserted"] == 3
+    assert reloads == ["invalidate", "products.reload"]